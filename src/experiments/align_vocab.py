@@ -1,9 +1,13 @@
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Literal, Tuple
 
 import numpy as np
-from gensim.models import keyedvectors
 
 from constants import CORPUS_TYPE, EMBEDDING_DIMENSION, SRC, TRG, VOCAB_SIZE
+from embedding_files import save_binary_embeddings
+
+# Seed for the random embeddings of pieces that GloVe did not embed
+ALIGNMENT_SEED = 0
 
 
 def get_vocab(lang: Literal["osh", "eng"]) -> List[str]:
@@ -19,45 +23,47 @@ def get_vocab(lang: Literal["osh", "eng"]) -> List[str]:
     return vocab
 
 
-def load_glove_embeddings(lang: Literal["osh", "eng"]) -> Dict[str, np.ndarray]:
-    # This function was created with the help of ChatGPT
-    glove_embeddings = {}
+def load_glove_embeddings(
+    lang: Literal["osh", "eng"],
+) -> Tuple[Dict[str, int], np.ndarray]:
+    # Parses the GloVe file once, straight into a preallocated float32 matrix
     with open(
         f"embeddings-{lang}-{CORPUS_TYPE}-{VOCAB_SIZE}.glove.txt", "r", encoding="utf-8"
     ) as file:
+        # glove.sh writes a header with the number of embeddings, which still counts the deleted <unk> embedding
+        glove_embeddings = np.empty(
+            (int(file.readline().split()[0]), EMBEDDING_DIMENSION), dtype=np.float32
+        )
+        glove_index = {}
         for line in file:
             parts = line.split()
-            word = parts[0]
-            if (
-                len(vector := np.array(parts[1:], dtype=np.float32))
-                == EMBEDDING_DIMENSION
-            ):
-                glove_embeddings[word] = vector
-    return glove_embeddings
+            if len(parts) - 1 != EMBEDDING_DIMENSION:
+                continue
+            row = glove_index.setdefault(parts[0], len(glove_index))
+            glove_embeddings[row] = parts[1:]
+    return glove_index, glove_embeddings[: len(glove_index)]
 
 
 def reorder_glove_embeddings(
-    lang: Literal["osh", "eng"],
-    vocab: List[Tuple[str, int]],
-    glove_embeddings: Dict[int, np.ndarray],
-) -> List[Tuple[str, np.ndarray]]:
-    # This function was created with the help of ChatGPT
-    reordered_embeddings = []
-    glove_keyed_vectors = keyedvectors.KeyedVectors.load_word2vec_format(
-        f"embeddings-{lang}-{CORPUS_TYPE}-{VOCAB_SIZE}.glove.txt"
+    vocab: List[str],
+    glove_index: Dict[str, int],
+    glove_embeddings: np.ndarray,
+    seed: int = ALIGNMENT_SEED,
+) -> np.ndarray:
+    rows = np.array([glove_index.get(word, -1) for word in vocab])
+    missing = rows == -1
+    reordered_embeddings = glove_embeddings[np.where(missing, 0, rows)]
+    # Pieces without a GloVe embedding are drawn from a normal distribution with the statistics of all embeddings
+    reordered_embeddings[missing] = np.random.default_rng(seed).normal(
+        glove_embeddings.mean(dtype=np.float64),
+        glove_embeddings.std(dtype=np.float64),
+        (missing.sum(), EMBEDDING_DIMENSION),
     )
-    v = glove_keyed_vectors.vectors
-    for word in vocab:
-        if word in glove_embeddings:
-            embedding = glove_embeddings[word]
-        else:
-            embedding = v.std() * np.random.randn(v.shape[1]) + v.mean()
-        reordered_embeddings.append((word, embedding))
     return reordered_embeddings
 
 
 def save_reordered_embeddings(
-    lang: Literal["eng", "osh"], embeddings: List[Tuple[str, np.ndarray]]
+    lang: Literal["eng", "osh"], vocab: List[str], embeddings: np.ndarray
 ) -> None:
     with open(
         f"ordered-{lang}-{CORPUS_TYPE}-{VOCAB_SIZE}-embeddings.txt",
@@ -65,21 +71,27 @@ def save_reordered_embeddings(
         encoding="utf-8",
     ) as file:
         # This function was created with the help of ChatGPT
-        file.write(f"{len(embeddings)} {len(embeddings[0][1])}\n")
-        for word, embedding in embeddings:
+        file.write(f"{len(embeddings)} {embeddings.shape[1]}\n")
+        for word, embedding in zip(vocab, embeddings):
             embedding_str = " ".join(map(str, embedding))
             file.write(f"{word} {embedding_str}\n")
+    # flair reads the text file, the binary copy is memory-mapped by the NumPy byte pair embeddings
+    save_binary_embeddings(
+        f"ordered-{lang}-{CORPUS_TYPE}-{VOCAB_SIZE}-embeddings.txt", vocab, embeddings
+    )
 
 
 def convert_embeddings(lang: Literal["osh", "eng"]):
     sp_vocab = get_vocab(lang)
-    gl_embs = load_glove_embeddings(lang)
-    ordered_embs = reorder_glove_embeddings(lang, sp_vocab, gl_embs)
-    save_reordered_embeddings(lang, ordered_embs)
+    glove_index, glove_embeddings = load_glove_embeddings(lang)
+    ordered_embs = reorder_glove_embeddings(sp_vocab, glove_index, glove_embeddings)
+    save_reordered_embeddings(lang, sp_vocab, ordered_embs)
 
 
 # This is necessary, since GloVe reorders the embeddings and for BPE to work correctly, we need the original ordering
 # restored
 
-convert_embeddings(SRC)
-convert_embeddings(TRG)
+if __name__ == "__main__":
+    # Both languages are independent, hence they are converted concurrently
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        list(executor.map(convert_embeddings, [SRC, TRG]))
@@ -0,0 +1,187 @@
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from csls import top_k_rows
+
+# Number of vectors that are assigned to their nearest centroid at once
+_ASSIGNMENT_BLOCK_SIZE = 8192
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    return np.concatenate(
+        [
+            np.argmax(
+                vectors[start : start + _ASSIGNMENT_BLOCK_SIZE] @ centroids.T, axis=1
+            )
+            for start in range(0, len(vectors), _ASSIGNMENT_BLOCK_SIZE)
+        ]
+    )
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, num_clusters: int, iterations: int = 10, seed: int = 0
+) -> np.ndarray:
+    # k-means with cosine similarity, the centroids are renormalized after every update
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), num_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        # Summing the vectors of every cluster is a sparse (clusters x vectors) times dense product
+        order = np.argsort(assignments, kind="stable")
+        membership = csr_matrix(
+            (
+                np.ones(len(vectors), dtype=vectors.dtype),
+                order,
+                np.searchsorted(assignments[order], np.arange(num_clusters + 1)),
+            ),
+            shape=(num_clusters, len(vectors)),
+        )
+        sums = membership @ vectors
+        # Empty clusters keep their centroid
+        norms = np.linalg.norm(sums, axis=1)
+        filled = norms > 0
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+
+@dataclass
+class IvfIndex:
+    """
+    Inverted file index over normalized embeddings for approximate inner product search. The vectors are
+    clustered by spherical k-means and a query is only compared to the vectors of the probes clusters with the
+    most similar centroids. With quantize, the vectors are stored as int8 codes with one scale per vector,
+    which takes a quarter of the float32 memory.
+    """
+
+    centroids: np.ndarray
+    # Start of every list in ids and vectors, the vectors of a list are stored next to each other
+    list_offsets: np.ndarray
+    ids: np.ndarray
+    vectors: np.ndarray
+    scales: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(
+        cls,
+        embeddings: np.ndarray,
+        num_lists: Optional[int] = None,
+        quantize: bool = False,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> "IvfIndex":
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        num_lists = min(num_lists or int(4 * np.sqrt(len(embeddings))), len(embeddings))
+        centroids = spherical_kmeans(embeddings, num_lists, iterations, seed)
+        assignments = _assign(embeddings, centroids)
+        ids = np.argsort(assignments, kind="stable")
+        list_offsets = np.searchsorted(assignments[ids], np.arange(num_lists + 1))
+        vectors = embeddings[ids]
+        if not quantize:
+            return cls(centroids, list_offsets, ids, vectors)
+        scales = np.abs(vectors).max(axis=1) / 127
+        # Zero vectors, e.g. the embeddings of empty words, get zero codes instead of NaNs
+        codes = np.round(vectors / np.where(scales > 0, scales, 1)[:, None]).astype(
+            np.int8
+        )
+        return cls(centroids, list_offsets, ids, codes, scales.astype(np.float32))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def save(self, directory: Union[str, Path]):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, array in vars(self).items():
+            if array is not None:
+                np.save(directory / f"{name}.npy", array)
+            else:
+                # E.g. the scales of an earlier quantized index in the same directory
+                (directory / f"{name}.npy").unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, directory: Union[str, Path]) -> "IvfIndex":
+        # The lists are memory-mapped, so only the probed lists are read from disk
+        directory = Path(directory)
+        arrays = {
+            field.name: np.load(array_file, mmap_mode="r")
+            for field in fields(cls)
+            if (array_file := directory / f"{field.name}.npy").exists()
+        }
+        return cls(**arrays)
+
+    def _list_scores(self, queries: np.ndarray, start: int, end: int) -> np.ndarray:
+        if self.scales is None:
+            return queries @ self.vectors[start:end].T
+        return (queries @ self.vectors[start:end].T.astype(np.float32)) * self.scales[
+            start:end
+        ]
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        probes: int = 8,
+        penalties: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the ids and scores of the k vectors with the largest inner products for every query, best first.
+        penalties are subtracted from the scores of the vectors, which turns the search into a CSLS search.
+        Missing results, if the probed lists hold less than k vectors, have the id -1.
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        probes = min(probes, len(self.centroids))
+        probed_lists = top_k_rows(queries @ self.centroids.T, probes)[0]
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        # The queries are grouped by list, so that every list is read once and compared to all of its queries
+        query_order = np.argsort(probed_lists, axis=None, kind="stable")
+        probed_order = probed_lists.ravel()[query_order]
+        query_offsets = np.searchsorted(
+            probed_order, np.arange(len(self.centroids) + 1)
+        )
+        for list_id in np.flatnonzero(np.diff(query_offsets)):
+            start, end = self.list_offsets[list_id], self.list_offsets[list_id + 1]
+            if start == end:
+                continue
+            rows = (
+                query_order[query_offsets[list_id] : query_offsets[list_id + 1]]
+                // probes
+            )
+            scores = self._list_scores(queries[rows], start, end)
+            if penalties is not None:
+                scores -= penalties[self.ids[start:end]]
+            candidates, candidate_scores = top_k_rows(
+                np.hstack([best_scores[rows], scores]), k
+            )
+            ids = np.hstack(
+                [best_ids[rows], np.broadcast_to(self.ids[start:end], scores.shape)]
+            )
+            best_ids[rows] = np.take_along_axis(ids, candidates, axis=1)
+            best_scores[rows] = candidate_scores
+        return best_ids, best_scores
+
+    def csls_search(
+        self,
+        queries: np.ndarray,
+        target_means: np.ndarray,
+        k: int = 10,
+        probes: int = 8,
+        neighbourhood: int = 10,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate CSLS 2 cos(x, y) - r_y(x) - r_x(y). target_means are the r_x(y) of all vectors of the index,
+        e.g. from csls.neighbourhood_means, and r_y(x) is estimated from the approximate neighbours of x.
+        """
+        _, neighbour_scores = self.search(queries, neighbourhood, probes)
+        found = np.isfinite(neighbour_scores)
+        source_means = np.where(found, neighbour_scores, 0).sum(axis=1) / np.maximum(
+            found.sum(axis=1), 1
+        )
+        ids, scores = self.search(
+            2 * np.asarray(queries, dtype=np.float32), k, probes, target_means
+        )
+        return ids, scores - source_means[:, None]
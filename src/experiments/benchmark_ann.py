@@ -0,0 +1,142 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+from ann_index import IvfIndex
+from byte_pair_embeddings import NumpyBytePairEmbeddings
+from constants import POOLING, SRC, TRG
+from csls import csls_top_k, neighbourhood_means, top_k_rows
+from graph_matching import normalize_embeddings, word_order_by_frequency
+
+# Compares the IVF index to exact cosine and CSLS retrieval: recall@1 and recall@10 of the approximate results
+# and queries per second. Without --real, clustered random vectors stand in for the embeddings.
+
+
+def synthetic_embeddings(
+    n: int, num_queries: int, dimension: int = 300, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n // 100, dimension))
+    targets = centers[rng.integers(0, len(centers), n)] + rng.normal(
+        size=(n, dimension)
+    )
+    queries = centers[rng.integers(0, len(centers), num_queries)] + rng.normal(
+        size=(num_queries, dimension)
+    )
+    targets /= np.linalg.norm(targets, axis=1)[:, None]
+    queries /= np.linalg.norm(queries, axis=1)[:, None]
+    return queries.astype(np.float32), targets.astype(np.float32)
+
+
+def real_embeddings(
+    n: int, num_queries: int, corpus_type: str, vocab_size: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    base_path = Path(__file__).resolve().parent
+    matrices = []
+    for lang, size in [(SRC, num_queries), (TRG, n)]:
+        embedding = NumpyBytePairEmbeddings(
+            base_path / f"{lang}-{corpus_type}-{vocab_size}.model",
+            base_path / f"ordered-{lang}-{corpus_type}-{vocab_size}-embeddings.txt",
+        )
+        word_list = word_order_by_frequency(lang, size)
+        matrices.append(
+            normalize_embeddings(embedding.embed(word_list, POOLING)).astype(np.float32)
+        )
+    return matrices[0], matrices[1]
+
+
+def exact_search(queries: np.ndarray, targets: np.ndarray, k: int) -> np.ndarray:
+    return np.concatenate(
+        [
+            top_k_rows(queries[start : start + 1024] @ targets.T, k)[0]
+            for start in range(0, len(queries), 1024)
+        ]
+    )
+
+
+def recall(approximate: np.ndarray, exact: np.ndarray, k: int) -> float:
+    return float(
+        np.mean(
+            [
+                len(set(a[:k]) & set(b[:k])) / k
+                for a, b in zip(approximate.tolist(), exact.tolist())
+            ]
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the IVF index.")
+    parser.add_argument("--size", type=int, default=50000, help="Number of targets")
+    parser.add_argument(
+        "--queries", type=int, default=5000, help="Number of source queries"
+    )
+    parser.add_argument(
+        "--probes",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16, 64],
+        help="Numbers of probed lists",
+    )
+    parser.add_argument(
+        "--real",
+        action="store_true",
+        help="Use the normalized embeddings of SRC and TRG instead of random vectors",
+    )
+    parser.add_argument(
+        "--corpus_type", type=str, default="small", help="Type of the corpus"
+    )
+    parser.add_argument(
+        "--vocab_size", type=int, default=10000, help="Size of the vocabulary"
+    )
+    args = parser.parse_args()
+    if args.real:
+        queries, targets = real_embeddings(
+            args.size, args.queries, args.corpus_type, args.vocab_size
+        )
+    else:
+        queries, targets = synthetic_embeddings(args.size, args.queries)
+
+    start = time.perf_counter()
+    exact_cosine = exact_search(queries, targets, 10)
+    print(f"exact cosine: {len(queries) / (time.perf_counter() - start):.0f} queries/s")
+    start = time.perf_counter()
+    exact_csls = csls_top_k(queries, targets, 10)[0]
+    print(f"exact CSLS: {len(queries) / (time.perf_counter() - start):.0f} queries/s")
+    target_means = neighbourhood_means(targets, queries)
+
+    for quantize in [False, True]:
+        start = time.perf_counter()
+        index = IvfIndex.build(targets, quantize=quantize)
+        build_time = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as directory:
+            index.save(directory)
+            start = time.perf_counter()
+            index = IvfIndex.load(directory)
+            load_time = time.perf_counter() - start
+            print(
+                f"{'int8' if quantize else 'float32'} index with {len(index.centroids)} lists: "
+                f"build {build_time:.1f}s, load {load_time:.3f}s, "
+                f"vectors {index.vectors.nbytes / 2**20:.1f} MiB"
+            )
+            for probes in args.probes:
+                start = time.perf_counter()
+                cosine = index.search(queries, 10, probes)[0]
+                cosine_rate = len(queries) / (time.perf_counter() - start)
+                start = time.perf_counter()
+                csls = index.csls_search(queries, target_means, 10, probes)[0]
+                csls_rate = len(queries) / (time.perf_counter() - start)
+                print(
+                    f"\t{probes} probes: cosine recall@1 {recall(cosine, exact_cosine, 1):.3f}, "
+                    f"recall@10 {recall(cosine, exact_cosine, 10):.3f}, {cosine_rate:.0f} queries/s; "
+                    f"CSLS recall@1 {recall(csls, exact_csls, 1):.3f}, "
+                    f"recall@10 {recall(csls, exact_csls, 10):.3f}, {csls_rate:.0f} queries/s"
+                )
+
+
+if __name__ == "__main__":
+    main()
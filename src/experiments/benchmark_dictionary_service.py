@@ -0,0 +1,170 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import string
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from dictionary_service import DictionaryService, make_server
+
+# Load generator for dictionary_service.py. The server runs in its own process, the clients send requests over
+# keep-alive connections and the dictionary is swapped while they run, which must not cause any failed request.
+
+
+def synthetic_dictionary(n: int, seed: int = 0) -> Dict[str, List[str]]:
+    rng = random.Random(seed)
+    return {
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 12))): [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+            for _ in range(10)
+        ]
+        for _ in range(n)
+    }
+
+
+def serve(dictionary_file: str, port: int, ready):
+    with make_server(DictionaryService(dictionary_file), port=port) as server:
+        ready.set()
+        server.serve_forever()
+
+
+def request(connection: http.client.HTTPConnection, method: str, path: str, body=None):
+    connection.request(
+        method,
+        path,
+        body=None if body is None else json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    response = connection.getresponse()
+    content = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path} failed with {response.status}: {content}")
+    return json.loads(content)
+
+
+def run_clients(
+    port: int,
+    words: List[str],
+    clients: int,
+    requests_per_client: int,
+    batch_size: int,
+    swap_file: Optional[str] = None,
+    served_file: Optional[str] = None,
+) -> List[float]:
+    latencies: List[List[float]] = [[] for _ in range(clients)]
+
+    def client(number: int):
+        rng = random.Random(number)
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        for _ in range(requests_per_client):
+            batch = rng.choices(words, k=batch_size)
+            start = time.perf_counter()
+            if batch_size == 1:
+                request(connection, "GET", f"/lookup?word={quote(batch[0])}&limit=10")
+            else:
+                request(connection, "POST", "/lookup", {"words": batch, "limit": 10})
+            latencies[number].append(time.perf_counter() - start)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    if swap_file:
+        time.sleep(0.1)
+        # The service only reloads the file it serves, so the other dictionary replaces that file first
+        shutil.copyfile(swap_file, f"{served_file}.tmp")
+        os.replace(f"{served_file}.tmp", served_file)
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        request(connection, "POST", "/reload")
+        connection.close()
+    for thread in threads:
+        thread.join()
+    return [latency for client_latencies in latencies for latency in client_latencies]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dictionary service.")
+    parser.add_argument(
+        "--dictionary",
+        type=str,
+        default=None,
+        help="Dictionary JSON file, a random dictionary is used otherwise",
+    )
+    parser.add_argument(
+        "--words", type=int, default=50000, help="Size of the random dictionary"
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Port of the server")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients")
+    parser.add_argument(
+        "--requests", type=int, default=2000, help="Requests per client"
+    )
+    parser.add_argument(
+        "--batch_sizes",
+        type=int,
+        nargs="+",
+        default=[1, 100],
+        help="Words per request",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.dictionary:
+            with open(args.dictionary, "r", encoding="utf-8") as file:
+                dictionary = json.load(file)
+        else:
+            dictionary = synthetic_dictionary(args.words)
+        dictionary_file = str(Path(directory) / "dictionary.json")
+        with open(dictionary_file, "w", encoding="utf-8") as file:
+            json.dump(dictionary, file)
+        served_file = str(Path(directory) / "served-dictionary.json")
+        shutil.copyfile(dictionary_file, served_file)
+        # The swapped in dictionary has the same words, so every lookup succeeds before and after the swap
+        swap_file = str(Path(directory) / "swapped-dictionary.json")
+        with open(swap_file, "w", encoding="utf-8") as file:
+            json.dump(
+                {word: translations[::-1] for word, translations in dictionary.items()},
+                file,
+            )
+        ready = multiprocessing.Event()
+        server = multiprocessing.Process(
+            target=serve, args=(served_file, args.port, ready), daemon=True
+        )
+        server.start()
+        ready.wait()
+        try:
+            words = list(dictionary)
+            for batch_size in args.batch_sizes:
+                start = time.perf_counter()
+                latencies = run_clients(
+                    args.port,
+                    words,
+                    args.clients,
+                    args.requests,
+                    batch_size,
+                    swap_file,
+                    served_file,
+                )
+                elapsed = time.perf_counter() - start
+                percentiles = statistics.quantiles(latencies, n=100)
+                print(
+                    f"{batch_size} words per request: {len(latencies) / elapsed:.0f} requests/s, "
+                    f"{len(latencies) * batch_size / elapsed:.0f} words/s, "
+                    f"latency p50 {percentiles[49] * 1000:.2f}ms, "
+                    f"p99 {percentiles[98] * 1000:.2f}ms"
+                )
+                swap_file, dictionary_file = dictionary_file, swap_file
+        finally:
+            server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from flair.data import Sentence
+from flair.embeddings import BytePairEmbeddings as BPE
+
+from byte_pair_embeddings import NumpyBytePairEmbeddings
+from constants import EMBEDDING_DIMENSION, POOLING
+from flair_embeddings import embed_words
+from graph_matching import normalize_embeddings, word_order_by_frequency
+
+# Compares the batched flair lookup and the NumPy byte pair embeddings to the original lookup with one flair
+# Sentence per word and the pandas based normalization. The flair token.py file has to be patched with the
+# pooling that is benchmarked, see the README. test_byte_pair_embeddings.py and test_graph_matching.py check the
+# parity without flair and the corpora.
+
+
+def load_embeddings_per_word(
+    lang: str, word_list: List[str], corpus_type: str, vocab_size: int
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    base_path = Path(__file__).resolve().parent
+    embedding = BPE(
+        model_file_path=base_path / f"{lang}-{corpus_type}-{vocab_size}.model",
+        embedding_file_path=base_path
+        / f"ordered-{lang}-{corpus_type}-{vocab_size}-embeddings.txt",
+        dim=EMBEDDING_DIMENSION,
+        preprocess=False,
+    )
+
+    def get_embedding(word):
+        sentence = Sentence(word)
+        embedding.embed(sentence)
+        return sentence[0].embedding.cpu().numpy()
+
+    data = {"word": word_list, "embedding": [get_embedding(word) for word in word_list]}
+    df = pd.DataFrame(data)
+    embeddings_column = df["embedding"]
+    embeddings_column = embeddings_column.apply(lambda emb: emb / np.linalg.norm(emb))
+    embeddings_mean = embeddings_column.mean()
+    embeddings_column = embeddings_column.apply(lambda emb: emb - embeddings_mean)
+    embeddings_column = embeddings_column.apply(lambda emb: emb / np.linalg.norm(emb))
+    embedding_matrix = np.zeros((len(embeddings_column), len(embeddings_column[0])))
+    df["embedding"] = embeddings_column
+    for i in range(0, len(embeddings_column)):
+        embedding_matrix[i] = embeddings_column[i]
+    return df, embedding_matrix @ embedding_matrix.T
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the embedding lookup.")
+    parser.add_argument(
+        "--lang", type=str, required=True, help="Language of the embeddings"
+    )
+    parser.add_argument(
+        "--corpus_type", type=str, default="small", help="Type of the corpus"
+    )
+    parser.add_argument(
+        "--vocab_size", type=int, default=10000, help="Size of the vocabulary"
+    )
+    parser.add_argument(
+        "--pooling",
+        type=str,
+        default=POOLING,
+        help="Pooling that the flair token.py file was patched with",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[3000, 20000, 50000],
+        help="Numbers of words to embed",
+    )
+    args = parser.parse_args()
+    base_path = Path(__file__).resolve().parent
+    model_file = base_path / f"{args.lang}-{args.corpus_type}-{args.vocab_size}.model"
+    embedding_file = (
+        base_path
+        / f"ordered-{args.lang}-{args.corpus_type}-{args.vocab_size}-embeddings.txt"
+    )
+    flair_embedding = BPE(
+        model_file_path=model_file,
+        embedding_file_path=embedding_file,
+        dim=EMBEDDING_DIMENSION,
+        preprocess=False,
+    )
+    start = time.perf_counter()
+    numpy_embedding = NumpyBytePairEmbeddings(model_file, embedding_file)
+    print(f"Loading the NumPy embeddings took {time.perf_counter() - start:.2f}s")
+
+    for size in args.sizes:
+        word_list = word_order_by_frequency(args.lang, size)
+        start = time.perf_counter()
+        df, graph = load_embeddings_per_word(
+            args.lang, word_list, args.corpus_type, args.vocab_size
+        )
+        per_word_time = time.perf_counter() - start
+        start = time.perf_counter()
+        batched_matrix = normalize_embeddings(embed_words(flair_embedding, word_list))
+        batched_graph = batched_matrix @ batched_matrix.T
+        batched_time = time.perf_counter() - start
+        start = time.perf_counter()
+        numpy_embeddings = numpy_embedding.embed(word_list, args.pooling)
+        numpy_embed_time = time.perf_counter() - start
+        numpy_matrix = normalize_embeddings(numpy_embeddings)
+        numpy_graph = numpy_matrix @ numpy_matrix.T
+        numpy_time = time.perf_counter() - start
+        print(
+            f"{len(word_list)} words: per word {per_word_time:.2f}s, "
+            f"batched flair {batched_time:.2f}s ({per_word_time / batched_time:.1f}x), "
+            f"NumPy {numpy_time:.2f}s ({per_word_time / numpy_time:.1f}x, "
+            f"of which {numpy_embed_time:.3f}s embedding)"
+        )
+        for name, matrix, other_graph in [
+            ("batched flair", batched_matrix, batched_graph),
+            ("NumPy", numpy_matrix, numpy_graph),
+        ]:
+            row_difference = np.abs(np.stack(df["embedding"].values) - matrix).max()
+            graph_difference = np.abs(graph - other_graph).max()
+            identical = np.array_equal(graph, other_graph)
+            print(
+                f"\t{name}: {'identical' if identical else 'different'}, max row difference "
+                f"{row_difference:.2e}, max graph difference {graph_difference:.2e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
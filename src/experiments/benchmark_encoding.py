@@ -0,0 +1,61 @@
+import argparse
+import filecmp
+import os
+import tempfile
+import time
+
+import sentencepiece as spm
+
+from embeddings import encode_lines
+
+# Compares the batched, multi-threaded corpus encoding to encoding one line at a time and checks that both
+# produce the same bytes
+
+
+def encode_line_by_line(sp: spm.SentencePieceProcessor, source: str, output_file: str):
+    with open(output_file, "w", encoding="utf-8") as encoded_corpus:
+        with open(source, "r", encoding="utf-8") as corpus:
+            for line in corpus:
+                encoded_line = " ".join(str(x) for x in sp.encode(line))
+                encoded_corpus.write(encoded_line.strip() + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the corpus encoding.")
+    parser.add_argument("--corpus", type=str, required=True, help="Corpus file")
+    parser.add_argument("--model", type=str, required=True, help="SentencePiece model")
+    parser.add_argument(
+        "--num_threads",
+        type=int,
+        nargs="+",
+        default=sorted({1, os.cpu_count() or 1}),
+        help="Numbers of encoding threads",
+    )
+    args = parser.parse_args()
+    sp = spm.SentencePieceProcessor(
+        model_file=args.model, add_bos=True, add_eos=True, out_type=str
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        reference = os.path.join(tmp_dir, "line-by-line.txt")
+        start = time.perf_counter()
+        encode_line_by_line(sp, args.corpus, reference)
+        duration = time.perf_counter() - start
+        with open(args.corpus, "r", encoding="utf-8") as corpus:
+            num_lines = sum(1 for _ in corpus)
+        print(f"line by line: {num_lines / duration:,.0f} lines/s")
+        for num_threads in args.num_threads:
+            output = os.path.join(tmp_dir, f"batched-{num_threads}.txt")
+            start = time.perf_counter()
+            num_lines = encode_lines(sp, [args.corpus], output, num_threads=num_threads)
+            duration = time.perf_counter() - start
+            identical = filecmp.cmp(reference, output, shallow=False)
+            print(
+                f"batched with {num_threads} threads: {num_lines / duration:,.0f} lines/s, "
+                f"identical output: {identical}"
+            )
+            assert identical
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import time
+
+import networkx
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+from benchmark_gh import synthetic_languages
+from eigenvector_similarity import (laplacian_spectrum,
+                                    nearest_neighbour_laplacian,
+                                    spectral_distance)
+from embedding_files import load_binary_embeddings
+from graph_matching import normalize_embeddings
+
+# Compares the sparse EVS computation of eigenvector_similarity.py with the ball tree and networkx computation
+# of the original evs-python-3.py, on two synthetic embedding spaces or on the binary embedding tables of two
+# languages.
+
+FREQS = [2000, 5000, 10000, 20000]
+
+
+def reference_spectrum(embeddings: np.ndarray) -> np.ndarray:
+    nearest_neighbours = NearestNeighbors(n_neighbors=2, algorithm="ball_tree").fit(
+        embeddings
+    )
+    _, indices = nearest_neighbours.kneighbors(embeddings)
+    graph = networkx.Graph()
+    for index in indices:
+        graph.add_edge(index[0], index[1])
+    return networkx.laplacian_spectrum(graph)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the EVS metric.")
+    parser.add_argument(
+        "--embeddings",
+        type=str,
+        nargs=2,
+        default=None,
+        help="Binary embedding tables of two languages, synthetic spaces are used otherwise",
+    )
+    parser.add_argument(
+        "--freqs", type=int, nargs="+", default=FREQS, help="Numbers of words"
+    )
+    parser.add_argument(
+        "--reference_limit",
+        type=int,
+        default=10000,
+        help="Largest number of words with the original computation",
+    )
+    args = parser.parse_args()
+
+    if args.embeddings:
+        x_all, y_all = (
+            normalize_embeddings(
+                np.array(load_binary_embeddings(path, max(args.freqs))[1])
+            ).astype(np.float32)
+            for path in args.embeddings
+        )
+    else:
+        x_all, y_all = synthetic_languages(max(args.freqs))
+
+    for freq in args.freqs:
+        x, y = x_all[:freq], y_all[:freq]
+        start = time.perf_counter()
+        spectrum_x = laplacian_spectrum(nearest_neighbour_laplacian(x))
+        spectrum_y = laplacian_spectrum(nearest_neighbour_laplacian(y))
+        distance = spectral_distance(spectrum_x, spectrum_y)
+        seconds = time.perf_counter() - start
+        print(f"FREQ {freq}: sparse {seconds:.3f}s, EVS {distance:.10g}")
+        if freq > args.reference_limit:
+            continue
+        start = time.perf_counter()
+        reference_x, reference_y = reference_spectrum(x), reference_spectrum(y)
+        reference = spectral_distance(reference_x, reference_y)
+        reference_seconds = time.perf_counter() - start
+        print(
+            f"\toriginal {reference_seconds:.3f}s ({reference_seconds / seconds:.0f}x), "
+            f"EVS {reference:.10g}, largest eigenvalue difference "
+            f"{np.max(np.abs(reference_x - spectrum_x)):.2g}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import argparse
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from benchmark_suite import synthetic_bilingual_embeddings
+from embedding_files import load_binary_embeddings
+from graph_matching import normalize_embeddings
+from gromov_hausdorff import estimate_gh_distance, gh_distance
+
+# Compares the time and the result of the approximations of the GH metric with the exact computation of
+# gh-python-3.py, on two synthetic embedding spaces or on the binary embedding tables of two languages.
+
+FREQS = [1000, 2000, 3000, 4000, 5000]
+
+
+def synthetic_languages(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Two unrelated point clouds, so that the metric is not trivially zero
+    return tuple(
+        normalize_embeddings(synthetic_bilingual_embeddings(n, seed=seed)[0]).astype(
+            np.float32
+        )
+        for seed in (0, 1)
+    )
+
+
+def timed(function: Callable):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the GH metric.")
+    parser.add_argument(
+        "--embeddings",
+        type=str,
+        nargs=2,
+        default=None,
+        help="Binary embedding tables of two languages, synthetic spaces are used otherwise",
+    )
+    parser.add_argument(
+        "--freqs", type=int, nargs="+", default=FREQS, help="Numbers of words"
+    )
+    parser.add_argument(
+        "--max_edge_lengths",
+        type=float,
+        nargs="*",
+        default=[1.0, 1.2],
+        help="Thresholds of the Rips complex",
+    )
+    parser.add_argument(
+        "--sparse",
+        type=float,
+        nargs="*",
+        default=[0.5],
+        help="Approximation parameters of the sparse Rips complex",
+    )
+    parser.add_argument(
+        "--sample_sizes",
+        type=int,
+        nargs="*",
+        default=[500, 1000],
+        help="Sizes of the subsamples",
+    )
+    parser.add_argument("--draws", type=int, default=10, help="Subsamples per size")
+    parser.add_argument(
+        "--exact_limit",
+        type=int,
+        default=5000,
+        help="Largest number of words with the exact gudhi computation",
+    )
+    args = parser.parse_args()
+
+    if args.embeddings:
+        x_all, y_all = (
+            normalize_embeddings(
+                np.array(load_binary_embeddings(path, max(args.freqs))[1])
+            ).astype(np.float32)
+            for path in args.embeddings
+        )
+    else:
+        x_all, y_all = synthetic_languages(max(args.freqs))
+
+    for freq in args.freqs:
+        x, y = x_all[:freq], y_all[:freq]
+        results: List[Tuple[str, float, str]] = []
+        exact = None
+        if freq <= args.exact_limit:
+            seconds, exact = timed(lambda: gh_distance(x, y))
+            results.append(("exact rips", seconds, f"{exact:.6f}"))
+        seconds, value = timed(lambda: gh_distance(x, y, method="mst"))
+        results.append(("mst", seconds, f"{value:.6f}"))
+        seconds, value = timed(
+            lambda: gh_distance(x, y, method="mst", bottleneck_error=None)
+        )
+        results.append(("mst, fast bn", seconds, f"{value:.6f}"))
+        for max_edge_length in args.max_edge_lengths:
+            seconds, value = timed(
+                lambda: gh_distance(x, y, max_edge_length=max_edge_length)
+            )
+            results.append((f"max edge {max_edge_length}", seconds, f"{value:.6f}"))
+        for sparse in args.sparse:
+            seconds, value = timed(lambda: gh_distance(x, y, sparse=sparse))
+            results.append((f"sparse {sparse}", seconds, f"{value:.6f}"))
+        for sample_size in args.sample_sizes:
+            if sample_size >= freq:
+                continue
+            for landmarks in (False, True):
+                seconds, estimate = timed(
+                    lambda: estimate_gh_distance(
+                        x,
+                        y,
+                        sample_size,
+                        args.draws,
+                        landmarks,
+                        method="mst",
+                        bottleneck_error=None,
+                    )
+                )
+                results.append(
+                    (
+                        f"{'landmarks' if landmarks else 'sample'} {sample_size}",
+                        seconds,
+                        f"{estimate.mean:.6f} [{estimate.low:.6f}, {estimate.high:.6f}]",
+                    )
+                )
+        reference = exact if exact is not None else float(results[0][2])
+        print(f"FREQ {freq}")
+        for name, seconds, value in results:
+            error = abs(float(value.split()[0]) - reference)
+            print(f"\t{name:<16} {seconds:9.3f}s  {value}  error {error:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import random
+import string
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from graph_matching import get_seeds
+from word_index import WordIndex, identical_word_seeds, remove_identical_words
+
+# Compares the seeding stage of run_goat_for_bli.py with the original list based implementation on synthetic
+# word lists and dictionaries, so that it runs without the corpora.
+
+
+def random_words(rng: random.Random, n: int) -> List[str]:
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))))
+    return list(words)
+
+
+def synthetic_data(
+    n: int, seed: int = 0
+) -> Tuple[List[str], List[str], Dict[str, List[str]]]:
+    rng = random.Random(seed)
+    osh_words = random_words(rng, n)
+    eng_words = random_words(rng, n)
+    # Some words are shared by both lists, like the names in the corpora
+    shared = rng.sample(osh_words, n // 50)
+    eng_words[: len(shared)] = shared
+    rng.shuffle(eng_words)
+    all_translations = {}
+    for word in rng.sample(osh_words, n // 2):
+        # One candidate is in the English word list, the others are not, so the original result is unique
+        all_translations[word] = [
+            "".join(rng.choices(string.ascii_uppercase, k=5)) for _ in range(2)
+        ] + [rng.choice(eng_words)]
+    return osh_words, eng_words, all_translations
+
+
+def legacy_seeding(
+    osh_words: List[str], eng_words: List[str], all_translations: Dict[str, List[str]]
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    word_list_osh, word_list_eng = list(osh_words), list(eng_words)
+    identical_words = set(word_list_osh) & set(word_list_eng)
+    for word in identical_words:
+        if len(word) > 3:
+            word_list_eng.remove(word)
+            word_list_osh.remove(word)
+    seeds = list()
+    eng_seeds = set()
+    osh_seeds = set()
+    for word in word_list_osh:
+        translation_candidates = all_translations.get(word)
+        if not translation_candidates:
+            continue
+        if available_translations := set(translation_candidates) & set(word_list_eng):
+            osh_seed = word
+            for eng_seed in available_translations:
+                if (
+                    osh_seed in word_list_osh
+                    and eng_seed in word_list_eng
+                    and osh_seed not in osh_seeds
+                    and eng_seed not in eng_seeds
+                ):
+                    eng_seeds.add(eng_seed)
+                    osh_seeds.add(osh_seed)
+                    seeds.append(
+                        [word_list_osh.index(osh_seed), word_list_eng.index(eng_seed)]
+                    )
+                    break
+    seed_list = [(x, y) for x, y in np.array(seeds)]
+    name_seed_list = []
+    for word in word_list_eng:
+        if word in word_list_osh and len(word) > 3:
+            x, y = word_list_osh.index(word), word_list_eng.index(word)
+            duplicate = False
+            for a, b in seed_list:
+                if x == a or y == b:
+                    duplicate = True
+            if not duplicate:
+                name_seed_list.append((x, y))
+    return seed_list, name_seed_list
+
+
+def indexed_seeding(
+    osh_words: List[str], eng_words: List[str], all_translations: Dict[str, List[str]]
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    word_list_osh, word_list_eng = remove_identical_words(osh_words, eng_words)
+    osh_index, eng_index = WordIndex(word_list_osh), WordIndex(word_list_eng)
+    seed_list = [(x, y) for x, y in get_seeds(osh_index, eng_index, all_translations)]
+    return seed_list, identical_word_seeds(osh_index, eng_index, seed_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the seeding stage.")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[3000, 10000, 50000],
+        help="Numbers of words per language",
+    )
+    parser.add_argument(
+        "--legacy_limit",
+        type=int,
+        default=10000,
+        help="Largest size that the quadratic original implementation is run on",
+    )
+    args = parser.parse_args()
+    for size in args.sizes:
+        osh_words, eng_words, all_translations = synthetic_data(size)
+        start = time.perf_counter()
+        seed_list, name_seed_list = indexed_seeding(
+            osh_words, eng_words, all_translations
+        )
+        indexed_time = time.perf_counter() - start
+        message = (
+            f"{size} words: {len(seed_list)} seeds, {len(name_seed_list)} name seeds, "
+            f"indexed {indexed_time:.3f}s"
+        )
+        if size <= args.legacy_limit:
+            start = time.perf_counter()
+            legacy_result = legacy_seeding(osh_words, eng_words, all_translations)
+            legacy_time = time.perf_counter() - start
+            message += (
+                f", original {legacy_time:.2f}s ({legacy_time / indexed_time:.0f}x)"
+            )
+            assert legacy_result == (seed_list, name_seed_list)
+        print(message)
+
+
+if __name__ == "__main__":
+    main()
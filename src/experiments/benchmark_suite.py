@@ -0,0 +1,409 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+from scipy.optimize import quadratic_assignment
+from scipy.stats import ortho_group
+
+from benchmark_seeds import random_words
+from caching import atomic_write_text
+from constants import EMBEDDING_DIMENSION
+from csls import procrustes_csls_top_k
+from evaluation import GoldPairs, hypothesis_metrics, ranking_metrics
+from graph_matching import get_seeds, normalize_embeddings
+from sparse_graph import dense_graph, graph_nbytes, top_k_similarity_graph
+from word_index import WordIndex, identical_word_seeds
+
+# Times the stages of the BLI pipeline on synthetic bilingual embeddings, so that performance work does not need
+# the corpora. The target embeddings are a rotated, noisy and permuted copy of a random point cloud, and a
+# dictionary with a planted set of correct translations gives the seeds. Every run is appended to a JSON history
+# file, and "compare" flags the stages that became slower than in an earlier run. The dense graphs are compared
+# with the top-k graphs of --graph_neighbours: their memory, the peak memory of building them and the time and
+# dev accuracy of the graph matching on them.
+
+SIZES = [1000, 3000, 10000, 20000]
+HISTORY_FILE = "benchmark-history.json"
+# The intrinsic dimension of the point cloud, so that Procrustes on a few hundred seeds recovers the rotation
+LATENT_DIMENSION = 32
+NOISE = 0.05
+DICTIONARY_COVERAGE = 0.2
+GRAPH_NEIGHBOURS = 100
+# The dense graphs take 2 * n * n * 8 bytes and the quadratic assignment is cubic, so both only run up to a size
+DENSE_GRAPH_LIMIT = 10000
+MATCHING_LIMIT = 3000
+MATCHING_ITERATIONS = 10
+REGRESSION_THRESHOLD = 0.1
+# Differences below this many seconds are noise and never count as regressions
+MIN_DIFFERENCE = 0.05
+
+
+def synthetic_bilingual_embeddings(
+    n: int,
+    dimension: int = EMBEDDING_DIMENSION,
+    noise: float = NOISE,
+    seed: int = 0,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns source embeddings x, target embeddings y and the permutation with y[permutation[i]] ~ x[i] @ R for
+    a random rotation R.
+    """
+    rng = np.random.default_rng(seed)
+    latent = rng.standard_normal((n, LATENT_DIMENSION))
+    x = latent @ rng.standard_normal((LATENT_DIMENSION, dimension))
+    x += 0.1 * np.sqrt(LATENT_DIMENSION) * rng.standard_normal((n, dimension))
+    rotation = ortho_group.rvs(dimension, random_state=rng)
+    y = x @ rotation
+    y += (
+        noise
+        * np.linalg.norm(y, axis=1).mean()
+        / np.sqrt(dimension)
+        * (rng.standard_normal((n, dimension)))
+    )
+    permutation = rng.permutation(n)
+    permuted_y = np.empty_like(y)
+    permuted_y[permutation] = y
+    return x.astype(np.float32), permuted_y.astype(np.float32), permutation
+
+
+def synthetic_dictionary(
+    n: int,
+    permutation: np.ndarray,
+    coverage: float = DICTIONARY_COVERAGE,
+    seed: int = 0,
+) -> Tuple[List[str], List[str], Dict[str, List[str]]]:
+    # A share of the source words has a dictionary entry, whose last candidate is the planted correct translation
+    rng = random.Random(seed)
+    osh_words = random_words(rng, n)
+    eng_words = random_words(rng, n)
+    all_translations = {}
+    for i in rng.sample(range(n), int(coverage * n)):
+        all_translations[osh_words[i]] = [
+            "".join(rng.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=5)),
+            eng_words[permutation[i]],
+        ]
+    return osh_words, eng_words, all_translations
+
+
+def best_time(repeats: int, function: Callable):
+    # The minimum over the repeats is the least disturbed by other processes
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def peak_memory(function: Callable) -> float:
+    # Peak of the memory that the function allocates, in MiB. NumPy reports its buffers to tracemalloc.
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def seeded_matching(
+    x_graph: np.ndarray, y_graph: np.ndarray, seeds: np.ndarray
+) -> np.ndarray:
+    # Seeded graph matching with SciPy's FAQ, in place of GOAT which is not part of this repository
+    return quadratic_assignment(
+        x_graph,
+        y_graph,
+        method="faq",
+        options=dict(
+            maximize=True,
+            partial_match=seeds,
+            maxiter=MATCHING_ITERATIONS,
+            rng=np.random.default_rng(0),
+            P0="barycenter",
+        ),
+    ).col_ind
+
+
+def run_size(
+    n: int,
+    repeats: int,
+    dimension: int = EMBEDDING_DIMENSION,
+    dense_graph_limit: int = DENSE_GRAPH_LIMIT,
+    matching_limit: int = MATCHING_LIMIT,
+    graph_neighbours: int = GRAPH_NEIGHBOURS,
+) -> Dict[str, Dict[str, float]]:
+    x, y, permutation = synthetic_bilingual_embeddings(n, dimension)
+    osh_words, eng_words, all_translations = synthetic_dictionary(n, permutation)
+    timings, metrics = {}, {}
+
+    timings["normalization"], (x, y) = best_time(
+        repeats,
+        lambda: (normalize_embeddings(x.copy()), normalize_embeddings(y.copy())),
+    )
+    if n <= dense_graph_limit:
+        # The graphs of load_embeddings_into_matrix without a cache
+        timings["graph_dense"], (x_graph, y_graph) = best_time(
+            repeats, lambda: (x @ x.T, y @ y.T)
+        )
+        metrics["graph_dense_mib"] = (x_graph.nbytes + y_graph.nbytes) / 2**20
+        metrics["graph_dense_peak_mib"] = peak_memory(lambda: (x @ x.T, y @ y.T))
+
+    def sparse_graphs():
+        return (
+            top_k_similarity_graph(x, graph_neighbours),
+            top_k_similarity_graph(y, graph_neighbours),
+        )
+
+    timings["graph_sparse"], (x_sparse_graph, y_sparse_graph) = best_time(
+        repeats, sparse_graphs
+    )
+    metrics["graph_sparse_mib"] = (
+        graph_nbytes(x_sparse_graph) + graph_nbytes(y_sparse_graph)
+    ) / 2**20
+    metrics["graph_sparse_peak_mib"] = peak_memory(sparse_graphs)
+
+    def extract_seeds():
+        osh_index, eng_index = WordIndex(osh_words), WordIndex(eng_words)
+        seed_list = [
+            (i, j) for i, j in get_seeds(osh_index, eng_index, all_translations)
+        ]
+        return seed_list + identical_word_seeds(osh_index, eng_index, seed_list)
+
+    timings["seed_extraction"], seed_list = best_time(repeats, extract_seeds)
+    seeds = np.array(seed_list, dtype=np.int64).reshape(-1, 2)
+    metrics["seeds"] = len(seeds)
+    metrics["seed_accuracy"] = float(np.mean(permutation[seeds[:, 0]] == seeds[:, 1]))
+    dev_sources = np.setdiff1d(np.arange(n), seeds[:, 0])
+    dev_gold = GoldPairs.from_pairs(
+        np.column_stack([dev_sources, permutation[dev_sources]]), n
+    )
+
+    if n <= min(matching_limit, dense_graph_limit):
+        timings["matching"], matching = best_time(
+            repeats, lambda: seeded_matching(x_graph, y_graph, seeds)
+        )
+        metrics["matching_accuracy"] = float(
+            np.mean(matching[dev_sources] == permutation[dev_sources])
+        )
+    if n <= matching_limit:
+        # The matching stage densifies the top-k graphs like run_goat_for_bli.py does for GOAT
+        timings["matching_sparse"], matching = best_time(
+            repeats,
+            lambda: seeded_matching(
+                dense_graph(x_sparse_graph), dense_graph(y_sparse_graph), seeds
+            ),
+        )
+        metrics["matching_accuracy_sparse"] = float(
+            np.mean(matching[dev_sources] == permutation[dev_sources])
+        )
+
+    timings["procrustes_csls"], (candidates, _) = best_time(
+        repeats,
+        lambda: procrustes_csls_top_k(x, y, seeds, 10, dev_gold.sources),
+    )
+
+    def evaluate():
+        hypotheses = np.column_stack([dev_gold.sources, candidates[:, 0]])
+        return {
+            **hypothesis_metrics(hypotheses, dev_gold),
+            **ranking_metrics(dev_gold.sources, candidates, dev_gold),
+        }
+
+    timings["evaluation"], evaluation = best_time(repeats, evaluate)
+    metrics.update(
+        {name: evaluation[name] for name in ["precision@1", "precision@10", "mrr"]}
+    )
+    return {"timings": timings, "metrics": metrics}
+
+
+def environment() -> Dict[str, str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def load_history(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare_runs(
+    baseline: dict,
+    current: dict,
+    threshold: float = REGRESSION_THRESHOLD,
+    min_difference: float = MIN_DIFFERENCE,
+) -> List[str]:
+    """
+    Prints the timings of every stage of both runs and returns the stages that are more than threshold slower
+    in the current run. A drop of a quality metric by more than 1 point also counts as a regression.
+    """
+    regressions = []
+    for size, result in current["results"].items():
+        if (baseline_result := baseline["results"].get(size)) is None:
+            continue
+        for name, seconds in result["timings"].items():
+            if (baseline_seconds := baseline_result["timings"].get(name)) is None:
+                continue
+            ratio = seconds / baseline_seconds if baseline_seconds else float("inf")
+            regression = (
+                ratio > 1 + threshold and seconds - baseline_seconds > min_difference
+            )
+            print(
+                f"{size:>6} {name:<16} {baseline_seconds:9.4f}s -> {seconds:9.4f}s "
+                f"({ratio:5.2f}x){'  REGRESSION' if regression else ''}"
+            )
+            if regression:
+                regressions.append(f"{size} {name}")
+        for name, value in result["metrics"].items():
+            baseline_value = baseline_result["metrics"].get(name)
+            if name in ("precision@1", "precision@10") and baseline_value is not None:
+                if value < baseline_value - 1:
+                    print(
+                        f"{size:>6} {name:<16} {baseline_value:.2f} -> {value:.2f}  REGRESSION"
+                    )
+                    regressions.append(f"{size} {name}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the BLI pipeline on synthetic embeddings."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument(
+        "--sizes", type=int, nargs="+", default=SIZES, help="Numbers of words"
+    )
+    run_parser.add_argument(
+        "--repeats", type=int, default=3, help="Runs per stage, the fastest counts"
+    )
+    run_parser.add_argument(
+        "--dimension", type=int, default=EMBEDDING_DIMENSION, help="Embedding size"
+    )
+    run_parser.add_argument(
+        "--dense_graph_limit",
+        type=int,
+        default=DENSE_GRAPH_LIMIT,
+        help="Largest size with dense graphs",
+    )
+    run_parser.add_argument(
+        "--matching_limit",
+        type=int,
+        default=MATCHING_LIMIT,
+        help="Largest size with graph matching",
+    )
+    run_parser.add_argument(
+        "--graph_neighbours",
+        type=int,
+        default=GRAPH_NEIGHBOURS,
+        help="Number of neighbours of the top-k graphs",
+    )
+    run_parser.add_argument(
+        "--label", type=str, default=None, help="Name of the run in the history"
+    )
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare two runs of the history"
+    )
+    compare_parser.add_argument(
+        "--baseline",
+        type=str,
+        default="-2",
+        help="Index or label of the baseline run, the second to last by default",
+    )
+    compare_parser.add_argument(
+        "--current",
+        type=str,
+        default="-1",
+        help="Index or label of the compared run, the last by default",
+    )
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="Relative slowdown that counts as a regression",
+    )
+    for subparser in (run_parser, compare_parser):
+        subparser.add_argument(
+            "--history", type=str, default=HISTORY_FILE, help="JSON history file"
+        )
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    if args.command == "run":
+        run = {
+            "label": args.label,
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "environment": environment(),
+            "configuration": {
+                "repeats": args.repeats,
+                "dimension": args.dimension,
+                "dense_graph_limit": args.dense_graph_limit,
+                "matching_limit": args.matching_limit,
+                "graph_neighbours": args.graph_neighbours,
+            },
+            "results": {},
+        }
+        for size in args.sizes:
+            result = run_size(
+                size,
+                args.repeats,
+                args.dimension,
+                args.dense_graph_limit,
+                args.matching_limit,
+                args.graph_neighbours,
+            )
+            run["results"][str(size)] = result
+            print(
+                f"{size} words: "
+                + ", ".join(
+                    f"{name} {seconds:.4f}s"
+                    for name, seconds in result["timings"].items()
+                )
+                + " | "
+                + ", ".join(
+                    f"{name} {value:.4g}" for name, value in result["metrics"].items()
+                ),
+                flush=True,
+            )
+        history.append(run)
+        atomic_write_text(args.history, json.dumps(history, indent=1))
+    else:
+
+        def select(key: str) -> dict:
+            labels = [run.get("label") for run in history]
+            return history[labels.index(key)] if key in labels else history[int(key)]
+
+        if len(history) < 2:
+            sys.exit(f"{args.history} needs at least two runs to compare")
+        baseline_run, current_run = select(args.baseline), select(args.current)
+        print(
+            f"{baseline_run['time']} ({baseline_run['environment']['commit']}) -> "
+            f"{current_run['time']} ({current_run['environment']['commit']})"
+        )
+        if regressions := compare_runs(baseline_run, current_run, args.threshold):
+            sys.exit(f"{len(regressions)} regressions: {', '.join(regressions)}")
+        print("No regressions")
@@ -0,0 +1,134 @@
+import re
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Literal, Union
+
+import numpy as np
+import sentencepiece as spm
+from scipy.sparse import csr_matrix
+from segtok.segmenter import split_single
+from segtok.tokenizer import split_contractions, word_tokenizer
+
+from embedding_files import has_binary_embeddings, load_binary_embeddings
+
+Pooling = Literal["first_last", "mean", "weighted"]
+
+# Characters that flair's Sentence removes before tokenizing
+_ZERO_WIDTH_CHARACTERS = ["\u200c", "\u200b", "\ufe0f", "\ufeff", "\u2028", "\u2029"]
+
+
+def _to_windows_1252(match: re.Match) -> str:
+    try:
+        return bytes([ord(match.group(0))]).decode("windows-1252")
+    except UnicodeDecodeError:
+        return ""
+
+
+def first_token(word: str) -> str:
+    """
+    The first token of flair's Sentence(word), which is the token that flair embeds for a word, e.g. "do" for
+    "don't" or "abc" for "abc.". The word is cleaned and tokenized with segtok like flair's SegtokTokenizer.
+    Returns an empty string if the word has no tokens.
+    """
+    if word.isascii() and word.isalnum():
+        # segtok never splits ASCII letters and digits, which saves tokenizing most words
+        return word
+    for character in _ZERO_WIDTH_CHARACTERS:
+        word = word.replace(character, "")
+    word = re.sub(r"[\u0080-\u0099]", _to_windows_1252, word)
+    for sentence in split_single(word):
+        for token in split_contractions(word_tokenizer(sentence)):
+            if token:
+                return token
+    return ""
+
+
+def load_ordered_embeddings(embedding_file_path: Union[str, Path]) -> np.ndarray:
+    # The rows of the ordered embedding files follow the ids of the SentencePiece vocabulary
+    if has_binary_embeddings(embedding_file_path):
+        return load_binary_embeddings(embedding_file_path)[1]
+    with open(embedding_file_path, "r", encoding="utf-8") as file:
+        rows, dimension = map(int, file.readline().split())
+        return np.loadtxt(
+            file,
+            dtype=np.float32,
+            delimiter=" ",
+            comments=None,
+            usecols=range(1, dimension + 1),
+            ndmin=2,
+        ).reshape(rows, dimension)
+
+
+class NumpyBytePairEmbeddings:
+    """
+    Byte pair embeddings without flair and torch. The pooling options reproduce flair's BytePairEmbeddings:
+    - first_last: the concatenation of the first and last sub-word embedding (unpatched flair)
+    - mean: the mean of the first and last sub-word embedding (mean patch from the README)
+    - weighted: all sub-word embeddings weighted by their length (weighted patch from the README)
+    """
+
+    def __init__(
+        self,
+        model_file_path: Union[str, Path],
+        embedding_file_path: Union[str, Path],
+    ):
+        self.sp = spm.SentencePieceProcessor(model_file=str(model_file_path))
+        self.vectors = load_ordered_embeddings(embedding_file_path)
+        if len(self.vectors) != self.sp.vocab_size():
+            raise ValueError(
+                f"{embedding_file_path} has {len(self.vectors)} embeddings, but the vocabulary of "
+                f"{model_file_path} has {self.sp.vocab_size()} pieces"
+            )
+
+    @property
+    def embedding_length(self) -> Dict[Pooling, int]:
+        dimension = self.vectors.shape[1]
+        return {"first_last": 2 * dimension, "mean": dimension, "weighted": dimension}
+
+    def embed(self, word_list: List[str], pooling: Pooling = "weighted") -> np.ndarray:
+        """
+        Embeds the first token of every word, like flair's Sentence(word)[0]. Words without a token, e.g. empty or
+        whitespace-only words, get zero vectors like flair's empty tokens.
+        """
+        if pooling not in self.embedding_length:
+            raise ValueError(f"Unknown pooling: {pooling}")
+        tokens = [first_token(word).lower() for word in word_list]
+        embedded = [i for i, token in enumerate(tokens) if token]
+        embeddings = np.zeros(
+            (len(word_list), self.embedding_length[pooling]), dtype=np.float32
+        )
+        if embedded:
+            embeddings[embedded] = self._pool([tokens[i] for i in embedded], pooling)
+        return embeddings
+
+    def _pool(self, tokens: List[str], pooling: Pooling) -> np.ndarray:
+        ids = self.sp.encode(tokens, out_type=int)
+        lengths = np.fromiter(map(len, ids), dtype=np.int64, count=len(ids))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        flat_ids = np.fromiter(
+            chain.from_iterable(ids), dtype=np.int64, count=offsets[-1]
+        )
+        first = self.vectors[flat_ids[offsets[:-1]]]
+        last = self.vectors[flat_ids[offsets[1:] - 1]]
+        if pooling == "first_last":
+            return np.hstack([first, last])
+        if pooling == "mean":
+            return (first + last) / np.float32(2)
+        # The weights are taken from the pieces, since unknown characters keep their surface form there
+        weights = np.fromiter(
+            (
+                len(piece) - piece.count("▁")
+                for piece in chain.from_iterable(self.sp.encode(tokens, out_type=str))
+            ),
+            dtype=np.float32,
+            count=offsets[-1],
+        )
+        # Pooling all words at once is a single sparse (words x vocabulary) times dense product
+        pooling_matrix = csr_matrix(
+            (weights, flat_ids, offsets), shape=(len(tokens), len(self.vectors))
+        )
+        return (
+            pooling_matrix
+            @ self.vectors
+            / np.add.reduceat(weights, offsets[:-1])[:, None]
+        )
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+
+from constants import CACHE_DIR
+
+# Upper bound for the disk space used by each namespace of cached arrays
+CACHE_SIZE_LIMIT = 32 * 2**30
+
+_HASH_BLOCK_SIZE = 1 << 20
+
+
+def cache_path(*parts: str) -> Path:
+    path = Path(CACHE_DIR).joinpath(*parts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def atomic_write_text(path: Union[str, Path], content: str) -> None:
+    # Write to a temporary file first, so that concurrent runs never see half written files
+    tmp_path = Path(f"{path}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+def file_digest(path: Union[str, Path]) -> str:
+    """
+    Computes the content hash of a file. The hash is remembered together with the size and modification time
+    of the file, so unchanged files are only read once.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    memo_file = cache_path("digests.json")
+    try:
+        with open(memo_file, "r", encoding="utf-8") as file:
+            memo = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        memo = {}
+    if (entry := memo.get(str(path))) and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+        return entry[2]
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        while block := file.read(_HASH_BLOCK_SIZE):
+            hasher.update(block)
+    memo[str(path)] = [stat.st_size, stat.st_mtime_ns, hasher.hexdigest()]
+    atomic_write_text(memo_file, json.dumps(memo))
+    return hasher.hexdigest()
+
+
+def cache_key(*parts) -> str:
+    return hashlib.blake2b(
+        json.dumps(parts, ensure_ascii=False).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def array_digest(*arrays: np.ndarray) -> str:
+    # The content hash of arrays, including their shapes and dtypes
+    hasher = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        hasher.update(json.dumps([array.shape, array.dtype.str]).encode("utf-8"))
+        hasher.update(array.data)
+    return hasher.hexdigest()
+
+
+def load_cached_arrays(
+    namespace: str, key: str, mmap_mode: Optional[str] = "c"
+) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Loads all arrays stored under the key. By default, the arrays are memory-mapped copy-on-write, so that
+    processes share the pages of the cache file until they write to an array.
+    """
+    entry = cache_path(namespace, key)
+    if not entry.is_dir():
+        return None
+    # The modification time of an entry marks its last use for the LRU eviction
+    os.utime(entry)
+    return {
+        array_file.stem: np.load(array_file, mmap_mode=mmap_mode)
+        for array_file in entry.glob("*.npy")
+    }
+
+
+def store_cached_arrays(
+    namespace: str,
+    key: str,
+    arrays: Dict[str, np.ndarray],
+    size_limit: int = CACHE_SIZE_LIMIT,
+) -> Dict[str, np.ndarray]:
+    entry = cache_path(namespace, key)
+    if sum(array.nbytes for array in arrays.values()) > size_limit:
+        return arrays
+    tmp_entry = Path(f"{entry}.{os.getpid()}.tmp")
+    tmp_entry.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(tmp_entry / f"{name}.npy", array)
+    try:
+        os.replace(tmp_entry, entry)
+    except OSError:
+        # Another process has stored the same entry in the meantime
+        shutil.rmtree(tmp_entry)
+    evict_least_recently_used(namespace, size_limit)
+    return load_cached_arrays(namespace, key) or arrays
+
+
+def build_cached_array(
+    namespace: str,
+    key: str,
+    name: str,
+    build: Callable[[Path], None],
+    size_limit: int = CACHE_SIZE_LIMIT,
+) -> np.ndarray:
+    """
+    Like store_cached_arrays for a single array that does not fit into memory. build writes the .npy file at
+    the given path, e.g. block by block, and the array is returned memory-mapped copy-on-write.
+    """
+    if (cached := load_cached_arrays(namespace, key)) is not None:
+        return cached[name]
+    entry = cache_path(namespace, key)
+    tmp_entry = Path(f"{entry}.{os.getpid()}.tmp")
+    tmp_entry.mkdir(parents=True, exist_ok=True)
+    build(tmp_entry / f"{name}.npy")
+    try:
+        os.replace(tmp_entry, entry)
+    except OSError:
+        shutil.rmtree(tmp_entry)
+    # The new entry is kept, even if it is larger than the size limit on its own
+    evict_least_recently_used(namespace, size_limit, keep=entry)
+    return np.load(entry / f"{name}.npy", mmap_mode="c")
+
+
+def evict_least_recently_used(
+    namespace: str, size_limit: int = CACHE_SIZE_LIMIT, keep: Optional[Path] = None
+):
+    directory = Path(CACHE_DIR) / namespace
+    entries = sorted(
+        (
+            entry
+            for entry in directory.iterdir()
+            if entry.is_dir() and entry.suffix != ".tmp"
+        ),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    total_size = 0
+    for entry in entries:
+        total_size += sum(file.stat().st_size for file in entry.iterdir())
+        if total_size > size_limit and entry != keep:
+            shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,80 @@
+import os
+import random
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from constants import CACHE_DIR
+
+
+def checkpoint_dir(*run_parameters) -> Path:
+    directory = Path(CACHE_DIR) / "checkpoints" / "-".join(map(str, run_parameters))
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def remove_checkpoints(directory: Path):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def clear_checkpoints(directory: Path):
+    remove_checkpoints(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+
+def save_checkpoint(path: Union[str, Path], **arrays: np.ndarray):
+    # Uncompressed .npz files are written in a few milliseconds, even for large hypothesis sets
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: Union[str, Path]) -> Optional[Dict[str, np.ndarray]]:
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as checkpoint:
+        return dict(checkpoint)
+
+
+def pairs_to_array(pairs: Iterable[Tuple[int, int]]) -> np.ndarray:
+    return np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+
+
+def array_to_pairs(array: np.ndarray) -> List[Tuple[int, int]]:
+    return [(x, y) for x, y in array.tolist()]
+
+
+def get_rng_state() -> Dict[str, np.ndarray]:
+    # The global generators are part of the state, so that a resumed trial continues with the same draws
+    _, keys, position, has_gauss, cached_gaussian = np.random.get_state()
+    _, python_state, gauss_next = random.getstate()
+    return {
+        "numpy_keys": keys,
+        "numpy_position": np.array([position, has_gauss]),
+        "numpy_gaussian": np.array(cached_gaussian),
+        "python_state": np.array(python_state, dtype=np.uint64),
+        "python_gaussian": np.array(np.nan if gauss_next is None else gauss_next),
+    }
+
+
+def set_rng_state(state: Dict[str, np.ndarray]):
+    position, has_gauss = state["numpy_position"].tolist()
+    np.random.set_state(
+        (
+            "MT19937",
+            state["numpy_keys"],
+            position,
+            has_gauss,
+            float(state["numpy_gaussian"]),
+        )
+    )
+    gauss_next = float(state["python_gaussian"])
+    random.setstate(
+        (
+            3,
+            tuple(int(value) for value in state["python_state"]),
+            None if np.isnan(gauss_next) else gauss_next,
+        )
+    )
@@ -0,0 +1,193 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+# A compact dictionary file starts with the magic bytes and the length of a JSON header, which gives the offset,
+# dtype and shape of every array. The arrays follow aligned to 64 bytes, so they can be memory-mapped in place.
+COMPACT_DICTIONARY_SUFFIX = ".bdict"
+_MAGIC = b"BDICT1\n"
+_HEADER_LENGTH = np.dtype("<u8")
+_ALIGNMENT = 64
+
+
+def encode_strings(words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    # Every string is stored once as UTF-8 bytes, the i-th string is data[offsets[i] : offsets[i + 1]]
+    encoded_words = [word.encode("utf-8") for word in words]
+    offsets = np.zeros(len(words) + 1, dtype=np.int64)
+    np.cumsum([len(word) for word in encoded_words], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded_words), dtype=np.uint8), offsets
+
+
+def decode_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    encoded_words = data.tobytes()
+    offsets = offsets.tolist()
+    return [
+        encoded_words[start:end].decode("utf-8")
+        for start, end in zip(offsets[:-1], offsets[1:])
+    ]
+
+
+@dataclass
+class CompactDictionary:
+    """
+    Array-backed dictionary: the sorted ids of the source words with translations, CSR offsets into the ids
+    of their translations, optional scores and the string tables of both word lists. order gives the position
+    of every source in the order it first appeared in the hypotheses, which the JSON export keeps.
+    """
+
+    sources: np.ndarray
+    offsets: np.ndarray
+    targets: np.ndarray
+    order: np.ndarray
+    source_data: np.ndarray
+    source_offsets: np.ndarray
+    target_data: np.ndarray
+    target_offsets: np.ndarray
+    scores: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_pairs(
+        cls,
+        pairs: np.ndarray,
+        source_words: List[str],
+        target_words: List[str],
+        scores: Optional[np.ndarray] = None,
+    ) -> "CompactDictionary":
+        """
+        Builds the dictionary from (source id, target id) pairs in ranked order. Like match_translations, pairs
+        whose target word is empty or whose target id is not in target_words are skipped, and the translations of
+        every source keep their order. Pairs with a source id outside of source_words are skipped as well.
+        """
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        source_data, source_offsets = encode_strings(source_words)
+        target_data, target_offsets = encode_strings(target_words)
+        keep = (
+            (pairs[:, 0] >= 0)
+            & (pairs[:, 0] < len(source_words))
+            & (pairs[:, 1] >= 0)
+            & (pairs[:, 1] < len(target_words))
+        )
+        keep[keep] = np.diff(target_offsets)[pairs[keep, 1]] > 0
+        pairs = pairs[keep]
+        # The stable sort groups the pairs by source and keeps their ranking within every source
+        by_source = np.argsort(pairs[:, 0], kind="stable")
+        sources, first_pairs, counts = np.unique(
+            pairs[by_source, 0], return_index=True, return_counts=True
+        )
+        offsets = np.zeros(len(sources) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(
+            sources,
+            offsets,
+            pairs[by_source, 1],
+            np.argsort(by_source[first_pairs], kind="stable"),
+            source_data,
+            source_offsets,
+            target_data,
+            target_offsets,
+            (
+                None
+                if scores is None
+                else np.asarray(scores, dtype=np.float32)[keep][by_source]
+            ),
+        )
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def save(self, path: Union[str, Path]):
+        arrays = {
+            name: array for name, array in vars(self).items() if array is not None
+        }
+        header = {}
+        position = 0
+        for name, array in arrays.items():
+            header[name] = [position, array.dtype.str, list(array.shape)]
+            position += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        encoded_header = json.dumps(header).encode("utf-8")
+        start = len(_MAGIC) + _HEADER_LENGTH.itemsize + len(encoded_header)
+        start = -(-start // _ALIGNMENT) * _ALIGNMENT
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(_MAGIC)
+            file.write(np.array([len(encoded_header)], dtype=_HEADER_LENGTH).tobytes())
+            file.write(encoded_header)
+            for name, array in arrays.items():
+                file.seek(start + header[name][0])
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.truncate(start + position)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "CompactDictionary":
+        # Nothing is copied or decoded, the arrays are views of the memory-mapped file
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        if buffer[: len(_MAGIC)].tobytes() != _MAGIC:
+            raise ValueError(f"{path} is not a compact dictionary")
+        header_start = len(_MAGIC) + _HEADER_LENGTH.itemsize
+        header_length = int(buffer[len(_MAGIC) : header_start].view(_HEADER_LENGTH)[0])
+        header = json.loads(
+            buffer[header_start : header_start + header_length].tobytes()
+        )
+        start = -(-(header_start + header_length) // _ALIGNMENT) * _ALIGNMENT
+        arrays = {}
+        for name, (offset, dtype, shape) in header.items():
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape))
+            arrays[name] = (
+                buffer[start + offset : start + offset + count * dtype.itemsize]
+                .view(dtype)
+                .reshape(shape)
+            )
+        return cls(**arrays)
+
+    def _word(self, data: np.ndarray, offsets: np.ndarray, index: int) -> str:
+        return data[offsets[index] : offsets[index + 1]].tobytes().decode("utf-8")
+
+    def source_word(self, source: int) -> str:
+        return self._word(self.source_data, self.source_offsets, source)
+
+    def target_word(self, target: int) -> str:
+        return self._word(self.target_data, self.target_offsets, target)
+
+    def translation_ids(self, source: int) -> np.ndarray:
+        position = np.searchsorted(self.sources, source)
+        if position == len(self.sources) or self.sources[position] != source:
+            return self.targets[:0]
+        return self.targets[self.offsets[position] : self.offsets[position + 1]]
+
+    def translations(self, source: int) -> List[str]:
+        return [
+            self.target_word(target) for target in self.translation_ids(source).tolist()
+        ]
+
+    def items(self) -> Iterator[Tuple[str, List[str]]]:
+        # The entries in the order of the hypotheses, like the dictionaries of match_translations
+        target_words = decode_strings(self.target_data, self.target_offsets)
+        sources, offsets, targets = (
+            self.sources.tolist(),
+            self.offsets.tolist(),
+            self.targets.tolist(),
+        )
+        for position in self.order.tolist():
+            yield self.source_word(sources[position]), [
+                target_words[target]
+                for target in targets[offsets[position] : offsets[position + 1]]
+            ]
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return dict(self.items())
+
+    def write_json(self, path: Union[str, Path]):
+        # Streams the entries, the output is the same as json.dumps of the dictionary from match_translations
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("{")
+            for number, (word, translations) in enumerate(self.items()):
+                if number:
+                    file.write(", ")
+                file.write(f"{json.dumps(word)}: {json.dumps(translations)}")
+            file.write("}")
@@ -10,3 +10,5 @@ SRC='de'
 TRG='en'
 CORPUS_TYPE='extended'
 END_PROC=True
+CACHE_DIR='.cache'
+POOLING='weighted'
@@ -0,0 +1,70 @@
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Defaults for stopping the alternation of GOAT and Procrustes, see ConvergenceMonitor. Early stopping is off by
+# default, so that every trial runs all NUM_ITERATIONS iterations of the published protocol.
+CONVERGENCE_TOLERANCE = 0.001
+CONVERGENCE_PATIENCE = 0
+
+
+@dataclass(frozen=True)
+class EarlyStopping:
+    # Largest change 1 - Jaccard(previous, current) of the hypotheses that counts as converged
+    tolerance: float = CONVERGENCE_TOLERANCE
+    # Number of consecutive converged iterations after which the trial stops, 0 never stops early
+    patience: int = CONVERGENCE_PATIENCE
+    # If set, the dev precision must not change by more than this many percentage points either
+    precision_tolerance: Optional[float] = None
+
+
+def hypothesis_keys(hypotheses: Iterable[Tuple[int, int]]) -> np.ndarray:
+    pairs = np.array(list(hypotheses), dtype=np.int64).reshape(-1, 2)
+    # The pairs are packed into one integer each, the indices are far below 2^31
+    return np.unique((pairs[:, 0] << 32) | pairs[:, 1])
+
+
+def jaccard_change(previous: np.ndarray, current: np.ndarray) -> float:
+    union = len(previous) + len(current)
+    if union == 0:
+        return 0.0
+    intersection = len(np.intersect1d(previous, current, assume_unique=True))
+    return 1 - intersection / (union - intersection)
+
+
+@dataclass
+class ConvergenceMonitor:
+    """
+    Tracks how much the hypotheses change from one iteration to the next. The alternation has converged once
+    the change stayed within the tolerance for patience consecutive iterations.
+    """
+
+    early_stopping: EarlyStopping = field(default_factory=EarlyStopping)
+    previous_keys: Optional[np.ndarray] = None
+    previous_precision: Optional[float] = None
+    stable_iterations: int = 0
+    changes: List[float] = field(default_factory=list)
+
+    @property
+    def converged(self) -> bool:
+        return 0 < self.early_stopping.patience <= self.stable_iterations
+
+    def update(
+        self, hypotheses: Iterable[Tuple[int, int]], precision: Optional[float] = None
+    ) -> bool:
+        keys = hypothesis_keys(hypotheses)
+        if self.previous_keys is not None:
+            change = jaccard_change(self.previous_keys, keys)
+            self.changes.append(change)
+            stable = change <= self.early_stopping.tolerance
+            if self.early_stopping.precision_tolerance is not None:
+                stable &= (
+                    precision is not None
+                    and self.previous_precision is not None
+                    and abs(precision - self.previous_precision)
+                    <= self.early_stopping.precision_tolerance
+                )
+            self.stable_iterations = self.stable_iterations + 1 if stable else 0
+        self.previous_keys, self.previous_precision = keys, precision
+        return self.converged
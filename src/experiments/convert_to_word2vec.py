@@ -7,6 +7,7 @@ from flair.embeddings import BytePairEmbeddings as BPE
 from flair.embeddings import WordEmbeddings as WordEmb
 
 from constants import EMBEDDING_DIMENSION
+from embedding_files import save_binary_embeddings
 from graph_matching import word_order_by_frequency
 
 lang = "swa"
@@ -51,3 +52,6 @@ with open(f"{lang}.word2vec", "w") as file:
     file.write("3000 300\n")
     for i in range(0, len(embeddings_column)):
         file.write(f"{word_list[i]} {' '.join(map(str, embeddings_column[i]))}\n")
+
+# The binary copy is memory-mapped by gh-python-3.py and evs-python-3.py instead of parsing the text file
+save_binary_embeddings(f"{lang}.word2vec", word_list, np.stack(embeddings_column.values))
@@ -0,0 +1,152 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional, Tuple
+
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+# Number of nearest neighbours whose mean similarity is subtracted by CSLS (Conneau et al. 2018)
+CSLS_NEIGHBOURHOOD = 10
+# Upper bound for the similarity blocks that are in memory at the same time, in bytes
+CSLS_MEMORY_BUDGET = 2**30
+
+
+def _chunked(
+    n: int,
+    row_bytes: int,
+    threads: Optional[int],
+    memory_budget: int,
+    process_chunk: Callable[[int, int], None],
+):
+    # row_bytes is the memory that one thread needs per row of its chunk, including all temporary copies of the
+    # similarity block, so that the chunks of all threads together fit into the budget
+    threads = threads or os.cpu_count() or 1
+    chunk_size = max(1, memory_budget // (threads * row_bytes))
+    starts = range(0, n, chunk_size)
+    with threadpool_limits(limits=1 if threads > 1 else None):
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(lambda start: process_chunk(start, chunk_size), starts))
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    # argpartition finds the k best columns in linear time, only those are sorted. Partitioning for the last k
+    # columns instead of negating the scores avoids a copy of the block.
+    k = min(k, scores.shape[1])
+    columns = np.argpartition(scores, -k, axis=1)[:, -k:]
+    top_scores = np.take_along_axis(scores, columns, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(columns, order, axis=1),
+        np.take_along_axis(top_scores, order, axis=1),
+    )
+
+
+def neighbourhood_means(
+    x: np.ndarray,
+    y: np.ndarray,
+    neighbourhood: int = CSLS_NEIGHBOURHOOD,
+    threads: Optional[int] = None,
+    memory_budget: int = CSLS_MEMORY_BUDGET,
+) -> np.ndarray:
+    """Mean similarity of every row of x to its neighbourhood nearest rows of y."""
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    means = np.empty(len(x), dtype=np.float32)
+    neighbourhood = min(neighbourhood, len(y))
+
+    def process_chunk(start: int, chunk_size: int):
+        similarities = x[start : start + chunk_size] @ y.T
+        # Partitioning in place keeps a single block per thread
+        similarities.partition(-neighbourhood, axis=1)
+        means[start : start + chunk_size] = similarities[:, -neighbourhood:].mean(
+            axis=1
+        )
+
+    _chunked(len(x), 4 * len(y), threads, memory_budget, process_chunk)
+    return means
+
+
+def csls_top_k(
+    x: np.ndarray,
+    y: np.ndarray,
+    k: int = 10,
+    neighbourhood: int = CSLS_NEIGHBOURHOOD,
+    threads: Optional[int] = None,
+    memory_budget: int = CSLS_MEMORY_BUDGET,
+    sources: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the k best translations of every row of x among the rows of y by CSLS
+    2 cos(x, y) - r_y(x) - r_x(y). The rows have to be normalized and x mapped into the space of y. The source
+    rows are processed in chunks on several threads in float32, so that the similarity blocks stay within the
+    memory budget. Returns the (len(x), k) candidates and their scores, best first. With sources, only these
+    rows of x are translated, while r_x(y) still uses all rows.
+    """
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    # The target side penalty is the same for all source rows and is computed once
+    target_means = neighbourhood_means(y, x, neighbourhood, threads, memory_budget)
+    if sources is not None:
+        x = x[sources]
+    k = min(k, len(y))
+    candidates = np.empty((len(x), k), dtype=np.int64)
+    scores = np.empty((len(x), k), dtype=np.float32)
+    neighbourhood = min(neighbourhood, len(y))
+
+    def process_chunk(start: int, chunk_size: int):
+        similarities = x[start : start + chunk_size] @ y.T
+        source_means = np.partition(similarities, -neighbourhood, axis=1)[
+            :, -neighbourhood:
+        ].mean(axis=1)
+        similarities *= 2
+        similarities -= target_means
+        similarities -= source_means[:, None]
+        (
+            candidates[start : start + chunk_size],
+            scores[start : start + chunk_size],
+        ) = top_k_rows(similarities, k)
+
+    # Besides the float32 block, a thread holds either its partitioned copy or the int64 column indices of
+    # argpartition in top_k_rows, i.e. up to three times the block
+    _chunked(len(x), 3 * 4 * len(y), threads, memory_budget, process_chunk)
+    return candidates, scores
+
+
+def procrustes(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    # Orthogonal W that minimizes ||x W - y||, for the embeddings of the pairs of a dictionary
+    u, _, vt = np.linalg.svd(x.T @ y)
+    return u @ vt
+
+
+def procrustes_csls_top_k(
+    x: np.ndarray,
+    y: np.ndarray,
+    pairs: np.ndarray,
+    k: int = 10,
+    sources: Optional[np.ndarray] = None,
+    threads: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Maps x with Procrustes on the (source, target) pairs of a dictionary and translates it by CSLS
+    mapping = procrustes(x[pairs[:, 0]], y[pairs[:, 1]])
+    return csls_top_k(x @ mapping, y, k, threads=threads, sources=sources)
+
+
+def ranked_pairs(
+    candidates: np.ndarray,
+    scores: np.ndarray,
+    sources: Optional[Iterable[int]] = None,
+) -> np.ndarray:
+    """
+    Turns the top-k candidates into (source, target) pairs for match_translations. The sources are ordered by
+    the score of their best candidate, and the candidates of every source follow in order.
+    """
+    sources = (
+        np.arange(len(candidates))
+        if sources is None
+        else np.fromiter(sources, dtype=np.int64)
+    )
+    sources = sources[np.argsort(-scores[sources, 0], kind="stable")]
+    k = candidates.shape[1]
+    return np.column_stack([np.repeat(sources, k), candidates[sources].ravel()]).astype(
+        np.int64
+    )
@@ -0,0 +1,276 @@
+import argparse
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+from compact_dictionary import COMPACT_DICTIONARY_SUFFIX, CompactDictionary
+
+# Noun class prefixes of Oshindonga and Oshikwanyama, longest first, so that oshi- is stripped before o-
+NOUN_CLASS_PREFIXES = (
+    "oshi",
+    "omu",
+    "omi",
+    "oma",
+    "olu",
+    "oku",
+    "oka",
+    "ova",
+    "aa",
+    "ii",
+    "oi",
+    "ou",
+    "uu",
+    "on",
+    "om",
+    "e",
+)
+MIN_STEM_LENGTH = 2
+DEFAULT_PREFIX_LIMIT = 20
+
+
+def parse_limit(limit: Any) -> Optional[int]:
+    # The number of translations per word of a request, None for all of them
+    if limit is None:
+        return None
+    if isinstance(limit, int) and not isinstance(limit, bool) and limit >= 0:
+        return limit
+    raise ValueError(f"limit must be a non-negative integer, not {limit!r}")
+
+
+def parse_words(words: Any) -> List[str]:
+    if isinstance(words, list) and all(isinstance(word, str) for word in words):
+        return words
+    raise ValueError(f"words must be a list of strings, not {words!r}")
+
+
+def stem(word: str) -> str:
+    # Words of the same stem in different noun classes, e.g. omuntu and aantu, share their entry in the stem index
+    for prefix in NOUN_CLASS_PREFIXES:
+        if word.startswith(prefix) and len(word) - len(prefix) >= MIN_STEM_LENGTH:
+            return word[len(prefix) :]
+    return word
+
+
+class DictionaryIndex:
+    """
+    Read-only in-memory index of an induced dictionary: a hash map from words to their ranked translations,
+    the sorted words for prefix queries and the words grouped by their noun class stem.
+    """
+
+    def __init__(self, dictionary: Dict[str, List[str]], source: str = ""):
+        self.source = source
+        self.translations = dictionary
+        self.sorted_words = sorted(dictionary)
+        stems = defaultdict(list)
+        for word in self.sorted_words:
+            stems[stem(word)].append(word)
+        self.stems = dict(stems)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "DictionaryIndex":
+        if Path(path).suffix == COMPACT_DICTIONARY_SUFFIX:
+            return cls(CompactDictionary.load(path).to_dict(), str(path))
+        with open(path, "r", encoding="utf-8") as file:
+            return cls(json.load(file), str(path))
+
+    def __len__(self) -> int:
+        return len(self.translations)
+
+    def lookup(self, word: str, limit: Optional[int] = None) -> List[str]:
+        return self.translations.get(word, [])[:limit]
+
+    def lookup_batch(
+        self, words: List[str], limit: Optional[int] = None
+    ) -> Dict[str, List[str]]:
+        return {word: self.lookup(word, limit) for word in words}
+
+    def words_with_prefix(
+        self, prefix: str, limit: int = DEFAULT_PREFIX_LIMIT
+    ) -> List[str]:
+        start = bisect_left(self.sorted_words, prefix)
+        words = []
+        for word in self.sorted_words[start : start + limit]:
+            if not word.startswith(prefix):
+                break
+            words.append(word)
+        return words
+
+    def same_stem(self, word: str) -> List[str]:
+        return self.stems.get(stem(word), [])
+
+
+class DictionaryService:
+    """
+    Serves the current DictionaryIndex. A reload builds the new index completely before it replaces the old one
+    with a single assignment, so requests are answered without interruption and never see a partial index. Only
+    the file the service was started with is ever reloaded, so clients cannot make it read other files.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.index = DictionaryIndex.from_file(self.path)
+        self._modified = self.path.stat().st_mtime_ns
+        self._reload_lock = threading.Lock()
+
+    def reload(self) -> DictionaryIndex:
+        with self._reload_lock:
+            modified = self.path.stat().st_mtime_ns
+            index = DictionaryIndex.from_file(self.path)
+            self._modified, self.index = modified, index
+            return index
+
+    def watch(self, interval: float = 1.0):
+        # Reloads the dictionary whenever its file is replaced, e.g. by a new run of run_goat_for_bli.py
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.path.stat().st_mtime_ns != self._modified:
+                        self.reload()
+                        print(f"Reloaded {self.path} with {len(self.index)} words")
+                except (OSError, ValueError) as error:
+                    print(f"Could not reload {self.path}: {error}")
+
+        threading.Thread(target=poll, daemon=True).start()
+
+
+class DictionaryRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET /lookup?word=a&word=b&limit=10, POST /lookup with {"words": [...], "limit": 10},
+    GET /prefix?prefix=om&limit=20, GET /stem?word=omuntu, GET /health and POST /reload. Malformed requests are
+    answered with 400.
+    """
+
+    service: DictionaryService
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which Nagle's algorithm would delay by a round trip
+    disable_nagle_algorithm = True
+
+    def _send_json(self, content, status: int = 200):
+        body = json.dumps(content, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(request, dict):
+            raise ValueError("The request must be a JSON object")
+        return request
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            limit = query.get("limit", [None])[0]
+            limit = parse_limit(int(limit) if limit and limit.isdecimal() else limit)
+        except ValueError as error:
+            self._send_json({"error": str(error)}, 400)
+            return
+        # Every request works on one index, even if the service is reloaded in the meantime
+        index = self.service.index
+        if url.path == "/lookup":
+            self._send_json(index.lookup_batch(query.get("word", []), limit))
+        elif url.path == "/prefix":
+            self._send_json(
+                index.words_with_prefix(
+                    query.get("prefix", [""])[0],
+                    DEFAULT_PREFIX_LIMIT if limit is None else limit,
+                )
+            )
+        elif url.path == "/stem":
+            self._send_json(
+                {word: index.same_stem(word) for word in query.get("word", [])}
+            )
+        elif url.path == "/health":
+            self._send_json({"dictionary": index.source, "words": len(index)})
+        else:
+            self._send_json({"error": f"Unknown path {url.path}"}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            request = self._read_json()
+            if url.path == "/lookup":
+                words = parse_words(request.get("words", []))
+                limit = parse_limit(request.get("limit"))
+        except ValueError as error:
+            self._send_json({"error": str(error)}, 400)
+            return
+        if url.path == "/lookup":
+            self._send_json(self.service.index.lookup_batch(words, limit))
+        elif url.path == "/reload":
+            try:
+                index = self.service.reload()
+            except (OSError, ValueError) as error:
+                self._send_json({"error": str(error)}, 400)
+                return
+            self._send_json({"dictionary": index.source, "words": len(index)})
+        else:
+            self._send_json({"error": f"Unknown path {url.path}"}, 404)
+
+    def log_message(self, format, *args):
+        # Logging every request would dominate the latency
+        pass
+
+
+def make_server(
+    service: DictionaryService, host: str = "127.0.0.1", port: int = 8000
+) -> ThreadingHTTPServer:
+    handler = type(
+        "BoundDictionaryRequestHandler",
+        (DictionaryRequestHandler,),
+        {"service": service},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Look up words in induced dictionaries."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Serve a dictionary over HTTP")
+    serve_parser.add_argument("dictionary", type=str, help="Dictionary JSON file")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1", help="Host")
+    serve_parser.add_argument("--port", type=int, default=8000, help="Port")
+    serve_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Reload the dictionary when its file changes",
+    )
+    lookup_parser = subparsers.add_parser("lookup", help="Look up words once")
+    lookup_parser.add_argument("dictionary", type=str, help="Dictionary JSON file")
+    lookup_parser.add_argument("words", type=str, nargs="+", help="Words to look up")
+    lookup_parser.add_argument(
+        "--limit", type=int, default=None, help="Number of translations per word"
+    )
+    args = parser.parse_args()
+
+    if args.command == "lookup":
+        dictionary_index = DictionaryIndex.from_file(args.dictionary)
+        for word, translations in dictionary_index.lookup_batch(
+            args.words, args.limit
+        ).items():
+            print(f"{word}\t{', '.join(translations)}")
+    else:
+        dictionary_service = DictionaryService(args.dictionary)
+        if args.watch:
+            dictionary_service.watch()
+        with make_server(dictionary_service, args.host, args.port) as http_server:
+            print(
+                f"Serving {len(dictionary_service.index)} words from {args.dictionary} "
+                f"on http://{args.host}:{args.port}"
+            )
+            http_server.serve_forever()
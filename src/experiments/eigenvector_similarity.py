@@ -0,0 +1,113 @@
+from typing import Tuple
+
+import numpy as np
+from scipy.sparse import coo_array, csr_array
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.csgraph import laplacian as graph_laplacian
+
+# The EVS metric of evs-python-3.py (Søgaard 2018): the squared distance between the Laplacian spectra of the
+# nearest neighbour graphs of the two embedding spaces, see the iso-study scripts
+NEIGHBOUR_BLOCK_SIZE = 2048
+MINIMUM_ENERGY = 0.9
+
+
+def nearest_neighbours(
+    embeddings: np.ndarray, block_size: int = NEIGHBOUR_BLOCK_SIZE
+) -> np.ndarray:
+    """
+    The index of the nearest other row of every row by Euclidean distance, like the second neighbour of a
+    2-NN ball tree query. The distances ||a||^2 + ||b||^2 - 2 a.b are computed for block_size rows at a time.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    squared_norms = np.einsum("ij,ij->i", embeddings, embeddings)
+    neighbours = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), block_size):
+        block = embeddings[start : start + block_size] @ embeddings.T
+        # ||a||^2 is the same for the whole row and does not change the order
+        block *= -2
+        block += squared_norms
+        rows = np.arange(len(block))
+        block[rows, start + rows] = np.inf
+        neighbours[start : start + block_size] = np.argmin(block, axis=1)
+    return neighbours
+
+
+def nearest_neighbour_laplacian(
+    embeddings: np.ndarray, block_size: int = NEIGHBOUR_BLOCK_SIZE
+) -> csr_array:
+    # Laplacian D - A of the unweighted graph with an edge from every word to its nearest neighbour
+    n = len(embeddings)
+    rows = np.arange(n)
+    neighbours = nearest_neighbours(embeddings, block_size)
+    adjacency = coo_array(
+        (np.ones(2 * n), (np.r_[rows, neighbours], np.r_[neighbours, rows])),
+        shape=(n, n),
+    ).tocsr()
+    # Mutual nearest neighbours add the same edge twice, but the graph is unweighted
+    adjacency.data[:] = 1
+    return csr_array(graph_laplacian(adjacency))
+
+
+def laplacian_spectrum(laplacian: csr_array) -> np.ndarray:
+    """
+    All eigenvalues of the Laplacian in ascending order, like networkx.laplacian_spectrum. The nearest neighbour
+    graph falls apart into many small components, and the spectrum is the union of their spectra, so the
+    components are decomposed in batches of the same size instead of the whole dense matrix.
+    """
+    _, labels = connected_components(laplacian, directed=False)
+    sizes = np.bincount(labels)
+    # The position of every node within its component
+    order = np.argsort(labels, kind="stable")
+    positions = np.empty(len(labels), dtype=np.int64)
+    positions[order] = (
+        np.arange(len(labels)) - np.r_[0, np.cumsum(sizes)[:-1]][labels[order]]
+    )
+    entries = laplacian.tocoo()
+    entry_labels = labels[entries.row]
+    eigenvalues = []
+    for size in np.unique(sizes):
+        components = np.flatnonzero(sizes == size)
+        batch_index = np.full(len(sizes), -1)
+        batch_index[components] = np.arange(len(components))
+        in_batch = sizes[entry_labels] == size
+        blocks = np.zeros((len(components), size, size))
+        blocks[
+            batch_index[entry_labels[in_batch]],
+            positions[entries.row[in_batch]],
+            positions[entries.col[in_batch]],
+        ] = entries.data[in_batch]
+        eigenvalues.append(np.linalg.eigvalsh(blocks).ravel())
+    return np.sort(np.concatenate(eigenvalues))
+
+
+def select_k(spectrum: np.ndarray, minimum_energy: float = MINIMUM_ENERGY) -> int:
+    # The smallest k whose first k eigenvalues hold minimum_energy of the sum of the spectrum
+    # The running total adds up in order like the loop of the original script, which decides ties of k
+    running_total = np.cumsum(spectrum)
+    total = running_total[-1] if len(spectrum) else 0.0
+    if total == 0.0:
+        return len(spectrum)
+    reached = np.flatnonzero(running_total / total >= minimum_energy)
+    return int(reached[0]) + 1 if len(reached) else len(spectrum)
+
+
+def spectra(
+    x_embeddings: np.ndarray, y_embeddings: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    return (
+        laplacian_spectrum(nearest_neighbour_laplacian(x_embeddings)),
+        laplacian_spectrum(nearest_neighbour_laplacian(y_embeddings)),
+    )
+
+
+def spectral_distance(
+    spectrum_x: np.ndarray,
+    spectrum_y: np.ndarray,
+    minimum_energy: float = MINIMUM_ENERGY,
+) -> float:
+    k = min(select_k(spectrum_x, minimum_energy), select_k(spectrum_y, minimum_energy))
+    return float(np.sum((spectrum_x[:k] - spectrum_y[:k]) ** 2))
+
+
+def eigenvector_similarity(x_embeddings: np.ndarray, y_embeddings: np.ndarray) -> float:
+    return spectral_distance(*spectra(x_embeddings, y_embeddings))
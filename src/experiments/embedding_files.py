@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+# Binary embedding tables are stored next to their text version with the same stem:
+# - STEM.npy: the float32 embedding matrix
+# - STEM.words: the number of words n as int64, n + 1 int64 offsets and the concatenated UTF-8 encoded words
+_HEADER = np.dtype("<i8")
+
+
+def binary_embedding_paths(path: Union[str, Path]) -> Tuple[Path, Path]:
+    path = Path(path)
+    return path.with_suffix(".npy"), path.with_suffix(".words")
+
+
+def has_binary_embeddings(path: Union[str, Path]) -> bool:
+    """
+    Whether an up-to-date binary copy of the text embeddings at path exists. A copy that is older than the text
+    file is stale, e.g. after the embeddings were trained again, and the text file is used instead.
+    """
+    try:
+        binary_times = [
+            binary_path.stat().st_mtime_ns
+            for binary_path in binary_embedding_paths(path)
+        ]
+    except FileNotFoundError:
+        return False
+    try:
+        text_time = Path(path).stat().st_mtime_ns
+    except FileNotFoundError:
+        # Only the binary copy was kept
+        return True
+    return min(binary_times) >= text_time
+
+
+def save_binary_embeddings(
+    path: Union[str, Path], words: List[str], embeddings: np.ndarray
+) -> None:
+    if len(words) != len(embeddings):
+        raise ValueError(f"Got {len(words)} words, but {len(embeddings)} embeddings")
+    matrix_path, words_path = binary_embedding_paths(path)
+    encoded_words = [word.encode("utf-8") for word in words]
+    offsets = np.zeros(len(words) + 1, dtype=_HEADER)
+    np.cumsum([len(word) for word in encoded_words], out=offsets[1:])
+    # Write to temporary files first, so that concurrent readers never map half written files
+    np.save(f"{matrix_path}.tmp.npy", np.asarray(embeddings, dtype=np.float32))
+    with open(f"{words_path}.tmp", "wb") as file:
+        file.write(np.array([len(words)], dtype=_HEADER).tobytes())
+        file.write(offsets.tobytes())
+        file.write(b"".join(encoded_words))
+    os.replace(f"{matrix_path}.tmp.npy", matrix_path)
+    os.replace(f"{words_path}.tmp", words_path)
+
+
+def load_binary_words(path: Union[str, Path], n: Optional[int] = None) -> List[str]:
+    words_file = np.memmap(binary_embedding_paths(path)[1], dtype=np.uint8, mode="r")
+    count = int(words_file[: _HEADER.itemsize].view(_HEADER)[0])
+    n = count if n is None else min(n, count)
+    offsets = words_file[_HEADER.itemsize : _HEADER.itemsize * (count + 2)].view(
+        _HEADER
+    )
+    data = words_file[_HEADER.itemsize * (count + 2) :]
+    # Only the bytes of the first n words are decoded
+    encoded_words = data[: offsets[n]].tobytes()
+    return [
+        encoded_words[start:end].decode("utf-8")
+        for start, end in zip(offsets[:n], offsets[1 : n + 1])
+    ]
+
+
+def load_binary_embeddings(
+    path: Union[str, Path], n: Optional[int] = None
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Loads the first n words and their embeddings of a binary embedding table. The matrix is memory-mapped
+    read-only, so loading it does not copy any data and processes that open the same table share its pages.
+    """
+    embeddings = np.load(binary_embedding_paths(path)[0], mmap_mode="r")
+    return load_binary_words(path, n), embeddings[:n]
@@ -1,9 +1,15 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from typing import List, Literal
 
 import sentencepiece as spm
 
 from constants import CORPUS_TYPE, SRC, TRG, VOCAB_SIZE
 
+ENCODING_BATCH_SIZE = 20000
+WRITE_BUFFER_SIZE = 16 * 2**20
+
 
 def model_generation(sources: List[str], lang: Literal["osh", "eng"]):
     spm.SentencePieceTrainer.Train(
@@ -16,29 +22,59 @@ def model_generation(sources: List[str], lang: Literal["osh", "eng"]):
     )
 
 
-def corpus_encoding(sources: List[str], lang: Literal["osh", "eng"]):
+def encode_lines(
+    sp: spm.SentencePieceProcessor,
+    sources: List[str],
+    output_file: str,
+    batch_size: int = ENCODING_BATCH_SIZE,
+    num_threads: int = -1,
+) -> int:
+    # Batches of lines are encoded by SentencePiece on num_threads threads and written as one chunk each
+    num_lines = 0
+    with open(
+        output_file, "w", encoding="utf-8", buffering=WRITE_BUFFER_SIZE
+    ) as encoded_corpus:
+        for file_name in sources:
+            with open(file_name, "r", encoding="utf-8") as corpus:
+                while batch := list(islice(corpus, batch_size)):
+                    encoded_batch = sp.encode(batch, num_threads=num_threads)
+                    encoded_corpus.write(
+                        "".join(
+                            " ".join(encoded_line).strip() + "\n"
+                            for encoded_line in encoded_batch
+                        )
+                    )
+                    num_lines += len(batch)
+    return num_lines
+
+
+def corpus_encoding(
+    sources: List[str], lang: Literal["osh", "eng"], num_threads: int = -1
+):
     sp = spm.SentencePieceProcessor(
         model_file=f"{lang}-{CORPUS_TYPE}-{VOCAB_SIZE}.model",
         add_bos=True,
         add_eos=True,
         out_type=str,
     )
-    with open(
-        f"encoded-{lang}-{CORPUS_TYPE}-{VOCAB_SIZE}.txt", "w", encoding="utf-8"
-    ) as encoded_corpus:
-        for file_name in sources:
-            with open(file_name, "r", encoding="utf-8") as corpus:
-                for line in corpus:
-                    encoded_line = " ".join(str(x) for x in sp.encode(line))
-                    encoded_corpus.write(encoded_line.strip() + "\n")
-
-
-print(f"Generating {SRC} model...")
-model_generation([f"corpus-{SRC}.txt"], SRC)
-print(f"Encoding {SRC} corpus...")
-corpus_encoding([f"corpus-{SRC}.txt"], SRC)
-print(f"Generating {TRG} model...")
-model_generation([f"corpus-{TRG}.txt"], TRG)
-print(f"Encoding {TRG} corpus...")
-corpus_encoding([f"corpus-{TRG}.txt"], TRG)
-print("Done!")
+    encode_lines(
+        sp,
+        sources,
+        f"encoded-{lang}-{CORPUS_TYPE}-{VOCAB_SIZE}.txt",
+        num_threads=num_threads,
+    )
+
+
+def prepare_language(lang: Literal["osh", "eng"], num_threads: int = -1):
+    print(f"Generating {lang} model...")
+    model_generation([f"corpus-{lang}.txt"], lang)
+    print(f"Encoding {lang} corpus...")
+    corpus_encoding([f"corpus-{lang}.txt"], lang, num_threads)
+
+
+if __name__ == "__main__":
+    # Both languages are trained and encoded in their own process and share the cores for encoding
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        threads = max(1, (os.cpu_count() or 2) // 2)
+        list(executor.map(prepare_language, [SRC, TRG], [threads, threads]))
+    print("Done!")
@@ -0,0 +1,121 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Precision and recall are percentages like in proc_v_sgm.eval, the MRR is between 0 and 1
+METRIC_NAMES = (
+    "matches",
+    "precision",
+    "recall",
+    "precision@1",
+    "precision@5",
+    "precision@10",
+    "mrr",
+)
+
+
+def pair_keys(pairs: np.ndarray, num_targets: int) -> np.ndarray:
+    # Every (source, target) pair as a single integer, so that pairs can be compared with sorted array searches
+    return pairs[:, 0] * num_targets + pairs[:, 1]
+
+
+@dataclass
+class GoldPairs:
+    """The gold dev pairs as sorted integer arrays. A source word may have several gold translations."""
+
+    pairs: np.ndarray
+    sources: np.ndarray
+    keys: np.ndarray
+    num_targets: int
+
+    @classmethod
+    def from_pairs(
+        cls, pairs: Iterable[Tuple[int, int]], num_targets: int
+    ) -> "GoldPairs":
+        pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+        keys = np.unique(pair_keys(pairs, num_targets))
+        return cls(
+            np.column_stack([keys // num_targets, keys % num_targets]),
+            np.unique(keys // num_targets),
+            keys,
+            num_targets,
+        )
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    def source_mask(self, sources: np.ndarray) -> np.ndarray:
+        return np.isin(sources, self.sources)
+
+    def contains(self, pairs: np.ndarray) -> np.ndarray:
+        keys = pair_keys(pairs, self.num_targets)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return (
+            self.keys[positions] == keys
+            if len(self.keys)
+            else np.zeros(len(keys), bool)
+        )
+
+
+def hypothesis_metrics(hypotheses: np.ndarray, gold: GoldPairs) -> Dict[str, float]:
+    """
+    Matches, precision and recall of the hypotheses with a gold source, which is what proc_v_sgm.eval
+    computes for the dev hypotheses.
+    """
+    keys = np.unique(pair_keys(hypotheses.reshape(-1, 2), gold.num_targets))
+    dev_keys = keys[gold.source_mask(keys // gold.num_targets)]
+    matches = int(np.isin(dev_keys, gold.keys, assume_unique=True).sum())
+    return {
+        "matches": matches,
+        "precision": 100 * matches / max(len(dev_keys), 1),
+        "recall": 100 * matches / max(len(gold), 1),
+    }
+
+
+def ranking_metrics(
+    sources: np.ndarray,
+    candidates: np.ndarray,
+    gold: GoldPairs,
+    ks: Sequence[int] = (1, 5, 10),
+) -> Dict[str, float]:
+    """
+    Precision@k and MRR of the (len(sources), K) ranked candidates of the gold sources. A source counts for
+    precision@k if any of its gold translations is among its first k candidates.
+    """
+    if len(sources) == 0:
+        return {**{f"precision@{k}": 0.0 for k in ks}, "mrr": 0.0}
+    correct = gold.contains(
+        np.column_stack([np.repeat(sources, candidates.shape[1]), candidates.ravel()])
+    ).reshape(candidates.shape)
+    found = correct.any(axis=1)
+    first_rank = np.argmax(correct, axis=1) + 1
+    metrics = {
+        f"precision@{k}": 100 * float(correct[:, :k].any(axis=1).mean()) for k in ks
+    }
+    metrics["mrr"] = float(np.where(found, 1 / first_rank, 0).mean())
+    return metrics
+
+
+def metrics_to_table(iteration_metrics: List[Dict[str, float]]) -> np.ndarray:
+    # One row per iteration and one column per metric name, missing metrics are NaN
+    return np.array(
+        [
+            [metrics.get(name, np.nan) for name in METRIC_NAMES]
+            for metrics in iteration_metrics
+        ],
+        dtype=np.float64,
+    ).reshape(-1, len(METRIC_NAMES))
+
+
+def metrics_from_table(table: np.ndarray) -> List[Dict[str, float]]:
+    return [
+        {name: value for name, value in zip(METRIC_NAMES, row) if not np.isnan(value)}
+        for row in np.asarray(table).tolist()
+    ]
+
+
+def format_metrics(metrics: Dict[str, float]) -> str:
+    return ", ".join(
+        f"{name} {metrics[name]:.4g}" for name in METRIC_NAMES if name in metrics
+    )
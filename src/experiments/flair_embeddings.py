@@ -0,0 +1,42 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from flair.data import Sentence
+from flair.embeddings import BytePairEmbeddings as BPE
+from flair.embeddings import WordEmbeddings as WordEmb
+
+EMBEDDING_BATCH_SIZE = 4096
+
+
+def embed_words(
+    embedding: Union[BPE, WordEmb],
+    word_list: List[str],
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+) -> np.ndarray:
+    if not all(word_list):
+        raise ValueError("Trying to get embedding for empty word")
+    # Only the first token of every word is embedded, just like with one Sentence per word
+    tokens = [Sentence(word)[0].text for word in word_list]
+    # The patched BytePairEmbeddings stack the sub-word embeddings of all tokens in a batch, which requires the
+    # tokens of a batch to have the same number of sub-words
+    spm = getattr(embedding, "spm", None)
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i, token in enumerate(tokens):
+        groups[len(spm.EncodeAsIds(token.lower())) if spm else 0].append(i)
+    embedding_matrix: Optional[np.ndarray] = None
+    for indices in groups.values():
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start : start + batch_size]
+            sentence = Sentence([tokens[i] for i in batch])
+            embedding.embed(sentence)
+            batch_embeddings = np.stack(
+                [token.embedding.cpu().numpy() for token in sentence]
+            )
+            if embedding_matrix is None:
+                embedding_matrix = np.zeros(
+                    (len(tokens), batch_embeddings.shape[1]),
+                    dtype=batch_embeddings.dtype,
+                )
+            embedding_matrix[batch] = batch_embeddings
+    return embedding_matrix
@@ -0,0 +1,79 @@
+import io
+import os
+import re
+from collections import Counter
+from itertools import islice
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+from caching import atomic_write_text, cache_path, file_digest
+
+# Tokens containing a zero are treated as numbers and removed together with the surrounding whitespace
+NUMBER_PATTERN = re.compile(r"\s*[A-z-]*0[A-z-]*\s*")
+CHUNKS_PER_CORE = 4
+
+
+def count_words(lines: Iterable[str]) -> Counter:
+    frequencies: Counter = Counter()
+    for line in lines:
+        line = line.replace("\n", "")
+        line = NUMBER_PATTERN.sub(" ", line)
+        frequencies.update([word for word in line.split(" ") if word])
+    return frequencies
+
+
+def chunk_boundaries(corpus: Union[str, Path], num_chunks: int) -> List[Tuple[int, int]]:
+    # Chunks always end directly after a b"\n", hence they never split a line or a multibyte character
+    size = os.path.getsize(corpus)
+    boundaries = [0]
+    with open(corpus, "rb") as file:
+        for i in range(1, num_chunks):
+            file.seek(max(size * i // num_chunks, boundaries[-1]))
+            file.readline()
+            boundaries.append(min(file.tell(), size))
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries, boundaries[1:]) if end > start]
+
+
+def _count_chunk(chunk: Tuple[str, int, int]) -> Counter:
+    corpus, start, end = chunk
+    with open(corpus, "rb") as file:
+        file.seek(start)
+        data = file.read(end - start)
+    # newline=None gives the same universal newline handling as reading the file in text mode
+    return count_words(io.StringIO(data.decode("utf-8"), newline=None))
+
+
+def build_frequency_index(corpus: Union[str, Path], processes: Optional[int] = None) -> Path:
+    index_file = cache_path("frequencies", f"{file_digest(corpus)}.freq")
+    if index_file.exists():
+        return index_file
+    processes = processes or os.cpu_count() or 1
+    chunks = [
+        (str(corpus), start, end)
+        for start, end in chunk_boundaries(corpus, processes * CHUNKS_PER_CORE)
+    ]
+    frequencies: Counter = Counter()
+    with Pool(processes) as pool:
+        # Merging in corpus order keeps the first occurrence order, which most_common uses to break ties
+        for chunk_frequencies in pool.imap(_count_chunk, chunks):
+            frequencies.update(chunk_frequencies)
+    atomic_write_text(
+        index_file,
+        "".join(f"{count} {word}\n" for word, count in frequencies.most_common()),
+    )
+    return index_file
+
+
+def most_common_words(
+    corpus: Union[str, Path], n: Optional[int] = None
+) -> List[Tuple[str, int]]:
+    """
+    Returns the n most common words of the corpus with their counts, in the same order as Counter.most_common.
+    The counts are read from an on-disk index keyed by the content hash of the corpus, which is built on the
+    first call.
+    """
+    with open(build_frequency_index(corpus), "r", encoding="utf-8", newline="\n") as file:
+        entries = [line[:-1].split(" ", 1) for line in islice(file, n)]
+    return [(word, int(count)) for count, word in entries]
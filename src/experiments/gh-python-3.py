@@ -1,16 +1,19 @@
 # modified from https://github.com/cambridgeltl/iso-study/blob/master/scripts/gh_script.py
 # converted to python 3 using ChatGPT
 
+import argparse
 import codecs
 import sys
 import time
 
-import gudhi
 # -*- coding: utf-8 -*-
 import numpy as np
-import torch
 from scipy.spatial.distance import cosine
-from sklearn.preprocessing import normalize
+
+from gromov_hausdorff import (DEFAULT_DRAWS, bottleneck_distance,
+                              cosine_distance_matrix, estimate_gh_distance,
+                              persistence_diagrams)
+from word_vectors import load_normalized_vectors
 
 # import matplotlib.pyplot as plt
 
@@ -19,103 +22,106 @@ FREQ = 5000
 HOMO_DIM = 1
 
 
-def load_word_vectors(file_destination):
-    """
-    This method loads the word vectors from the supplied file destination.
-    It loads the dictionary of word vectors and prints its size and the vector
-    dimensionality.
-    """
-    print("Loading vectors from", file_destination, file=sys.stderr)
-    input_dic = {}
-
-    with open(file_destination, "r", encoding="utf-8") as in_file:
-        lines = in_file.readlines()
-
-    in_file.close()
-
-    words = []
-    vectors = []
-    for line in lines[1:]:
-        item = line.strip().split()
-        dkey = item.pop(0)
-        words.append(dkey)
-        vector = np.array(item, dtype="float32")
-        vectors.append(vector)
-        # print np.mean(vector)
-
-    npvectors = np.vstack(vectors)
-
-    # Our words are stored in the list words and...
-    # ...our vectors are stored in the 2D array npvectors
-
-    # 1. Length normalize
-    npvectors = normalize(npvectors, axis=1, norm="l2")
-
-    # 2. Mean centering dimesionwise
-    npvectors = npvectors - npvectors.mean(0)
-
-    # 3. Length normalize again
-    npvectors = normalize(npvectors, axis=1, norm="l2")
-
-    # Create the final dictionary
-    for i in range(len(words)):
-        word = words[i]
-        vector = npvectors[i]
-        input_dic[word] = vector
-
-    print(len(input_dic), "vectors loaded from", file_destination, file=sys.stderr)
-    return words, input_dic
-
-
-def distance_matrix(xx_freq, xx_vec):
+def distance_matrix(embeddings):
     """
     This function computes distance matrices from the embedding matrices
     """
-    xx_vectors = []
-    for word in xx_freq[:FREQ]:
-        xx_vectors.append(xx_vec[word])
-    xx_embed_temp = np.vstack(xx_vectors)
-    xx_embed = torch.from_numpy(xx_embed_temp)
-    xx_dist = torch.sqrt(
-        2 - 2 * torch.clamp(torch.mm(xx_embed, torch.t(xx_embed)), -1.0, 1.0)
-    )
-    xx_matrix = xx_dist.cpu().numpy()
-    return xx_matrix
+    return cosine_distance_matrix(embeddings)
 
 
-def compute_diagram(x, homo_dim=1):
+def compute_diagram(x, homo_dim=HOMO_DIM, **diagram_options):
     """
     This function computes the persistence diagram on the basis of the distance matrix
     and the homology dimension
     """
-    rips_tree = gudhi.RipsComplex(distance_matrix=x).create_simplex_tree(
-        max_dimension=homo_dim
-    )
-    rips_diag = rips_tree.persistence()
-    return [rips_tree.persistence_intervals_in_dimension(w) for w in range(homo_dim)]
+    return persistence_diagrams(x, homo_dim, **diagram_options)
 
 
-def compute_distance(x, y, homo_dim=1):
-    start_time = time.time()
-    diag_x = compute_diagram(x, homo_dim=homo_dim)
-    diag_y = compute_diagram(y, homo_dim=homo_dim)
-    # print("Filteration graph: %.3f" % (time.time() - start_time))
-    return min([gudhi.bottleneck_distance(x, y, e=0) for (x, y) in zip(diag_x, diag_y)])
+def compute_distance(x, y, homo_dim=HOMO_DIM, bottleneck_error=0.0, **diagram_options):
+    diag_x = compute_diagram(x, homo_dim=homo_dim, **diagram_options)
+    diag_y = compute_diagram(y, homo_dim=homo_dim, **diagram_options)
+    return bottleneck_distance(diag_x, diag_y, bottleneck_error)
 
 
 def main():
-    # Get vectors first and words sorted by frequency
-    en_freq, en_vec = load_word_vectors(sys.argv[1])
-    de_freq, de_vec = load_word_vectors(sys.argv[2])
+    parser = argparse.ArgumentParser(description="Compute the GH metric.")
+    parser.add_argument("source", type=str, help="Source embeddings")
+    parser.add_argument("target", type=str, help="Target embeddings")
+    parser.add_argument(
+        "--freq", type=int, default=FREQ, help="Number of most frequent words"
+    )
+    parser.add_argument(
+        "--method",
+        type=str,
+        choices=["rips", "mst"],
+        default="rips",
+        help="Build the Rips complex with gudhi or get the exact 0-dimensional diagram from a minimum spanning tree",
+    )
+    parser.add_argument(
+        "--max_edge_length",
+        type=float,
+        default=np.inf,
+        help="Leave out longer edges of the Rips complex",
+    )
+    parser.add_argument(
+        "--sparse",
+        type=float,
+        default=None,
+        help="Approximation parameter of a sparse Rips complex",
+    )
+    parser.add_argument(
+        "--sample_size",
+        type=int,
+        default=None,
+        help="Estimate the metric from subsamples of this many words",
+    )
+    parser.add_argument(
+        "--draws", type=int, default=DEFAULT_DRAWS, help="Number of subsamples"
+    )
+    parser.add_argument(
+        "--landmarks",
+        action="store_true",
+        help="Draw max-min landmarks instead of uniform subsamples",
+    )
+    parser.add_argument(
+        "--approximate_bottleneck",
+        action="store_true",
+        help="Use gudhi's default bottleneck algorithm, which is exact up to rounding and much faster",
+    )
+    args = parser.parse_args()
+    diagram_options = dict(
+        method=args.method,
+        max_edge_length=args.max_edge_length,
+        sparse=args.sparse,
+        bottleneck_error=None if args.approximate_bottleneck else 0.0,
+    )
+
+    # Get the normalized vectors of the top FREQ words, which are sorted by frequency
+    _, en_embeddings = load_normalized_vectors(args.source, args.freq)
+    _, de_embeddings = load_normalized_vectors(args.target, args.freq)
+
+    if args.sample_size:
+        estimate = estimate_gh_distance(
+            en_embeddings,
+            de_embeddings,
+            args.sample_size,
+            args.draws,
+            args.landmarks,
+            **diagram_options,
+        )
+        print("Gromov-Hausdorff: ", estimate)
+        return
 
     # Step 1. Compute distance matrices from the top FREQ words
     # a) Source and b) Target
-    en_matrix = distance_matrix(en_freq, en_vec)
-    de_matrix = distance_matrix(de_freq, de_vec)
+    en_matrix = distance_matrix(en_embeddings)
+    de_matrix = distance_matrix(de_embeddings)
 
     # Step 2. Get the actual distance based on matrices and the
     # persistance diagrams
-    print("Gromov-Hausdorff: ", compute_distance(en_matrix, de_matrix))
+    print(
+        "Gromov-Hausdorff: ", compute_distance(en_matrix, de_matrix, **diagram_options)
+    )
 
 
 # The code starts here
@@ -1,23 +1,96 @@
 import argparse
+import os
 import random
-import re
-from collections import Counter, defaultdict
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Literal, Optional, Tuple
+from typing import Dict, List, Literal, Optional, Tuple, Union
 
 import json5
 import numpy as np
 import pandas as pd
-from flair.data import Sentence
-from flair.embeddings import BytePairEmbeddings as BPE
-from flair.embeddings import WordEmbeddings as WordEmb
 from pandas import Series
 # from pkg.gmp import quadratic_assignment_ot
 from scipy.optimize import OptimizeResult
+from threadpoolctl import threadpool_limits
 from tqdm import tqdm
 
+from byte_pair_embeddings import NumpyBytePairEmbeddings, Pooling
+from caching import (build_cached_array, cache_key, file_digest,
+                     load_cached_arrays, store_cached_arrays)
 from constants import (EMBEDDING_DIMENSION, FINAL_DICTIONARY_SIZE, NUM_SEEDS,
-                       SRC, TRG)
+                       POOLING, SRC, TRG)
+from frequency_index import most_common_words
+from sparse_graph import SimilarityGraph, top_k_similarity_graph
+from tracing import stage
+from word_index import WordIndex
+
+GRAPH_TILE_SIZE = 512
+
+
+def _row_norms(embedding_matrix: np.ndarray) -> np.ndarray:
+    # np.linalg.norm of a single row is sqrt(row.dot(row)), which rounds differently than the norms along an axis
+    return np.sqrt(
+        np.fromiter(
+            (row.dot(row) for row in embedding_matrix),
+            dtype=embedding_matrix.dtype,
+            count=len(embedding_matrix),
+        )
+    )[:, None]
+
+
+def normalize_embeddings(embedding_matrix: np.ndarray) -> np.ndarray:
+    """
+    According to (Marchisio 2022) we should normalize, mean-center and re-normalize. The result is bit-identical
+    to the original normalization of the pandas embedding column: the rows are normalized by their own norms,
+    the mean is the sequential sum of the rows divided by a float64 count, like the pandas mean of an object
+    column, and the dtype of the centered rows follows from NumPy's promotion rules for that mean.
+    """
+    embedding_matrix /= _row_norms(embedding_matrix)
+    # Summing along axis 0 of a C-contiguous matrix adds the rows one after the other
+    mean = np.ascontiguousarray(embedding_matrix).sum(axis=0) / np.float64(
+        len(embedding_matrix)
+    )
+    embedding_matrix = embedding_matrix - mean
+    embedding_matrix /= _row_norms(embedding_matrix)
+    return embedding_matrix.astype(np.float64, copy=False)
+
+
+def build_tiled_graph(
+    embedding_matrix: np.ndarray,
+    path: Union[str, Path],
+    tile_size: int = GRAPH_TILE_SIZE,
+    threads: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Computes embedding_matrix @ embedding_matrix.T in float32 and writes it into the .npy file at path, one
+    tile of tile_size rows at a time. Only threads tiles are in memory at once, so the peak memory is
+    threads * tile_size * n * 4 bytes instead of n * n * 8 bytes. The graph is returned memory-mapped.
+    """
+    n = len(embedding_matrix)
+    embeddings = np.ascontiguousarray(embedding_matrix, dtype=np.float32)
+    # Creating the memory-map writes the header and allocates the file without touching its pages
+    np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, n)).flush()
+    data_offset = os.path.getsize(path) - n * n * embeddings.itemsize
+
+    def write_tile(start: int):
+        tile = embeddings[start : start + tile_size] @ embeddings.T
+        buffer = memoryview(tile).cast("B")
+        offset = data_offset + start * n * embeddings.itemsize
+        while buffer:
+            written = os.pwrite(file, buffer, offset)
+            buffer, offset = buffer[written:], offset + written
+
+    file = os.open(path, os.O_WRONLY)
+    try:
+        threads = threads or os.cpu_count() or 1
+        # Every tile runs single-threaded BLAS, so that the tiles do not compete for the cores
+        with threadpool_limits(limits=1 if threads > 1 else None):
+            with ThreadPoolExecutor(threads) as executor:
+                list(executor.map(write_tile, range(0, n, tile_size)))
+    finally:
+        os.close(file)
+    return np.load(path, mmap_mode="r")
 
 
 def load_embeddings_into_matrix(
@@ -25,40 +98,70 @@ def load_embeddings_into_matrix(
     word_list: List[str],
     corpus_type: str = "small",
     vocab_size: int = 10000,
-) -> Tuple[pd.DataFrame, np.ndarray]:
+    cache_graph: bool = True,
+    pooling: Pooling = POOLING,
+    graph_neighbours: Optional[int] = None,
+    out_of_core_graph: bool = False,
+) -> Tuple[pd.DataFrame, SimilarityGraph]:
     base_path = Path(__file__).resolve().parent
-    embedding = BPE(
-        model_file_path=base_path / f"{lang}-{corpus_type}-{vocab_size}.model",
-        embedding_file_path=base_path
-        / f"ordered-{lang}-{corpus_type}-{vocab_size}-embeddings.txt",
-        dim=EMBEDDING_DIMENSION,
-        preprocess=False,
+    model_file = base_path / f"{lang}-{corpus_type}-{vocab_size}.model"
+    embedding_file = (
+        base_path / f"ordered-{lang}-{corpus_type}-{vocab_size}-embeddings.txt"
     )
-    # embedding = WordEmb(f'embeddings-{lang}-test.glove.txt')
-
-    def get_embedding(word):
-        if not word:
-            raise ValueError("Trying to get embedding for empty word")
-        sentence = Sentence(word)
-        embedding.embed(sentence)
-        return (
-            sentence[0].embedding.cpu().numpy()
-        )  # Convert Flair embedding to NumPy array
-
-    # Create a DataFrame with words and their embeddings
-    data = {"word": word_list, "embedding": [get_embedding(word) for word in word_list]}
-    df = pd.DataFrame(data)
-    embeddings_column = df["embedding"]
-    # According to (Marchisio 2022) we should normalize, mean-center and re-normalize
-    embeddings_column = embeddings_column.apply(lambda emb: emb / np.linalg.norm(emb))
-    embeddings_mean = embeddings_column.mean()
-    embeddings_column = embeddings_column.apply(lambda emb: emb - embeddings_mean)
-    embeddings_column = embeddings_column.apply(lambda emb: emb / np.linalg.norm(emb))
-    embedding_matrix = np.zeros((len(embeddings_column), len(embeddings_column[0])))
-    df["embedding"] = embeddings_column
-    for i in range(0, len(embeddings_column)):
-        embedding_matrix[i] = embeddings_column[i]
-    return df, embedding_matrix @ embedding_matrix.T
+    key = cache_key(
+        lang,
+        corpus_type,
+        vocab_size,
+        NumpyBytePairEmbeddings.__name__,
+        # Entries from before the first token rule embedded whole words
+        "first_token",
+        pooling,
+        word_list,
+        file_digest(model_file),
+        file_digest(embedding_file),
+    )
+    with stage("embedding_load", lang=lang) as embedding_stage:
+        if (cached := load_cached_arrays("embeddings", key)) is None:
+            embedding = NumpyBytePairEmbeddings(model_file, embedding_file)
+            embedding_matrix = normalize_embeddings(embedding.embed(word_list, pooling))
+            cached = store_cached_arrays(
+                "embeddings",
+                key,
+                {"words": np.array(word_list), "embeddings": embedding_matrix},
+            )
+        elif embedding_stage is not None:
+            embedding_stage.attributes["cached"] = True
+    embedding_matrix = cached["embeddings"]
+    if graph_neighbours is not None:
+        # The top-k graph is built in row blocks, so the dense graph never exists as a whole
+        with stage("graph_build", lang=lang, graph="sparse"):
+            graph = top_k_similarity_graph(embedding_matrix, graph_neighbours)
+    elif out_of_core_graph:
+        # The exact graph is written to the cache in tiles and memory-mapped instead of computed in memory
+        with stage("graph_build", lang=lang, graph="tiled"):
+            graph = build_cached_array(
+                "graphs",
+                cache_key(key, "tiled"),
+                "graph",
+                lambda path: build_tiled_graph(embedding_matrix, path),
+            )
+    elif not cache_graph:
+        with stage("graph_build", lang=lang, graph="dense"):
+            graph = embedding_matrix @ embedding_matrix.T
+    else:
+        # Graphs are cached apart from the embeddings and keyed by their mode, so that the embeddings stored by a
+        # run with another mode are reused and the graph is still cached
+        graph_key = cache_key(key, "dense")
+        if (cached_graph := load_cached_arrays("graphs", graph_key)) is None:
+            with stage("graph_build", lang=lang, graph="dense"):
+                cached_graph = store_cached_arrays(
+                    "graphs",
+                    graph_key,
+                    {"graph": embedding_matrix @ embedding_matrix.T},
+                )
+        graph = cached_graph["graph"]
+    df = pd.DataFrame({"word": word_list, "embedding": list(embedding_matrix)})
+    return df, graph
 
 
 # def graph_matching(
@@ -81,7 +184,7 @@ def load_embeddings_into_matrix(
 #    )
 
 
-def get_seeds(osh_words: List[str], eng_words: List[str]) -> np.ndarray:
+def load_translations() -> Dict[str, List[str]]:
     with open(
         # Path(__file__).resolve().parent.parent
         # / "data"
@@ -92,28 +195,32 @@ def get_seeds(osh_words: List[str], eng_words: List[str]) -> np.ndarray:
         "r",
         encoding="utf-8",
     ) as file:
-        all_translations: Dict[str, List[str]] = json5.load(file)
+        return json5.load(file)
+
+
+def get_seeds(
+    osh_words: Union[List[str], WordIndex],
+    eng_words: Union[List[str], WordIndex],
+    all_translations: Optional[Dict[str, List[str]]] = None,
+) -> np.ndarray:
+    if all_translations is None:
+        all_translations = load_translations()
+    osh_index = osh_words if isinstance(osh_words, WordIndex) else WordIndex(osh_words)
+    eng_index = eng_words if isinstance(eng_words, WordIndex) else WordIndex(eng_words)
     seeds = list()
     eng_seeds = set()
     osh_seeds = set()
-    for word in tqdm(osh_words):
-        translation_candidates = all_translations.get(word)
-        if not translation_candidates:
+    for osh_seed in tqdm(osh_index):
+        translation_candidates = all_translations.get(osh_seed)
+        if not translation_candidates or osh_seed in osh_seeds:
             continue
-        if available_translations := set(translation_candidates) & set(eng_words):
-            osh_seed = word
-            for eng_seed in available_translations:
-                # eng_seed = available_translations.pop()
-                if (
-                    osh_seed in osh_words
-                    and eng_seed in eng_words
-                    and osh_seed not in osh_seeds
-                    and eng_seed not in eng_seeds
-                ):
-                    eng_seeds.add(eng_seed)
-                    osh_seeds.add(osh_seed)
-                    seeds.append([osh_words.index(osh_seed), eng_words.index(eng_seed)])
-                    break
+        # The candidates are tried in the order of the dictionary, which makes the seeds reproducible
+        for eng_seed in dict.fromkeys(translation_candidates):
+            if eng_seed in eng_index and eng_seed not in eng_seeds:
+                eng_seeds.add(eng_seed)
+                osh_seeds.add(osh_seed)
+                seeds.append([osh_index.index(osh_seed), eng_index.index(eng_seed)])
+                break
     return np.array(seeds)
 
 
@@ -134,15 +241,7 @@ def match_translations(
 def word_order_by_frequency(
     lang: Literal["eng", "osh"], n: Optional[int] = None
 ) -> List[str]:
-    frequencies: Counter = Counter()
-    with open(f"corpus-{lang}.txt", "r", encoding="utf-8") as file:
-        for line in file:
-            line = line.replace("\n", "")
-            line = re.sub(r"\s*[A-z-]*0[A-z-]*\s*", " ", line)
-            frequencies.update(
-                [word for word in line.split(" ") if word and not word == 0]
-            )
-    return [word for word, _ in frequencies.most_common(n)]
+    return [word for word, _ in most_common_words(f"corpus-{lang}.txt", n)]
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,173 @@
+from dataclasses import dataclass
+from typing import List, Literal, Optional
+
+import gudhi
+import numpy as np
+from scipy import stats
+
+# The GH metric of gh-python-3.py: the bottleneck distance between the Vietoris-Rips persistence diagrams of the
+# cosine distances of the two embedding spaces, see (Patra 2019) and the iso-study scripts
+HOMOLOGY_DIMENSION = 1
+DEFAULT_DRAWS = 10
+DEFAULT_CONFIDENCE = 0.95
+
+
+def cosine_distance_matrix(embeddings: np.ndarray) -> np.ndarray:
+    # sqrt(2 - 2 cos) of length normalized rows in float32, computed in place to keep only one n x n matrix
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    distances = embeddings @ embeddings.T
+    np.clip(distances, -1.0, 1.0, out=distances)
+    distances *= -2
+    distances += 2
+    return np.sqrt(distances, out=distances)
+
+
+def minimum_spanning_tree_deaths(distances: np.ndarray) -> np.ndarray:
+    """
+    The edge lengths of a minimum spanning tree of the complete graph with the given distances, by Prim's
+    algorithm on the rows of the matrix. These are the deaths of the 0-dimensional Rips persistence intervals.
+    """
+    n = len(distances)
+    in_tree = np.zeros(n, dtype=bool)
+    nearest = np.full(n, np.inf)
+    deaths = np.empty(max(n - 1, 0))
+    vertex = 0
+    for i in range(n - 1):
+        in_tree[vertex] = True
+        np.minimum(nearest, distances[vertex], out=nearest, where=~in_tree)
+        nearest[vertex] = np.inf
+        vertex = int(np.argmin(nearest))
+        deaths[i] = nearest[vertex]
+        nearest[vertex] = np.inf
+    return deaths
+
+
+def persistence_diagrams(
+    distances: np.ndarray,
+    homology_dimension: int = HOMOLOGY_DIMENSION,
+    method: Literal["rips", "mst"] = "rips",
+    max_edge_length: float = np.inf,
+    sparse: Optional[float] = None,
+) -> List[np.ndarray]:
+    """
+    The persistence intervals of the Rips filtration in the dimensions below homology_dimension.
+
+    - method "rips" builds the Rips complex with gudhi. Edges longer than max_edge_length are left out, and the
+      deaths of the components they would have merged are set to max_edge_length, so that both diagrams of a
+      pair stay comparable. With sparse, gudhi builds a sparse Rips complex with this approximation parameter.
+    - method "mst" is exact for the 0-dimensional diagram, whose deaths are the edge lengths of a minimum
+      spanning tree. It takes O(n^2) time and no memory beyond the distances.
+    """
+    if method == "mst":
+        if homology_dimension != 1:
+            raise ValueError("The mst method only computes 0-dimensional diagrams")
+        deaths = minimum_spanning_tree_deaths(distances)
+        # gudhi leaves out intervals without persistence
+        deaths = np.append(deaths[deaths > 0], np.inf)
+        return [np.column_stack([np.zeros_like(deaths), deaths])]
+    rips_tree = gudhi.RipsComplex(
+        distance_matrix=distances, max_edge_length=max_edge_length, sparse=sparse
+    ).create_simplex_tree(max_dimension=homology_dimension)
+    rips_tree.persistence()
+    diagrams = [
+        rips_tree.persistence_intervals_in_dimension(dimension)
+        for dimension in range(homology_dimension)
+    ]
+    if np.isfinite(max_edge_length):
+        diagrams = [np.minimum(diagram, max_edge_length) for diagram in diagrams]
+    return diagrams
+
+
+def bottleneck_distance(
+    diagrams_x: List[np.ndarray],
+    diagrams_y: List[np.ndarray],
+    error: Optional[float] = 0.0,
+) -> float:
+    # error 0 is gudhi's exact algorithm. None is gudhi's default, which is only off by rounding errors and
+    # orders of magnitude faster for diagrams with thousands of points.
+    return min(
+        gudhi.bottleneck_distance(diagram_x, diagram_y, e=error)
+        for diagram_x, diagram_y in zip(diagrams_x, diagrams_y)
+    )
+
+
+def gh_distance(
+    x_embeddings: np.ndarray,
+    y_embeddings: np.ndarray,
+    bottleneck_error: Optional[float] = 0.0,
+    **diagram_options,
+) -> float:
+    return bottleneck_distance(
+        persistence_diagrams(cosine_distance_matrix(x_embeddings), **diagram_options),
+        persistence_diagrams(cosine_distance_matrix(y_embeddings), **diagram_options),
+        bottleneck_error,
+    )
+
+
+def farthest_point_landmarks(
+    embeddings: np.ndarray, m: int, rng: np.random.Generator
+) -> np.ndarray:
+    # Max-min landmarks from a random first point, which cover the space better than a uniform sample
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    landmarks = np.empty(min(m, len(embeddings)), dtype=np.int64)
+    landmarks[0] = rng.integers(len(embeddings))
+    # The cosine distance is monotone in 1 - cos, so the similarities are enough to find the farthest point
+    nearest_similarity = embeddings @ embeddings[landmarks[0]]
+    for i in range(1, len(landmarks)):
+        landmarks[i] = np.argmin(nearest_similarity)
+        np.maximum(
+            nearest_similarity,
+            embeddings @ embeddings[landmarks[i]],
+            out=nearest_similarity,
+        )
+    return landmarks
+
+
+@dataclass
+class DistanceEstimate:
+    mean: float
+    low: float
+    high: float
+    values: List[float]
+
+    def __str__(self) -> str:
+        return f"{self.mean} ({self.low} - {self.high}, {len(self.values)} draws)"
+
+
+def estimate_gh_distance(
+    x_embeddings: np.ndarray,
+    y_embeddings: np.ndarray,
+    sample_size: int,
+    draws: int = DEFAULT_DRAWS,
+    landmarks: bool = False,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int = 0,
+    **diagram_options,
+) -> DistanceEstimate:
+    """
+    Estimates the GH distance from the distances between subsamples of sample_size words of both spaces, drawn
+    uniformly or as max-min landmarks. Returns the mean over the draws and its Student t confidence interval.
+    Subsamples are sparser than the full spaces, so the estimate is biased towards larger death times, which
+    benchmark_gh.py quantifies.
+    """
+    rng = np.random.default_rng(seed)
+    values = []
+    for _ in range(draws):
+        if landmarks:
+            x_sample = farthest_point_landmarks(x_embeddings, sample_size, rng)
+            y_sample = farthest_point_landmarks(y_embeddings, sample_size, rng)
+        else:
+            x_sample = rng.choice(len(x_embeddings), sample_size, replace=False)
+            y_sample = rng.choice(len(y_embeddings), sample_size, replace=False)
+        values.append(
+            gh_distance(
+                x_embeddings[np.sort(x_sample)],
+                y_embeddings[np.sort(y_sample)],
+                **diagram_options,
+            )
+        )
+    mean = float(np.mean(values))
+    if draws < 2 or (standard_error := stats.sem(values)) == 0:
+        return DistanceEstimate(mean, mean, mean, values)
+    low, high = stats.t.interval(confidence, draws - 1, loc=mean, scale=standard_error)
+    return DistanceEstimate(mean, float(low), float(high), values)
@@ -0,0 +1,277 @@
+import argparse
+import multiprocessing
+import os
+from dataclasses import dataclass
+from functools import partial
+from itertools import combinations
+from pathlib import Path
+from typing import Callable, Dict, List, Literal, Optional, Tuple
+
+import json5
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from caching import (cache_key, file_digest, load_cached_arrays,
+                     store_cached_arrays)
+from eigenvector_similarity import (laplacian_spectrum,
+                                    nearest_neighbour_laplacian,
+                                    spectral_distance)
+from embedding_files import binary_embedding_paths, has_binary_embeddings
+from gromov_hausdorff import (HOMOLOGY_DIMENSION, bottleneck_distance,
+                              cosine_distance_matrix, persistence_diagrams)
+from isomorphism_metrics import singular_value_distance, singular_values
+from word_vectors import load_normalized_vectors
+
+# Computes the isomorphism metrics of many pairs of embedding files. The features of every language, e.g. its
+# Laplacian spectrum or persistence diagrams, are computed once per file and FREQ and cached on disk, so that
+# comparing several languages against English computes the English side only once. The manifest is a JSON5 file:
+#
+#   {
+#     "embeddings": {"eng-10000": "eng.word2vec", "osh-10000": "osh.word2vec", ...},
+#     // Optional, all pairs of embeddings otherwise
+#     "pairs": [["osh-10000", "eng-10000"], ...],
+#   }
+#
+# Relative paths are resolved against the directory of the manifest.
+
+FEATURE_NAMESPACE = "isomorphism"
+FREQS = [5000]
+OUTPUT_FILE = "isomorphism-metrics.csv"
+
+Features = Dict[str, np.ndarray]
+
+
+@dataclass(frozen=True)
+class GridMetric:
+    # features maps the normalized embeddings of one language to the arrays that distance compares
+    features: Callable[[np.ndarray], Features]
+    distance: Callable[[Features, Features], float]
+    # Options of the features that are part of their cache key
+    feature_options: Tuple = ()
+
+
+def evs_features(embeddings: np.ndarray) -> Features:
+    return {"spectrum": laplacian_spectrum(nearest_neighbour_laplacian(embeddings))}
+
+
+def evs_distance(features_x: Features, features_y: Features) -> float:
+    return spectral_distance(features_x["spectrum"], features_y["spectrum"])
+
+
+def gh_features(embeddings: np.ndarray, method: Literal["rips", "mst"]) -> Features:
+    diagrams = persistence_diagrams(
+        cosine_distance_matrix(embeddings), HOMOLOGY_DIMENSION, method=method
+    )
+    return {
+        f"diagram_{dimension}": diagram for dimension, diagram in enumerate(diagrams)
+    }
+
+
+def gh_distance(
+    features_x: Features, features_y: Features, error: Optional[float]
+) -> float:
+    names = [f"diagram_{dimension}" for dimension in range(HOMOLOGY_DIMENSION)]
+    return bottleneck_distance(
+        [features_x[name] for name in names],
+        [features_y[name] for name in names],
+        error,
+    )
+
+
+def svg_features(embeddings: np.ndarray) -> Features:
+    return {"singular_values": singular_values(embeddings)}
+
+
+def svg_distance(features_x: Features, features_y: Features) -> float:
+    return singular_value_distance(
+        features_x["singular_values"], features_y["singular_values"]
+    )
+
+
+def grid_metrics(
+    gh_method: Literal["rips", "mst"] = "rips", bottleneck_error: Optional[float] = 0.0
+) -> Dict[str, GridMetric]:
+    return {
+        "evs": GridMetric(evs_features, evs_distance),
+        "gh": GridMetric(
+            partial(gh_features, method=gh_method),
+            partial(gh_distance, error=bottleneck_error),
+            (gh_method,),
+        ),
+        "svg": GridMetric(svg_features, svg_distance),
+    }
+
+
+def embedding_digest(path: str) -> str:
+    # The digest of the file that read_vectors reads
+    if has_binary_embeddings(path):
+        return cache_key(*(file_digest(file) for file in binary_embedding_paths(path)))
+    return file_digest(path)
+
+
+def feature_key(digest: str, freq: int, name: str, metric: GridMetric) -> str:
+    # Features from before the mean centering over the whole vocabulary used the mean of the top freq words
+    return cache_key(digest, freq, name, "vocabulary_mean", *metric.feature_options)
+
+
+def load_manifest(path: str) -> Tuple[Dict[str, str], List[Tuple[str, str]]]:
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = json5.load(file)
+    directory = Path(path).parent
+    embeddings = {
+        name: str(directory / embedding_path)
+        for name, embedding_path in manifest["embeddings"].items()
+    }
+    pairs = [tuple(pair) for pair in manifest.get("pairs", [])] or list(
+        combinations(embeddings, 2)
+    )
+    for pair in pairs:
+        if missing := [name for name in pair if name not in embeddings]:
+            raise ValueError(f"Unknown embeddings {missing} in the pair {pair}")
+    return embeddings, pairs
+
+
+def _compute_features(task: Tuple[str, int, List[Tuple[str, GridMetric, str]]]) -> None:
+    # Loads the embeddings of one language once for all of its missing features
+    path, freq, missing = task
+    _, embeddings = load_normalized_vectors(path, freq)
+    for _, metric, key in missing:
+        store_cached_arrays(FEATURE_NAMESPACE, key, metric.features(embeddings))
+
+
+def _compute_distance(
+    task: Tuple[Tuple[str, str, int, str], GridMetric, str, str],
+) -> Tuple[Tuple[str, str, int, str], float]:
+    row, metric, key_x, key_y = task
+    return row, metric.distance(
+        load_cached_arrays(FEATURE_NAMESPACE, key_x),
+        load_cached_arrays(FEATURE_NAMESPACE, key_y),
+    )
+
+
+def isomorphism_grid(
+    embeddings: Dict[str, str],
+    pairs: List[Tuple[str, str]],
+    freqs: List[int],
+    metrics: Dict[str, GridMetric],
+    processes: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Computes the metrics of all pairs for every FREQ and returns a table with a row per pair and FREQ and a
+    column per metric. The features of the languages are computed in parallel first, skipping the cached ones,
+    then the distances of the pairs.
+    """
+    used = sorted({name for pair in pairs for name in pair})
+    digests = {name: embedding_digest(embeddings[name]) for name in used}
+    keys = {
+        (name, freq, metric_name): feature_key(digests[name], freq, metric_name, metric)
+        for name in used
+        for freq in freqs
+        for metric_name, metric in metrics.items()
+    }
+    feature_tasks = []
+    for name in used:
+        for freq in freqs:
+            missing = [
+                (metric_name, metric, keys[name, freq, metric_name])
+                for metric_name, metric in metrics.items()
+                if load_cached_arrays(FEATURE_NAMESPACE, keys[name, freq, metric_name])
+                is None
+            ]
+            if missing:
+                feature_tasks.append((embeddings[name], freq, missing))
+    distance_tasks = [
+        (
+            (source, target, freq, metric_name),
+            metric,
+            keys[source, freq, metric_name],
+            keys[target, freq, metric_name],
+        )
+        for source, target in pairs
+        for freq in freqs
+        for metric_name, metric in metrics.items()
+    ]
+    processes = processes or os.cpu_count() or 1
+    with multiprocessing.get_context("fork").Pool(processes) as pool:
+        for _ in tqdm(
+            pool.imap_unordered(_compute_features, feature_tasks),
+            total=len(feature_tasks),
+            desc="features",
+        ):
+            pass
+        distances = list(
+            tqdm(
+                pool.imap_unordered(_compute_distance, distance_tasks),
+                total=len(distance_tasks),
+                desc="distances",
+            )
+        )
+    table = pd.DataFrame(
+        [(*row, distance) for row, distance in distances],
+        columns=["source", "target", "freq", "metric", "distance"],
+    )
+    table = table.pivot(
+        index=["source", "target", "freq"], columns="metric", values="distance"
+    )
+    return table[list(metrics)].reset_index().rename_axis(columns=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute the isomorphism metrics of the pairs of a manifest."
+    )
+    parser.add_argument("manifest", type=str, help="JSON5 manifest of embedding files")
+    parser.add_argument(
+        "--freqs",
+        type=int,
+        nargs="+",
+        default=FREQS,
+        help="Numbers of most frequent words",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        nargs="+",
+        choices=list(grid_metrics()),
+        default=list(grid_metrics()),
+        help="Metrics to compute",
+    )
+    parser.add_argument(
+        "--gh_method",
+        type=str,
+        choices=["rips", "mst"],
+        default="rips",
+        help="Persistence diagrams of the GH metric, see gh-python-3.py",
+    )
+    parser.add_argument(
+        "--approximate_bottleneck",
+        action="store_true",
+        help="Use gudhi's default bottleneck algorithm for the GH metric",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Number of worker processes, one per CPU by default",
+    )
+    parser.add_argument(
+        "--output", type=str, default=OUTPUT_FILE, help="CSV file of the metrics"
+    )
+    args = parser.parse_args()
+
+    embeddings, pairs = load_manifest(args.manifest)
+    metrics = grid_metrics(args.gh_method, None if args.approximate_bottleneck else 0.0)
+    table = isomorphism_grid(
+        embeddings,
+        pairs,
+        args.freqs,
+        {name: metrics[name] for name in args.metrics},
+        args.processes,
+    )
+    table.to_csv(args.output, index=False)
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import sys
+import time
+from functools import partial
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+from eigenvector_similarity import eigenvector_similarity
+from gromov_hausdorff import DEFAULT_DRAWS, estimate_gh_distance, gh_distance
+from word_vectors import load_normalized_vectors
+
+# Computes several isomorphism metrics of two embedding spaces in one process, which loads and normalizes the
+# vectors of the top FREQ words of each language once for all metrics
+
+FREQ = 5000
+
+
+def singular_values(embeddings: np.ndarray) -> np.ndarray:
+    return np.linalg.svd(embeddings, compute_uv=False)
+
+
+def singular_value_distance(
+    singular_values_x: np.ndarray, singular_values_y: np.ndarray
+) -> float:
+    # The SVG metric (Dubossarsky 2020): the squared differences of the log singular values of both spaces
+    k = min(len(singular_values_x), len(singular_values_y))
+    return float(
+        np.sum((np.log(singular_values_x[:k]) - np.log(singular_values_y[:k])) ** 2)
+    )
+
+
+def singular_value_gap(x_embeddings: np.ndarray, y_embeddings: np.ndarray) -> float:
+    return singular_value_distance(
+        singular_values(x_embeddings), singular_values(y_embeddings)
+    )
+
+
+def gromov_hausdorff(
+    x_embeddings: np.ndarray,
+    y_embeddings: np.ndarray,
+    sample_size: Optional[int] = None,
+    draws: int = DEFAULT_DRAWS,
+    **options,
+) -> float:
+    if sample_size:
+        return estimate_gh_distance(
+            x_embeddings, y_embeddings, sample_size, draws, **options
+        ).mean
+    return gh_distance(x_embeddings, y_embeddings, **options)
+
+
+METRICS: Dict[str, Callable[..., float]] = {
+    "evs": eigenvector_similarity,
+    "gh": gromov_hausdorff,
+    "svg": singular_value_gap,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute isomorphism metrics.")
+    parser.add_argument("source", type=str, help="Source embeddings")
+    parser.add_argument("target", type=str, help="Target embeddings")
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        nargs="+",
+        choices=list(METRICS),
+        default=list(METRICS),
+        help="Metrics to compute",
+    )
+    parser.add_argument(
+        "--freq", type=int, default=FREQ, help="Number of most frequent words"
+    )
+    parser.add_argument(
+        "--gh_method",
+        type=str,
+        choices=["rips", "mst"],
+        default="rips",
+        help="Persistence diagrams of the GH metric, see gh-python-3.py",
+    )
+    parser.add_argument(
+        "--approximate_bottleneck",
+        action="store_true",
+        help="Use gudhi's default bottleneck algorithm for the GH metric",
+    )
+    parser.add_argument(
+        "--gh_sample_size",
+        type=int,
+        default=None,
+        help="Estimate the GH metric from subsamples of this many words",
+    )
+    parser.add_argument(
+        "--gh_draws", type=int, default=DEFAULT_DRAWS, help="Number of subsamples"
+    )
+    args = parser.parse_args()
+    metrics = dict(
+        METRICS,
+        gh=partial(
+            gromov_hausdorff,
+            sample_size=args.gh_sample_size,
+            draws=args.gh_draws,
+            method=args.gh_method,
+            bottleneck_error=None if args.approximate_bottleneck else 0.0,
+        ),
+    )
+
+    _, x_embeddings = load_normalized_vectors(args.source, args.freq)
+    _, y_embeddings = load_normalized_vectors(args.target, args.freq)
+    for name in args.metrics:
+        start = time.perf_counter()
+        value = metrics[name](x_embeddings, y_embeddings)
+        print(f"{name} took {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        print(f"{name}\t{value}")
+
+
+if __name__ == "__main__":
+    main()
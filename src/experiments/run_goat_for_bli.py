@@ -1,6 +1,11 @@
-import json
+import mmap
+import os
 import statistics
 import sys
+from dataclasses import astuple, dataclass, field, replace
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
 
 sys.path.extend(
     [
@@ -14,91 +19,170 @@ import random
 
 import goat.GoatForBli.proc_v_sgm as proc_v_sgm
 import numpy as np
+import pandas as pd
+from src.experiments.caching import array_digest, cache_key
+from src.experiments.checkpoints import (array_to_pairs, checkpoint_dir,
+                                         clear_checkpoints, get_rng_state,
+                                         load_checkpoint, pairs_to_array,
+                                         remove_checkpoints, save_checkpoint,
+                                         set_rng_state)
+from src.experiments.compact_dictionary import (COMPACT_DICTIONARY_SUFFIX,
+                                                CompactDictionary)
 from src.experiments.constants import (EMBEDDING_DIMENSION,
                                        FINAL_DICTIONARY_SIZE,
-                                       ITERATIVE_SOFTSGM_ITERS,
+                                       ITERATIVE_SOFTSGM_ITERS, POOLING,
                                        PROGRUSTES_ITERS, SOFTSGM_ITERS, SRC,
                                        TRG)
+from src.experiments.convergence import (CONVERGENCE_PATIENCE,
+                                         CONVERGENCE_TOLERANCE,
+                                         ConvergenceMonitor, EarlyStopping,
+                                         hypothesis_keys)
+from src.experiments.csls import procrustes_csls_top_k, ranked_pairs
+from src.experiments.evaluation import (GoldPairs, format_metrics,
+                                        hypothesis_metrics, metrics_from_table,
+                                        metrics_to_table, ranking_metrics)
 from src.experiments.graph_matching import (get_seeds,
                                             load_embeddings_into_matrix,
-                                            match_translations,
                                             word_order_by_frequency)
+from src.experiments.shared_arrays import (SharedArraySpecs,
+                                           attach_shared_arrays, shared_arrays)
+from src.experiments.sparse_graph import SimilarityGraph, dense_graph
+from src.experiments.word_index import (WordIndex, identical_word_seeds,
+                                        remove_identical_words)
+from threadpoolctl import threadpool_limits
 from tqdm import tqdm
 
+# Imported like graph_matching.py imports it, as src.experiments.tracing it would be a second module with its own
+# trace settings and the stages of graph_matching.py would never be traced
+from tracing import (TraceSettings, configure, enable_tracing, stage,
+                     trace_settings)
+
 # This file is inspired by https://github.com/kellymarchisio/goat-for-bli/tree/main (Marchisio 2022)
 # Primarily by the file combo.py
 
-parser = argparse.ArgumentParser(description="Process some integers.")
-parser.add_argument(
-    "--vocab_size", type=int, required=True, help="Size of the vocabulary"
-)
-parser.add_argument("--corpus_type", type=str, required=True, help="Type of the corpus")
-parser.add_argument("--num_seeds", type=int, required=True, help="Number of seeds")
-parser.add_argument(
-    "--end_proc", type=str, required=True, help="Whether to run Procrustes first"
-)
+NUM_TRIALS = 10
+NUM_ITERATIONS = 20
+CSLS_TOP_K = 10
 
-args = parser.parse_args()
-VOCAB_SIZE = args.vocab_size
-CORPUS_TYPE = args.corpus_type
-NUM_SEEDS = args.num_seeds
-END_PROC = bool(eval(args.end_proc))
-assert CORPUS_TYPE in ["small", "extended"]
-
-best_score = 0
-best_hypotheses = []
-best_params = (0, 0, 0, 0)
-
-print("Getting words...")
-word_list_osh = word_order_by_frequency(SRC, FINAL_DICTIONARY_SIZE)
-word_list_eng = word_order_by_frequency(TRG, FINAL_DICTIONARY_SIZE)
-identical_words = set(word_list_osh) & set(word_list_eng)
-for word in identical_words:
-    if len(word) > 3:
-        word_list_eng.remove(word)
-        word_list_osh.remove(word)
-assert len(word_list_eng) == len(word_list_osh)
-print("Creating Graphs...")
-osh_df, osh_graph = load_embeddings_into_matrix(
-    SRC, word_list_osh, vocab_size=VOCAB_SIZE, corpus_type=CORPUS_TYPE
-)  # osh_graph = xxT in combo.py
-eng_df, eng_graph = load_embeddings_into_matrix(
-    TRG, word_list_eng, vocab_size=VOCAB_SIZE, corpus_type=CORPUS_TYPE
-)  # eng_graph = yyT in combo.py
-assert osh_graph.shape == eng_graph.shape == (len(word_list_osh), len(word_list_osh))
-if not (
-    osh_df["embedding"].get(0).shape
-    == eng_df["embedding"].get(0).shape
-    == (EMBEDDING_DIMENSION,)
-):
-    raise ValueError(
-        "Embedding dimensions do not match. Did you update the flair token.py file?"
-    )
-print("Getting seeds...")
-seed_list = [(x, y) for x, y in get_seeds(word_list_osh, word_list_eng)]
-# there is close to no overlap in words for the two languages, this allows us to map names to each-other
-name_seed_list = []
-for word in word_list_eng:
-    if word in word_list_osh and len(word) > 3:
-        x, y = word_list_osh.index(word), word_list_eng.index(word)
-        duplicate = False
-        for a, b in seed_list:
-            if x == a or y == b:
-                duplicate = True
-        if not duplicate:
-            name_seed_list.append((x, y))
-
-# When using a system combination, it is best to start with Procrustes and GOAT, for very low and very
-# high numbers of seeds. Hence, we start with Procrustes
-
-rng_values = [2000 + i + 20 for i in range(10)]
-scores = []
-
-for j in tqdm(range(10)):
-    random.Random(rng_values[j]).shuffle(seed_list)
-    random.shuffle(seed_list)
-    train_seeds = seed_list[:NUM_SEEDS] + name_seed_list
-    dev_seeds = seed_list[NUM_SEEDS:]
+
+@dataclass
+class BliInputs:
+    # Everything that only depends on the vocab size and corpus type and is shared by all configurations
+    osh_df: Optional[pd.DataFrame]
+    eng_df: Optional[pd.DataFrame]
+    osh_graph: SimilarityGraph
+    eng_graph: SimilarityGraph
+    osh_embeddings: np.ndarray
+    eng_embeddings: np.ndarray
+    seed_list: List[Tuple[int, int]]
+    name_seed_list: List[Tuple[int, int]]
+    # Identifies the inputs in the checkpoint keys, so that trials of other inputs are never resumed
+    key: str
+
+
+@dataclass
+class TrialResult:
+    precision: float
+    recall: float
+    matches: int
+    hypotheses: Set[Tuple[int, int]]
+    ranked_hypotheses: List[Tuple[int, int, float]]
+    train_seeds: List[Tuple[int, int]]
+    # The dev metrics after every iteration, see evaluation.METRIC_NAMES
+    iteration_metrics: List[Dict[str, float]] = field(default_factory=list)
+    # The number of iterations that were run, fewer than NUM_ITERATIONS if the hypotheses converged
+    iterations: int = NUM_ITERATIONS
+
+
+def prepare_inputs(
+    vocab_size: int,
+    corpus_type: str,
+    graph_neighbours: Optional[int] = None,
+    out_of_core_graph: bool = False,
+) -> BliInputs:
+    print("Getting words...")
+    with stage("word_counting"):
+        word_list_osh = word_order_by_frequency(SRC, FINAL_DICTIONARY_SIZE)
+        word_list_eng = word_order_by_frequency(TRG, FINAL_DICTIONARY_SIZE)
+        word_list_osh, word_list_eng = remove_identical_words(
+            word_list_osh, word_list_eng
+        )
+    assert len(word_list_eng) == len(word_list_osh)
+    print("Creating Graphs...")
+    osh_df, osh_graph = load_embeddings_into_matrix(
+        SRC,
+        word_list_osh,
+        vocab_size=vocab_size,
+        corpus_type=corpus_type,
+        graph_neighbours=graph_neighbours,
+        out_of_core_graph=out_of_core_graph,
+    )  # osh_graph = xxT in combo.py
+    eng_df, eng_graph = load_embeddings_into_matrix(
+        TRG,
+        word_list_eng,
+        vocab_size=vocab_size,
+        corpus_type=corpus_type,
+        graph_neighbours=graph_neighbours,
+        out_of_core_graph=out_of_core_graph,
+    )  # eng_graph = yyT in combo.py
+    assert (
+        osh_graph.shape == eng_graph.shape == (len(word_list_osh), len(word_list_osh))
+    )
+    if not (
+        osh_df["embedding"].get(0).shape
+        == eng_df["embedding"].get(0).shape
+        == (EMBEDDING_DIMENSION,)
+    ):
+        raise ValueError(
+            "Embedding dimensions do not match. Did you set POOLING in constants.py?"
+        )
+    print("Getting seeds...")
+    with stage("seed_extraction"):
+        osh_index, eng_index = WordIndex(word_list_osh), WordIndex(word_list_eng)
+        seed_list = [(x, y) for x, y in get_seeds(osh_index, eng_index)]
+        # there is close to no overlap in words for the two languages, this allows us to map names to each-other
+        name_seed_list = identical_word_seeds(osh_index, eng_index, seed_list)
+    osh_embeddings = np.stack(osh_df["embedding"].values)
+    eng_embeddings = np.stack(eng_df["embedding"].values)
+    # The graphs follow from the embeddings and the graph mode
+    key = cache_key(
+        POOLING,
+        FINAL_DICTIONARY_SIZE,
+        graph_neighbours,
+        out_of_core_graph,
+        array_digest(
+            osh_embeddings,
+            eng_embeddings,
+            pairs_to_array(seed_list),
+            pairs_to_array(name_seed_list),
+        ),
+    )
+    return BliInputs(
+        osh_df,
+        eng_df,
+        osh_graph,
+        eng_graph,
+        osh_embeddings,
+        eng_embeddings,
+        seed_list,
+        name_seed_list,
+        key,
+    )
+
+
+def run_trial(
+    inputs: BliInputs,
+    seed_list: List[Tuple[int, int]],
+    num_seeds: int,
+    end_proc: bool,
+    checkpoint: Optional[Path] = None,
+    early_stopping: EarlyStopping = EarlyStopping(),
+    threads: Optional[int] = None,
+) -> TrialResult:
+    # Top-k graphs are densified once per trial for GOAT, missing edges have the similarity 0
+    osh_graph, eng_graph = dense_graph(inputs.osh_graph), dense_graph(inputs.eng_graph)
+    train_seeds = seed_list[:num_seeds] + inputs.name_seed_list
+    dev_seeds = seed_list[num_seeds:]
     gold_osh_train_indices, gold_eng_train_indices = proc_v_sgm.unzip_pairs(train_seeds)
     sgm_hypotheses_osh = []
     sgm_hypotheses_eng = []
@@ -107,143 +191,581 @@ for j in tqdm(range(10)):
         maximize=True,
         P0="barycenter",
     )  # rng=rng_values[j])
-    osh_embeddings = np.stack(osh_df["embedding"].values)
-    eng_embeddings = np.stack(eng_df["embedding"].values)
+    osh_embeddings, eng_embeddings = inputs.osh_embeddings, inputs.eng_embeddings
     hypotheses = []
-    for i in range(20):
-        print(f"Starting Iteration {i}")
-
-        if END_PROC:
-            # Run Graph Matching with input from Procrustes
-
-            _, _, sgm_hypotheses_int = proc_v_sgm.iterative_softsgm(
-                x_sim=osh_graph,
-                y_sim=eng_graph,
-                input_x_seed_inds=sgm_hypotheses_osh,
-                input_y_seed_inds=sgm_hypotheses_eng,
-                gold_x_seed_inds=gold_osh_train_indices,
-                gold_y_seed_inds=gold_eng_train_indices,
-                softsgm_iters=SOFTSGM_ITERS,
-                k=1,
-                val_set=dev_seeds,
-                curr_i=1,
-                total_i=ITERATIVE_SOFTSGM_ITERS,
-                run_reverse=True,
-                function="goat",
-                opts=graph_matching_options,
-            )
-            sgm_hypotheses_osh, sgm_hypotheses_eng = proc_v_sgm.unzip_pairs(
-                sgm_hypotheses_int
-            )
+    ranked_hypotheses = []
+    iteration_metrics = []
+    dev_gold = GoldPairs.from_pairs(dev_seeds, len(eng_embeddings))
+    convergence = ConvergenceMonitor(early_stopping)
+    start_iteration = 0
+    if checkpoint is not None and (state := load_checkpoint(checkpoint)) is not None:
+        print(f"Resuming from iteration {int(state['iteration'])}")
+        start_iteration = int(state["iteration"])
+        sgm_hypotheses_osh = state["sgm_hypotheses_osh"].tolist()
+        sgm_hypotheses_eng = state["sgm_hypotheses_eng"].tolist()
+        hypotheses = set(array_to_pairs(state["hypotheses"]))
+        ranked_hypotheses = ranked_from_arrays(
+            state["ranked_pairs"], state["ranked_scores"]
+        )
+        # Checkpoints from before the per-iteration evaluation have no history
+        iteration_metrics = metrics_from_table(state.get("iteration_metrics", []))
+        convergence = ConvergenceMonitor(
+            early_stopping,
+            hypothesis_keys(hypotheses),
+            iteration_metrics[-1].get("precision") if iteration_metrics else None,
+            # Checkpoints from before early stopping start with a stable history
+            int(state.get("stable_iterations", 0)),
+            state.get("convergence_changes", np.empty(0)).tolist(),
+        )
+        set_rng_state(state)
+    iterations = start_iteration
+    for i in range(start_iteration, NUM_ITERATIONS):
+        # Also checked before the first iteration, in case a converged trial was interrupted before its result
+        if convergence.converged:
+            print(f"Converged after {iterations} iterations")
+            break
+        with stage("iteration", iteration=i):
+            print(f"Starting Iteration {i}")
 
-            # Run Procrustes
-            (
-                hypotheses,
-                _,
-                procrustes_hypotheses_int,
-                _,
-                _,
-                ranked_hypotheses,
-            ) = proc_v_sgm.iterative_procrustes_w_csls(
-                x=osh_embeddings,
-                y=eng_embeddings,
-                input_x_seed_inds=sgm_hypotheses_osh,
-                input_y_seed_inds=sgm_hypotheses_eng,
-                gold_x_seed_inds=gold_osh_train_indices,
-                gold_y_seed_inds=gold_eng_train_indices,
-                val_set=dev_seeds,
-                total_i=PROGRUSTES_ITERS,
-                k=1,
-            )
-            sgm_hypotheses_osh, sgm_hypotheses_eng = proc_v_sgm.unzip_pairs(
-                procrustes_hypotheses_int
-            )
+            if end_proc:
+                # Run Graph Matching with input from Procrustes
 
-        else:
-            # Run Procrustes
-
-            (
-                _,
-                _,
-                procrustes_hypotheses_int,
-                _,
-                _,
-                ranked_hypotheses,
-            ) = proc_v_sgm.iterative_procrustes_w_csls(
-                x=osh_embeddings,
-                y=eng_embeddings,
-                input_x_seed_inds=sgm_hypotheses_osh,
-                input_y_seed_inds=sgm_hypotheses_eng,
-                gold_x_seed_inds=gold_osh_train_indices,
-                gold_y_seed_inds=gold_eng_train_indices,
-                val_set=dev_seeds,
-                total_i=PROGRUSTES_ITERS,
-                k=1,
-            )
-            sgm_hypotheses_osh, sgm_hypotheses_eng = proc_v_sgm.unzip_pairs(
-                procrustes_hypotheses_int
-            )
+                with stage("sgm"):
+                    _, _, sgm_hypotheses_int = proc_v_sgm.iterative_softsgm(
+                        x_sim=osh_graph,
+                        y_sim=eng_graph,
+                        input_x_seed_inds=sgm_hypotheses_osh,
+                        input_y_seed_inds=sgm_hypotheses_eng,
+                        gold_x_seed_inds=gold_osh_train_indices,
+                        gold_y_seed_inds=gold_eng_train_indices,
+                        softsgm_iters=SOFTSGM_ITERS,
+                        k=1,
+                        val_set=dev_seeds,
+                        curr_i=1,
+                        total_i=ITERATIVE_SOFTSGM_ITERS,
+                        run_reverse=True,
+                        function="goat",
+                        opts=graph_matching_options,
+                    )
+                sgm_hypotheses_osh, sgm_hypotheses_eng = proc_v_sgm.unzip_pairs(
+                    sgm_hypotheses_int
+                )
 
-            # Run Graph Matching with input from Procrustes
-
-            hypotheses, _, sgm_hypotheses_int = proc_v_sgm.iterative_softsgm(
-                x_sim=osh_graph,
-                y_sim=eng_graph,
-                input_x_seed_inds=sgm_hypotheses_osh,
-                input_y_seed_inds=sgm_hypotheses_eng,
-                gold_x_seed_inds=gold_osh_train_indices,
-                gold_y_seed_inds=gold_eng_train_indices,
-                softsgm_iters=SOFTSGM_ITERS,
-                k=1,
-                val_set=dev_seeds,
-                curr_i=1,
-                total_i=ITERATIVE_SOFTSGM_ITERS,
-                run_reverse=True,
-                function="goat",
-                opts=graph_matching_options,
-            )
-            sgm_hypotheses_osh, sgm_hypotheses_eng = proc_v_sgm.unzip_pairs(
-                sgm_hypotheses_int
+                # Run Procrustes
+                with stage("procrustes"):
+                    (
+                        hypotheses,
+                        _,
+                        procrustes_hypotheses_int,
+                        _,
+                        _,
+                        ranked_hypotheses,
+                    ) = proc_v_sgm.iterative_procrustes_w_csls(
+                        x=osh_embeddings,
+                        y=eng_embeddings,
+                        input_x_seed_inds=sgm_hypotheses_osh,
+                        input_y_seed_inds=sgm_hypotheses_eng,
+                        gold_x_seed_inds=gold_osh_train_indices,
+                        gold_y_seed_inds=gold_eng_train_indices,
+                        val_set=dev_seeds,
+                        total_i=PROGRUSTES_ITERS,
+                        k=1,
+                    )
+                sgm_hypotheses_osh, sgm_hypotheses_eng = proc_v_sgm.unzip_pairs(
+                    procrustes_hypotheses_int
+                )
+
+            else:
+                # Run Procrustes
+
+                with stage("procrustes"):
+                    (
+                        _,
+                        _,
+                        procrustes_hypotheses_int,
+                        _,
+                        _,
+                        ranked_hypotheses,
+                    ) = proc_v_sgm.iterative_procrustes_w_csls(
+                        x=osh_embeddings,
+                        y=eng_embeddings,
+                        input_x_seed_inds=sgm_hypotheses_osh,
+                        input_y_seed_inds=sgm_hypotheses_eng,
+                        gold_x_seed_inds=gold_osh_train_indices,
+                        gold_y_seed_inds=gold_eng_train_indices,
+                        val_set=dev_seeds,
+                        total_i=PROGRUSTES_ITERS,
+                        k=1,
+                    )
+                sgm_hypotheses_osh, sgm_hypotheses_eng = proc_v_sgm.unzip_pairs(
+                    procrustes_hypotheses_int
+                )
+
+                # Run Graph Matching with input from Procrustes
+
+                with stage("sgm"):
+                    hypotheses, _, sgm_hypotheses_int = proc_v_sgm.iterative_softsgm(
+                        x_sim=osh_graph,
+                        y_sim=eng_graph,
+                        input_x_seed_inds=sgm_hypotheses_osh,
+                        input_y_seed_inds=sgm_hypotheses_eng,
+                        gold_x_seed_inds=gold_osh_train_indices,
+                        gold_y_seed_inds=gold_eng_train_indices,
+                        softsgm_iters=SOFTSGM_ITERS,
+                        k=1,
+                        val_set=dev_seeds,
+                        curr_i=1,
+                        total_i=ITERATIVE_SOFTSGM_ITERS,
+                        run_reverse=True,
+                        function="goat",
+                        opts=graph_matching_options,
+                    )
+                sgm_hypotheses_osh, sgm_hypotheses_eng = proc_v_sgm.unzip_pairs(
+                    sgm_hypotheses_int
+                )
+
+            with stage("evaluation"):
+                iteration_metrics.append(
+                    evaluate_hypotheses(
+                        osh_embeddings, eng_embeddings, hypotheses, dev_gold, threads
+                    )
+                )
+            convergence.update(hypotheses, iteration_metrics[-1].get("precision"))
+            iterations = i + 1
+            print(
+                f"\t{format_metrics(iteration_metrics[-1])}"
+                + (
+                    f", change {convergence.changes[-1]:.4g}"
+                    if convergence.changes
+                    else ""
+                ),
+                flush=True,
             )
 
+            if checkpoint is not None:
+                save_checkpoint(
+                    checkpoint,
+                    iteration=np.array(i + 1),
+                    iteration_metrics=metrics_to_table(iteration_metrics),
+                    stable_iterations=np.array(convergence.stable_iterations),
+                    convergence_changes=np.array(convergence.changes, dtype=np.float64),
+                    sgm_hypotheses_osh=np.array(sgm_hypotheses_osh, dtype=np.int64),
+                    sgm_hypotheses_eng=np.array(sgm_hypotheses_eng, dtype=np.int64),
+                    hypotheses=pairs_to_array(hypotheses),
+                    **ranked_to_arrays(ranked_hypotheses),
+                    **get_rng_state(),
+                )
+
     # Evaluation
 
     print("Evaluating")
-    dev_src_inds, dev_trg_inds = proc_v_sgm.unzip_pairs(dev_seeds)
-    dev_hypotheses = set(hyp for hyp in hypotheses if hyp[0] in dev_src_inds)
-    matches, precision, recall = proc_v_sgm.eval(dev_hypotheses, dev_seeds)
+    with stage("evaluation"):
+        hypothesis_array = pairs_to_array(hypotheses)
+        dev_hypotheses = set(
+            array_to_pairs(
+                hypothesis_array[dev_gold.source_mask(hypothesis_array[:, 0])]
+            )
+        )
+        matches, precision, recall = proc_v_sgm.eval(dev_hypotheses, dev_seeds)
     print(
         "\tDev Pairs matched: {0} \n\t(Precision; {1}%) (Recall: {2}%)".format(
             len(matches), precision, recall
         ),
         flush=True,
     )
-    scores.append(precision)
-    if precision > best_score:
-        best_score = precision
-        best_hypotheses = hypotheses - (set(train_seeds) & hypotheses)
-        best_ranked_hypotheses = []
-        for x, y, val in ranked_hypotheses:
-            if x in gold_osh_train_indices:
-                continue
-            best_ranked_hypotheses.append((x, y))
-        best_params = (NUM_SEEDS, VOCAB_SIZE, END_PROC, CORPUS_TYPE)
-with open(f"stats-{CORPUS_TYPE}.txt", "a") as file:
-    file.write(
-        f"{NUM_SEEDS}-{VOCAB_SIZE}-{END_PROC}-average score: {statistics.mean(scores)}, std-dev: {statistics.stdev(scores)}\n"
-    )
-final_dictionary = match_translations(osh_df, eng_df, best_hypotheses)
-with open(
-    f"dictionary-no-names-{best_params[0]}-{best_params[1]}-{best_params[2]}-{best_params[3]}-{best_score}.json",
-    "w",
-    encoding="utf-8",
-) as file:
-    file.write(json.dumps(final_dictionary))
-ranked_dictionary = match_translations(osh_df, eng_df, best_ranked_hypotheses)
-with open(
-    f"dictionary-no-names-{best_params[0]}-{best_params[1]}-{best_params[2]}-{best_params[3]}-{best_score}-ranked.json",
-    "w",
-    encoding="utf-8",
-) as file:
-    file.write(json.dumps(ranked_dictionary))
-print("Done!")
+    return TrialResult(
+        precision,
+        recall,
+        len(matches),
+        hypotheses,
+        ranked_hypotheses,
+        train_seeds,
+        iteration_metrics,
+        iterations,
+    )
+
+
+def evaluate_hypotheses(
+    osh_embeddings: np.ndarray,
+    eng_embeddings: np.ndarray,
+    hypotheses: Set[Tuple[int, int]],
+    dev_gold: GoldPairs,
+    threads: Optional[int] = None,
+) -> Dict[str, float]:
+    # The ranking metrics translate the dev words by CSLS after Procrustes on the hypotheses
+    hypothesis_array = pairs_to_array(hypotheses)
+    metrics = hypothesis_metrics(hypothesis_array, dev_gold)
+    if len(hypothesis_array):
+        candidates, _ = procrustes_csls_top_k(
+            osh_embeddings,
+            eng_embeddings,
+            hypothesis_array,
+            10,
+            dev_gold.sources,
+            threads,
+        )
+        metrics.update(ranking_metrics(dev_gold.sources, candidates, dev_gold))
+    return metrics
+
+
+def ranked_to_arrays(
+    ranked_hypotheses: List[Tuple[int, int, float]],
+) -> Dict[str, np.ndarray]:
+    return {
+        "ranked_pairs": pairs_to_array((x, y) for x, y, _ in ranked_hypotheses),
+        "ranked_scores": np.array(
+            [float(val) for _, _, val in ranked_hypotheses], dtype=np.float64
+        ),
+    }
+
+
+def ranked_from_arrays(
+    ranked_pairs: np.ndarray, ranked_scores: np.ndarray
+) -> List[Tuple[int, int, float]]:
+    return [
+        (x, y, val)
+        for (x, y), val in zip(array_to_pairs(ranked_pairs), ranked_scores.tolist())
+    ]
+
+
+def run_seeded_trial(
+    inputs: BliInputs,
+    trial: int,
+    num_seeds: int,
+    end_proc: bool,
+    checkpoints: Optional[Path] = None,
+    early_stopping: EarlyStopping = EarlyStopping(),
+    threads: Optional[int] = None,
+) -> TrialResult:
+    result_file = checkpoints / f"trial-{trial}-result.npz" if checkpoints else None
+    if result_file is not None and (result := load_checkpoint(result_file)) is not None:
+        print(f"Trial {trial} was completed before")
+        return TrialResult(
+            float(result["precision"]),
+            float(result["recall"]),
+            int(result["matches"]),
+            set(array_to_pairs(result["hypotheses"])),
+            ranked_from_arrays(result["ranked_pairs"], result["ranked_scores"]),
+            array_to_pairs(result["train_seeds"]),
+            metrics_from_table(result.get("iteration_metrics", [])),
+            # Results from before early stopping ran all iterations
+            int(result.get("iterations", NUM_ITERATIONS)),
+        )
+    # Every trial has its own random streams, so its result does not depend on the other trials or the worker
+    rng_value = 2000 + trial + 20
+    seed_list = list(inputs.seed_list)
+    random.Random(rng_value).shuffle(seed_list)
+    # GOAT shuffles its input with the global generators
+    random.seed(rng_value)
+    np.random.seed(rng_value)
+    with stage("trial", trial=trial, num_seeds=num_seeds, end_proc=end_proc):
+        trial_result = run_trial(
+            inputs,
+            seed_list,
+            num_seeds,
+            end_proc,
+            checkpoints / f"trial-{trial}.npz" if checkpoints else None,
+            early_stopping,
+            threads,
+        )
+    if result_file is not None:
+        save_checkpoint(
+            result_file,
+            precision=np.array(trial_result.precision),
+            recall=np.array(trial_result.recall),
+            matches=np.array(trial_result.matches),
+            hypotheses=pairs_to_array(trial_result.hypotheses),
+            train_seeds=pairs_to_array(trial_result.train_seeds),
+            iteration_metrics=metrics_to_table(trial_result.iteration_metrics),
+            iterations=np.array(trial_result.iterations),
+            **ranked_to_arrays(trial_result.ranked_hypotheses),
+        )
+    return trial_result
+
+
+_worker_inputs: Optional[BliInputs] = None
+_worker_mappings: List[mmap.mmap] = []
+
+
+def _init_trial_worker(
+    inputs: BliInputs,
+    specs: SharedArraySpecs,
+    blas_threads: int,
+    settings: Optional[TraceSettings],
+):
+    global _worker_inputs, _worker_mappings
+    configure(settings)
+    # Limit the BLAS threads, so that the workers do not oversubscribe the cores
+    threadpool_limits(limits=blas_threads)
+    arrays, _worker_mappings = attach_shared_arrays(specs)
+    _worker_inputs = replace(inputs, **arrays)
+
+
+def _run_trial_in_worker(
+    arguments: Tuple[int, int, bool, Optional[Path], EarlyStopping, int],
+) -> TrialResult:
+    return run_seeded_trial(_worker_inputs, *arguments)
+
+
+def run_configuration(
+    inputs: BliInputs,
+    num_seeds: int,
+    end_proc: bool,
+    processes: Optional[int] = None,
+    checkpoints: Optional[Path] = None,
+    early_stopping: EarlyStopping = EarlyStopping(),
+    threads: Optional[int] = None,
+) -> List[TrialResult]:
+    """
+    Runs the trials of a configuration on processes worker processes. threads is the number of BLAS and CSLS
+    threads of every trial, by default all cores for serial trials and an equal share of them otherwise.
+    """
+    # When using a system combination, it is best to start with Procrustes and GOAT, for very low and very
+    # high numbers of seeds. Hence, we start with Procrustes
+
+    processes = min(processes or os.cpu_count() or 1, NUM_TRIALS)
+    if processes > 1:
+        threads = threads or max(1, (os.cpu_count() or 1) // processes)
+    trial_arguments = [
+        (j, num_seeds, end_proc, checkpoints, early_stopping, threads)
+        for j in range(NUM_TRIALS)
+    ]
+    if processes == 1:
+        return [
+            run_seeded_trial(inputs, *arguments) for arguments in tqdm(trial_arguments)
+        ]
+    # The graphs and embeddings are shared with the workers copy-on-write instead of being pickled. Top-k graphs
+    # are small and are passed to the workers directly.
+    arrays = {
+        name: array
+        for name in ["osh_graph", "eng_graph", "osh_embeddings", "eng_embeddings"]
+        if isinstance(array := getattr(inputs, name), np.ndarray)
+    }
+    with shared_arrays(arrays) as specs:
+        worker_inputs = replace(
+            inputs, osh_df=None, eng_df=None, **{name: None for name in arrays}
+        )
+        with Pool(
+            processes,
+            initializer=_init_trial_worker,
+            initargs=(worker_inputs, specs, threads, trace_settings()),
+        ) as pool:
+            return list(
+                tqdm(
+                    pool.imap(_run_trial_in_worker, trial_arguments),
+                    total=NUM_TRIALS,
+                )
+            )
+
+
+def csls_translations(inputs: BliInputs, trial: TrialResult) -> np.ndarray:
+    # Ranks all target words by CSLS for the words that were not used for training
+    candidates, scores = procrustes_csls_top_k(
+        inputs.osh_embeddings,
+        inputs.eng_embeddings,
+        pairs_to_array(sorted(trial.hypotheses)),
+        CSLS_TOP_K,
+    )
+    gold_osh_train_indices = {x for x, _ in trial.train_seeds}
+    return ranked_pairs(
+        candidates,
+        scores,
+        (x for x in range(len(candidates)) if x not in gold_osh_train_indices),
+    )
+
+
+def save_dictionary(
+    inputs: BliInputs,
+    pairs: np.ndarray,
+    file_stem: str,
+    scores: Optional[np.ndarray] = None,
+    write_json: bool = True,
+):
+    dictionary = CompactDictionary.from_pairs(
+        pairs, inputs.osh_df["word"].tolist(), inputs.eng_df["word"].tolist(), scores
+    )
+    dictionary.save(f"{file_stem}{COMPACT_DICTIONARY_SUFFIX}")
+    if write_json:
+        dictionary.write_json(f"{file_stem}.json")
+
+
+def save_results(
+    inputs: BliInputs,
+    trials: List[TrialResult],
+    num_seeds: int,
+    vocab_size: int,
+    end_proc: bool,
+    corpus_type: str,
+    write_json: bool = True,
+):
+    scores = [trial.precision for trial in trials]
+    iterations = [trial.iterations for trial in trials]
+    with open(f"stats-{corpus_type}.txt", "a") as file:
+        file.write(
+            f"{num_seeds}-{vocab_size}-{end_proc}-average score: {statistics.mean(scores)}, std-dev: {statistics.stdev(scores)}, "
+            f"iterations: {statistics.mean(iterations)} ({min(iterations)}-{max(iterations)})\n"
+        )
+    best_score = 0
+    best_hypotheses = []
+    best_ranked_hypotheses = ranked_to_arrays([])
+    best_params = (0, 0, 0, 0)
+    best_trial = None
+    for trial in trials:
+        if trial.precision > best_score:
+            best_score = trial.precision
+            best_trial = trial
+            best_hypotheses = trial.hypotheses - (
+                set(trial.train_seeds) & trial.hypotheses
+            )
+            gold_osh_train_indices, _ = proc_v_sgm.unzip_pairs(trial.train_seeds)
+            ranked_arrays = ranked_to_arrays(trial.ranked_hypotheses)
+            not_trained = ~np.isin(
+                ranked_arrays["ranked_pairs"][:, 0], gold_osh_train_indices
+            )
+            best_ranked_hypotheses = {
+                name: array[not_trained] for name, array in ranked_arrays.items()
+            }
+            best_params = (num_seeds, vocab_size, end_proc, corpus_type)
+    file_stem = f"dictionary-no-names-{best_params[0]}-{best_params[1]}-{best_params[2]}-{best_params[3]}-{best_score}"
+    save_dictionary(
+        inputs, pairs_to_array(best_hypotheses), file_stem, write_json=write_json
+    )
+    save_dictionary(
+        inputs,
+        best_ranked_hypotheses["ranked_pairs"],
+        f"{file_stem}-ranked",
+        best_ranked_hypotheses["ranked_scores"],
+        write_json,
+    )
+    if best_trial is not None and best_trial.hypotheses:
+        save_dictionary(
+            inputs,
+            csls_translations(inputs, best_trial),
+            f"{file_stem}-csls-top{CSLS_TOP_K}",
+            write_json=write_json,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Process some integers.")
+    parser.add_argument(
+        "--vocab_size", type=int, required=True, help="Size of the vocabulary"
+    )
+    parser.add_argument(
+        "--corpus_type", type=str, required=True, help="Type of the corpus"
+    )
+    parser.add_argument("--num_seeds", type=int, required=True, help="Number of seeds")
+    parser.add_argument(
+        "--end_proc", type=str, required=True, help="Whether to run Procrustes first"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Number of processes that run the trials in parallel",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue from the checkpoints of an interrupted run",
+    )
+    parser.add_argument(
+        "--no_json",
+        action="store_true",
+        help="Only save the dictionaries in the compact binary format",
+    )
+    parser.add_argument(
+        "--graph_neighbours",
+        type=int,
+        default=None,
+        help="Use sparse graphs that only keep the most similar words instead of the dense graphs",
+    )
+    parser.add_argument(
+        "--out_of_core_graph",
+        action="store_true",
+        help="Build the dense graphs in float32 tiles on disk and memory-map them",
+    )
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=CONVERGENCE_PATIENCE,
+        help="Stop a trial after this many iterations without a change of the hypotheses, 0 runs all iterations",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=CONVERGENCE_TOLERANCE,
+        help="Largest Jaccard distance between the hypotheses of two iterations that counts as no change",
+    )
+    parser.add_argument(
+        "--precision_tolerance",
+        type=float,
+        default=None,
+        help="If set, the dev precision must not change by more than this many points either",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Write the wall time, CPU time and peak memory of every stage to this JSON Lines file",
+    )
+    parser.add_argument(
+        "--profile_stage",
+        type=str,
+        default=None,
+        help="Run every stage of this name, e.g. sgm, under cProfile and save the statistics next to the trace",
+    )
+
+    args = parser.parse_args()
+    VOCAB_SIZE = args.vocab_size
+    CORPUS_TYPE = args.corpus_type
+    NUM_SEEDS = args.num_seeds
+    END_PROC = bool(eval(args.end_proc))
+    assert CORPUS_TYPE in ["small", "extended"]
+    if args.profile_stage and not args.trace:
+        parser.error("--profile_stage requires --trace")
+    if args.trace:
+        enable_tracing(args.trace, args.profile_stage, arguments=vars(args))
+
+    with stage("prepare_inputs", vocab_size=VOCAB_SIZE):
+        bli_inputs = prepare_inputs(
+            VOCAB_SIZE, CORPUS_TYPE, args.graph_neighbours, args.out_of_core_graph
+        )
+    early_stopping = EarlyStopping(
+        args.tolerance, args.patience, args.precision_tolerance
+    )
+    # The state of every trial is saved after each iteration, so that an interrupted run can be resumed. Trials
+    # with other stopping settings end after other iterations, so the settings are part of the key.
+    trial_checkpoints = checkpoint_dir(
+        SRC,
+        TRG,
+        CORPUS_TYPE,
+        VOCAB_SIZE,
+        NUM_SEEDS,
+        END_PROC,
+        bli_inputs.key,
+        *astuple(early_stopping),
+    )
+    if not args.resume:
+        clear_checkpoints(trial_checkpoints)
+    with stage("configuration", num_seeds=NUM_SEEDS, end_proc=END_PROC):
+        trial_results = run_configuration(
+            bli_inputs,
+            NUM_SEEDS,
+            END_PROC,
+            args.processes,
+            trial_checkpoints,
+            early_stopping,
+        )
+    with stage("save_results"):
+        save_results(
+            bli_inputs,
+            trial_results,
+            NUM_SEEDS,
+            VOCAB_SIZE,
+            END_PROC,
+            CORPUS_TYPE,
+            not args.no_json,
+        )
+    remove_checkpoints(trial_checkpoints)
+    print("Done!")
@@ -0,0 +1,250 @@
+import json
+import os
+import sys
+
+sys.path.extend(
+    [
+        "/vol/fob-vol3/nebenf20/breidina/Dokumente/BLI-for-Oshiwambo",
+        "/vol/fob-vol3/nebenf20/breidina/Dokumente/BLI-for-Oshiwambo/goat/GoatForBli",
+    ]
+)
+
+import argparse
+import multiprocessing
+from dataclasses import astuple
+from itertools import product
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from src.experiments.checkpoints import (checkpoint_dir, clear_checkpoints,
+                                         remove_checkpoints)
+from src.experiments.constants import SRC, TRG
+from src.experiments.convergence import (CONVERGENCE_PATIENCE,
+                                         CONVERGENCE_TOLERANCE, EarlyStopping)
+from src.experiments.run_goat_for_bli import (BliInputs, TrialResult,
+                                              prepare_inputs,
+                                              run_configuration, save_results)
+from threadpoolctl import threadpool_limits
+
+# The same module as in run_goat_for_bli.py and graph_matching.py, see there
+from tracing import enable_tracing, stage
+
+# Runs the whole parameter search in one process. The inputs are prepared once per vocab size and the
+# configurations are run by forked workers, which share the inputs with the parent process.
+
+_inputs: Optional[BliInputs] = None
+
+
+def _run_configuration(
+    configuration: Tuple[int, bool, int, Path, EarlyStopping],
+) -> Tuple[int, bool, List[TrialResult]]:
+    num_seeds, end_proc, blas_threads, checkpoints, early_stopping = configuration
+    # Limit the BLAS threads, so that the workers do not oversubscribe the cores
+    # The workers of the pool cannot start processes themselves, so the trials run one after another
+    with threadpool_limits(limits=blas_threads), stage(
+        "configuration", num_seeds=num_seeds, end_proc=end_proc
+    ):
+        return (
+            num_seeds,
+            end_proc,
+            run_configuration(
+                _inputs,
+                num_seeds,
+                end_proc,
+                1,
+                checkpoints,
+                early_stopping,
+                blas_threads,
+            ),
+        )
+
+
+def completed_configurations(corpus_type: str) -> Set[Tuple[int, int, bool]]:
+    try:
+        with open(f"results-{corpus_type}.jsonl", "r", encoding="utf-8") as file:
+            records = [json.loads(line) for line in file]
+    except FileNotFoundError:
+        return set()
+    return {
+        (record["vocab_size"], record["num_seeds"], record["end_proc"])
+        for record in records
+    }
+
+
+def param_search(
+    corpus_type: str,
+    vocab_sizes: List[int],
+    num_seeds_values: List[int],
+    end_proc_values: List[bool],
+    processes: Optional[int] = None,
+    resume: bool = False,
+    early_stopping: EarlyStopping = EarlyStopping(),
+    graph_neighbours: Optional[int] = None,
+    out_of_core_graph: bool = False,
+):
+    global _inputs
+    configurations = list(product(num_seeds_values, end_proc_values))
+    processes = min(processes or os.cpu_count() or 1, len(configurations))
+    blas_threads = max(1, (os.cpu_count() or 1) // processes)
+    # Resuming skips the configurations with results and continues the others from their checkpoints
+    completed = completed_configurations(corpus_type) if resume else set()
+    for vocab_size in vocab_sizes:
+        pending_configurations = [
+            (num_seeds, end_proc)
+            for num_seeds, end_proc in configurations
+            if (vocab_size, num_seeds, end_proc) not in completed
+        ]
+        if not pending_configurations:
+            continue
+        with stage("prepare_inputs", vocab_size=vocab_size):
+            _inputs = prepare_inputs(
+                vocab_size, corpus_type, graph_neighbours, out_of_core_graph
+            )
+        pending = []
+        for num_seeds, end_proc in pending_configurations:
+            checkpoints = checkpoint_dir(
+                SRC,
+                TRG,
+                corpus_type,
+                vocab_size,
+                num_seeds,
+                end_proc,
+                _inputs.key,
+                *astuple(early_stopping),
+            )
+            if not resume:
+                clear_checkpoints(checkpoints)
+            pending.append(
+                (num_seeds, end_proc, blas_threads, checkpoints, early_stopping)
+            )
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            for num_seeds, end_proc, trials in pool.imap_unordered(
+                _run_configuration, pending
+            ):
+                with stage("save_results", num_seeds=num_seeds, end_proc=end_proc):
+                    save_results(
+                        _inputs, trials, num_seeds, vocab_size, end_proc, corpus_type
+                    )
+                with open(
+                    f"results-{corpus_type}.jsonl", "a", encoding="utf-8"
+                ) as file:
+                    for trial_number, trial in enumerate(trials):
+                        record = {
+                            "corpus_type": corpus_type,
+                            "vocab_size": vocab_size,
+                            "num_seeds": num_seeds,
+                            "end_proc": end_proc,
+                            "trial": trial_number,
+                            "precision": trial.precision,
+                            "recall": trial.recall,
+                            "matches": trial.matches,
+                            "iterations": trial.iterations,
+                        }
+                        file.write(json.dumps(record) + "\n")
+                remove_checkpoints(
+                    checkpoint_dir(
+                        SRC,
+                        TRG,
+                        corpus_type,
+                        vocab_size,
+                        num_seeds,
+                        end_proc,
+                        _inputs.key,
+                        *astuple(early_stopping),
+                    )
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the BLI parameter search.")
+    parser.add_argument(
+        "--corpus_type", type=str, required=True, help="Type of the corpus"
+    )
+    parser.add_argument(
+        "--vocab_sizes",
+        type=int,
+        nargs="+",
+        default=[10000, 20000, 50000],
+        help="Sizes of the vocabulary",
+    )
+    parser.add_argument(
+        "--num_seeds",
+        type=int,
+        nargs="+",
+        default=[50, 75, 100],
+        help="Numbers of seeds",
+    )
+    parser.add_argument(
+        "--end_proc",
+        type=str,
+        nargs="+",
+        default=["True", "False"],
+        help="Whether to run Procrustes first",
+    )
+    parser.add_argument(
+        "--processes", type=int, default=None, help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted parameter search",
+    )
+    parser.add_argument(
+        "--graph_neighbours",
+        type=int,
+        default=None,
+        help="Use sparse graphs that only keep the most similar words instead of the dense graphs",
+    )
+    parser.add_argument(
+        "--out_of_core_graph",
+        action="store_true",
+        help="Build the dense graphs in float32 tiles on disk and memory-map them",
+    )
+    parser.add_argument(
+        "--patience",
+        type=int,
+        default=CONVERGENCE_PATIENCE,
+        help="Stop a trial after this many iterations without a change of the hypotheses, 0 runs all iterations",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=CONVERGENCE_TOLERANCE,
+        help="Largest Jaccard distance between the hypotheses of two iterations that counts as no change",
+    )
+    parser.add_argument(
+        "--precision_tolerance",
+        type=float,
+        default=None,
+        help="If set, the dev precision must not change by more than this many points either",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        help="Write the wall time, CPU time and peak memory of every stage to this JSON Lines file",
+    )
+    parser.add_argument(
+        "--profile_stage",
+        type=str,
+        default=None,
+        help="Run every stage of this name, e.g. sgm, under cProfile and save the statistics next to the trace",
+    )
+    args = parser.parse_args()
+    assert args.corpus_type in ["small", "extended"]
+    if args.profile_stage and not args.trace:
+        parser.error("--profile_stage requires --trace")
+    if args.trace:
+        enable_tracing(args.trace, args.profile_stage, arguments=vars(args))
+    param_search(
+        args.corpus_type,
+        args.vocab_sizes,
+        args.num_seeds,
+        [bool(eval(end_proc)) for end_proc in args.end_proc],
+        args.processes,
+        args.resume,
+        EarlyStopping(args.tolerance, args.patience, args.precision_tolerance),
+        args.graph_neighbours,
+        args.out_of_core_graph,
+    )
+    print("Done!")
@@ -0,0 +1,74 @@
+import mmap
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# (shared memory name or file, offset of the data in the file, shape, dtype) of every shared array. The offset is
+# None for shared memory.
+SharedArraySpecs = Dict[str, Tuple[str, Optional[int], Tuple[int, ...], str]]
+
+
+def _is_file_backed(array: np.ndarray) -> bool:
+    # A whole memory-mapped file, e.g. a cached graph, as opposed to a view of one
+    return (
+        isinstance(array, np.memmap)
+        and isinstance(array.base, mmap.mmap)
+        and array.flags.c_contiguous
+    )
+
+
+@contextmanager
+def shared_arrays(arrays: Dict[str, np.ndarray]) -> Iterator[SharedArraySpecs]:
+    """
+    Copies the arrays into shared memory once. Worker processes attach to them with attach_shared_arrays,
+    without copying or pickling the data. Memory-mapped arrays are not copied, the workers map their files
+    instead and share the pages through the page cache. The shared memory is released when the context is left.
+    """
+    segments = []
+    specs = {}
+    try:
+        for name, array in arrays.items():
+            if _is_file_backed(array):
+                specs[name] = (
+                    str(array.filename),
+                    array.offset,
+                    array.shape,
+                    array.dtype.str,
+                )
+                continue
+            segment = SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(segment)
+            np.ndarray(array.shape, array.dtype, buffer=segment.buf)[...] = array
+            specs[name] = (segment.name, None, array.shape, array.dtype.str)
+        yield specs
+    finally:
+        for segment in segments:
+            segment.close()
+            segment.unlink()
+
+
+def attach_shared_arrays(
+    specs: SharedArraySpecs,
+) -> Tuple[Dict[str, np.ndarray], List[mmap.mmap]]:
+    """
+    Attaches to the arrays of shared_arrays copy-on-write. The pages are shared until a worker writes to them,
+    which only changes a private copy of the page, so the arrays of the parent and the other workers never change,
+    even if a worker modifies its inputs in place. The mappings have to be kept alive as long as the arrays are used.
+    """
+    arrays = {}
+    mappings = []
+    for name, (source, offset, shape, dtype) in specs.items():
+        if offset is None:
+            segment = SharedMemory(name=source)
+            try:
+                mapping = mmap.mmap(segment._fd, segment.size, access=mmap.ACCESS_COPY)
+            finally:
+                segment.close()
+        else:
+            with open(source, "rb") as file:
+                mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+        mappings.append(mapping)
+        arrays[name] = np.ndarray(shape, dtype, buffer=mapping, offset=offset or 0)
+    return arrays, mappings
@@ -0,0 +1,62 @@
+from typing import Union
+
+import numpy as np
+from scipy.sparse import csr_array, issparse
+
+# Rows per block. A block and the column indices of its partition take block_size * n * 16 bytes, so larger
+# blocks would need more memory than the dense graph for a few thousand words.
+GRAPH_BLOCK_SIZE = 256
+
+SimilarityGraph = Union[np.ndarray, csr_array]
+
+
+def top_k_similarity_graph(
+    embeddings: np.ndarray, k: int, block_size: int = GRAPH_BLOCK_SIZE
+) -> csr_array:
+    """
+    Symmetric k nearest neighbour version of embeddings @ embeddings.T. The similarities are computed for
+    block_size rows at a time, so only a (block_size x n) slice of the dense graph exists at any time. An edge
+    is kept if either word is among the k most similar words of the other, which makes the graph symmetric
+    like the dense one.
+    """
+    n = len(embeddings)
+    k = min(k, n)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    similarities = np.empty((n, k), dtype=embeddings.dtype)
+    for start in range(0, n, block_size):
+        block = embeddings[start : start + block_size] @ embeddings.T
+        # Partitioning for the last k columns instead of negating the block avoids a copy of it
+        block_neighbours = np.argpartition(block, -k, axis=1)[:, -k:]
+        neighbours[start : start + block_size] = block_neighbours
+        similarities[start : start + block_size] = np.take_along_axis(
+            block, block_neighbours, axis=1
+        )
+    # The similarity of i and j from the block of i can differ from the one of j in the last bit, so every
+    # undirected edge keeps one of them for both directions
+    rows = np.repeat(np.arange(n, dtype=np.int64), k)
+    columns = neighbours.ravel()
+    edges, first_edges = np.unique(
+        np.minimum(rows, columns) * n + np.maximum(rows, columns), return_index=True
+    )
+    lower, upper = edges // n, edges % n
+    # Adding the reversed edges and dropping the duplicates of the diagonal makes the graph symmetric. The keys
+    # are sorted by row and column, so they already are in CSR order.
+    keys, unique_edges = np.unique(
+        np.concatenate([lower * n + upper, upper * n + lower]), return_index=True
+    )
+    values = np.tile(similarities.ravel()[first_edges], 2)
+    indptr = np.searchsorted(keys // n, np.arange(n + 1))
+    # csr_array instead of csr_matrix, so that products with dense arrays stay arrays
+    return csr_array((values[unique_edges], keys % n, indptr), shape=(n, n))
+
+
+def dense_graph(graph: SimilarityGraph) -> np.ndarray:
+    # The quadratic assignment of GOAT, like scipy's, only works on dense matrices. The edges that a top-k graph
+    # dropped get the similarity 0.
+    return graph.toarray() if issparse(graph) else graph
+
+
+def graph_nbytes(graph: SimilarityGraph) -> int:
+    if issparse(graph):
+        return graph.data.nbytes + graph.indices.nbytes + graph.indptr.nbytes
+    return graph.nbytes
@@ -0,0 +1,95 @@
+import argparse
+import json
+import pstats
+from typing import List
+
+import pandas as pd
+
+# Summarizes the JSON Lines traces written by run_goat_for_bli.py --trace, see tracing.py
+
+MB = 2**20
+
+
+def load_trace(paths: List[str]) -> pd.DataFrame:
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as file:
+            records.extend(
+                record
+                for line in file
+                if line.strip() and (record := json.loads(line))["type"] == "stage"
+            )
+    return pd.DataFrame(records)
+
+
+def summarize_stages(stages: pd.DataFrame, by: str = "name") -> pd.DataFrame:
+    summary = stages.groupby(by).agg(
+        count=("wall", "size"),
+        wall=("wall", "sum"),
+        mean_wall=("wall", "mean"),
+        max_wall=("wall", "max"),
+        cpu=("cpu", "sum"),
+        children_cpu=("children_cpu", "sum"),
+        peak_rss_mb=("peak_rss", "max"),
+        peak_rss_increase_mb=("peak_rss_increase", "max"),
+    )
+    summary[["peak_rss_mb", "peak_rss_increase_mb"]] /= MB
+    # The share of the time of the outermost stages of every process, nested stages are part of their parents
+    root_wall = stages.loc[~stages["path"].str.contains("/"), "wall"].sum()
+    summary["share"] = summary["wall"] / root_wall if root_wall else float("nan")
+    return summary.sort_values("wall", ascending=False)
+
+
+def summarize_iterations(stages: pd.DataFrame) -> pd.DataFrame:
+    # The mean wall time of the stages of every iteration over all trials, one row per iteration
+    if "iteration" not in stages:
+        return pd.DataFrame()
+    iteration_stages = stages[stages["iteration"].notna()].astype({"iteration": int})
+    summary = iteration_stages.pivot_table(
+        index="iteration", columns="name", values="wall", aggfunc="mean"
+    )
+    summary["peak_rss_mb"] = (
+        iteration_stages.groupby("iteration")["peak_rss"].max() / MB
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize BLI pipeline traces.")
+    parser.add_argument("traces", type=str, nargs="+", help="Trace files")
+    parser.add_argument(
+        "--by",
+        type=str,
+        choices=["name", "path"],
+        default="name",
+        help="Group the stages by their name or by their nesting path",
+    )
+    parser.add_argument(
+        "--iterations",
+        action="store_true",
+        help="Also show the mean time of the stages per iteration",
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Also show the functions with the largest cumulative time of this cProfile dump",
+    )
+    parser.add_argument(
+        "--top", type=int, default=25, help="Number of functions of the profile"
+    )
+    args = parser.parse_args()
+
+    trace = load_trace(args.traces)
+    pd.set_option("display.width", 200)
+    pd.set_option("display.max_columns", None)
+    if trace.empty:
+        print("The traces contain no stages")
+    else:
+        print(summarize_stages(trace, args.by).round(3).to_string())
+        if args.iterations:
+            print()
+            print(summarize_iterations(trace).round(3).to_string())
+    if args.profile:
+        print()
+        pstats.Stats(args.profile).sort_stats("cumulative").print_stats(args.top)
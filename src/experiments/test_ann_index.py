@@ -0,0 +1,18 @@
+import numpy as np
+
+from ann_index import IvfIndex
+
+
+def test_quantized_zero_vectors_get_zero_codes():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((64, 8)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings[[3, 17]] = 0
+    with np.errstate(invalid="raise"):
+        index = IvfIndex.build(embeddings, num_lists=4, quantize=True)
+    zero_rows = np.isin(index.ids, [3, 17])
+    assert not index.vectors[zero_rows].any()
+    assert not index.scales[zero_rows].any()
+    ids, scores = index.search(embeddings[:1], k=1, probes=4)
+    assert ids[0, 0] == 0
+    assert np.isfinite(scores).all()
@@ -0,0 +1,130 @@
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+import sentencepiece as spm
+
+from byte_pair_embeddings import NumpyBytePairEmbeddings, first_token
+
+DIMENSION = 8
+
+
+@pytest.fixture(scope="module")
+def byte_pair_files(tmp_path_factory) -> Path:
+    # A small SentencePiece model with random embeddings in the ordered embedding format
+    directory = tmp_path_factory.mktemp("byte_pairs")
+    rng = random.Random(0)
+    words = [
+        "".join(rng.choice("abcdefghij") for _ in range(rng.randint(1, 8)))
+        for _ in range(500)
+    ]
+    (directory / "corpus.txt").write_text(
+        "\n".join(" ".join(rng.choices(words, k=10)) for _ in range(500)),
+        encoding="utf-8",
+    )
+    spm.SentencePieceTrainer.train(
+        input=str(directory / "corpus.txt"),
+        model_prefix=str(directory / "test"),
+        vocab_size=100,
+        minloglevel=2,
+    )
+    processor = spm.SentencePieceProcessor(model_file=str(directory / "test.model"))
+    vectors = np.random.default_rng(0).normal(size=(100, DIMENSION))
+    with open(directory / "embeddings.txt", "w", encoding="utf-8") as file:
+        file.write(f"100 {DIMENSION}\n")
+        for i, vector in enumerate(vectors):
+            file.write(
+                f"{processor.id_to_piece(i)} {' '.join(f'{x:.6f}' for x in vector)}\n"
+            )
+    return directory
+
+
+@pytest.fixture(scope="module")
+def embedding(byte_pair_files) -> NumpyBytePairEmbeddings:
+    return NumpyBytePairEmbeddings(
+        byte_pair_files / "test.model", byte_pair_files / "embeddings.txt"
+    )
+
+
+def reference_embedding(
+    embedding: NumpyBytePairEmbeddings, word: str, pooling: str
+) -> np.ndarray:
+    # One word at a time, like flair's BytePairEmbeddings and the pooling patches of the README
+    token = first_token(word).lower()
+    ids = embedding.sp.encode(token, out_type=int)
+    if pooling == "first_last":
+        return np.concatenate([embedding.vectors[ids[0]], embedding.vectors[ids[-1]]])
+    if pooling == "mean":
+        return (embedding.vectors[ids[0]] + embedding.vectors[ids[-1]]) / np.float32(2)
+    weights = [
+        len(piece.replace("▁", ""))
+        for piece in embedding.sp.encode(token, out_type=str)
+    ]
+    weighted_embedding = np.zeros(DIMENSION, dtype=np.float32)
+    for i, weight in zip(ids, weights):
+        weighted_embedding += np.float32(weight) * embedding.vectors[i]
+    return weighted_embedding / np.float32(sum(weights))
+
+
+@pytest.mark.parametrize(
+    "word, token",
+    [
+        ("abc", "abc"),
+        ("abc.", "abc"),
+        ("don't", "do"),
+        ("U.S.", "U.S"),
+        ("e-mail", "e-mail"),
+        ("x\u200by", "xy"),
+        ("\x93hi", "“"),
+        ("", ""),
+        (" \t", ""),
+    ],
+)
+def test_first_token_follows_flair_sentences(word, token):
+    assert first_token(word) == token
+
+
+@pytest.mark.parametrize("pooling", ["first_last", "mean", "weighted"])
+def test_embed_matches_the_per_word_pooling(embedding, pooling):
+    words = ["abc", "Jihgf", "abc.", "bad's", "a", "cafe-bead", "dead,beef"]
+    expected = np.stack(
+        [reference_embedding(embedding, word, pooling) for word in words]
+    )
+    np.testing.assert_array_equal(embedding.embed(words, pooling), expected)
+
+
+@pytest.mark.parametrize("pooling", ["first_last", "mean", "weighted"])
+def test_words_without_tokens_get_zero_vectors(embedding, pooling):
+    embeddings = embedding.embed(["", "abc", "  "], pooling)
+    assert embeddings.shape == (3, embedding.embedding_length[pooling])
+    assert not embeddings[[0, 2]].any()
+    assert embeddings[1].any()
+    assert embedding.embed([], pooling).shape == (
+        0,
+        embedding.embedding_length[pooling],
+    )
+
+
+def test_unknown_pooling(embedding):
+    with pytest.raises(ValueError):
+        embedding.embed(["abc"], "max")
+
+
+def test_embed_matches_flair(byte_pair_files, embedding):
+    # Unpatched flair pools the first and the last sub-word embedding
+    Sentence = pytest.importorskip("flair.data").Sentence
+    BytePairEmbeddings = pytest.importorskip("flair.embeddings").BytePairEmbeddings
+    flair_embedding = BytePairEmbeddings(
+        model_file_path=byte_pair_files / "test.model",
+        embedding_file_path=byte_pair_files / "embeddings.txt",
+        dim=DIMENSION,
+        preprocess=False,
+    )
+    words = ["abc", "Jihgf", "abc.", "bad's", "don't", "cafe-bead"]
+    expected = []
+    for word in words:
+        sentence = Sentence(word)
+        flair_embedding.embed(sentence)
+        expected.append(sentence[0].embedding.cpu().numpy())
+    np.testing.assert_array_equal(embedding.embed(words, "first_last"), expected)
@@ -0,0 +1,70 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+from dictionary_service import DictionaryService, make_server
+
+
+@pytest.fixture
+def server(tmp_path):
+    dictionary_file = tmp_path / "dictionary.json"
+    dictionary_file.write_text(json.dumps({"omuntu": ["person", "human"]}))
+    (tmp_path / "secret.json").write_text(json.dumps({"secret": ["value"]}))
+    with make_server(DictionaryService(dictionary_file), port=0) as http_server:
+        thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+        thread.start()
+        yield http_server
+        http_server.shutdown()
+
+
+def send(server, method: str, path: str, body: bytes = None):
+    connection = http.client.HTTPConnection(*server.server_address)
+    connection.request(method, path, body=body)
+    response = connection.getresponse()
+    content = json.loads(response.read())
+    connection.close()
+    return response.status, content
+
+
+def test_lookup(server):
+    assert send(server, "GET", "/lookup?word=omuntu&limit=1") == (
+        200,
+        {"omuntu": ["person"]},
+    )
+    assert send(
+        server, "POST", "/lookup", json.dumps({"words": ["omuntu"]}).encode()
+    ) == (200, {"omuntu": ["person", "human"]})
+
+
+def test_limit_zero(server):
+    assert send(server, "GET", "/lookup?word=omuntu&limit=0") == (200, {"omuntu": []})
+    assert send(server, "GET", "/prefix?prefix=om&limit=0") == (200, [])
+    assert send(server, "GET", "/prefix?prefix=om") == (200, ["omuntu"])
+
+
+@pytest.mark.parametrize(
+    "method, path, body",
+    [
+        ("GET", "/lookup?word=omuntu&limit=ten", None),
+        ("GET", "/prefix?prefix=om&limit=-1", None),
+        ("POST", "/lookup", b"[1, 2]"),
+        ("POST", "/lookup", b'{"words": "omuntu"}'),
+        ("POST", "/lookup", b'{"words": [["omuntu"]]}'),
+        ("POST", "/lookup", b'{"words": ["omuntu"], "limit": "1"}'),
+        ("POST", "/reload", b"not json"),
+    ],
+)
+def test_malformed_requests(server, method, path, body):
+    status, content = send(server, method, path, body)
+    assert status == 400
+    assert "error" in content
+
+
+def test_reload_ignores_other_paths(server, tmp_path):
+    body = json.dumps({"path": str(tmp_path / "secret.json")}).encode()
+    status, content = send(server, "POST", "/reload", body)
+    assert status == 200
+    assert content["dictionary"] == str(tmp_path / "dictionary.json")
+    assert send(server, "GET", "/lookup?word=secret") == (200, {"secret": []})
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from graph_matching import normalize_embeddings
+
+
+def normalize_embedding_column(embedding_matrix: np.ndarray) -> np.ndarray:
+    # The original normalization of load_embeddings_into_matrix on a pandas column of row vectors
+    embeddings_column = pd.Series(list(embedding_matrix))
+    embeddings_column = embeddings_column.apply(lambda emb: emb / np.linalg.norm(emb))
+    embeddings_mean = embeddings_column.mean()
+    embeddings_column = embeddings_column.apply(lambda emb: emb - embeddings_mean)
+    embeddings_column = embeddings_column.apply(lambda emb: emb / np.linalg.norm(emb))
+    normalized = np.zeros((len(embeddings_column), len(embeddings_column[0])))
+    for i in range(0, len(embeddings_column)):
+        normalized[i] = embeddings_column[i]
+    return normalized
+
+
+@pytest.mark.parametrize("shape", [(2, 3), (1000, 300), (4097, 64)])
+def test_normalize_embeddings_is_bit_identical(shape):
+    embedding_matrix = (
+        np.random.default_rng(0).normal(size=shape).astype(np.float32) * 3 + 1
+    )
+    expected = normalize_embedding_column(embedding_matrix.copy())
+    normalized = normalize_embeddings(embedding_matrix.copy())
+    assert normalized.dtype == np.float64
+    np.testing.assert_array_equal(normalized, expected)
@@ -0,0 +1,32 @@
+import multiprocessing
+
+import numpy as np
+
+from shared_arrays import attach_shared_arrays, shared_arrays
+
+
+def _double_in_place(specs) -> float:
+    arrays, _mappings = attach_shared_arrays(specs)
+    arrays["graph"] *= 2
+    return float(arrays["graph"].sum())
+
+
+def test_writes_of_workers_stay_private():
+    graph = np.ones((64, 64))
+    with shared_arrays({"graph": graph}) as specs:
+        with multiprocessing.get_context("spawn").Pool(2) as pool:
+            assert pool.map(_double_in_place, [specs, specs]) == [8192.0, 8192.0]
+        arrays, _mappings = attach_shared_arrays(specs)
+        np.testing.assert_array_equal(arrays["graph"], graph)
+
+
+def test_memory_mapped_arrays_are_mapped_from_their_files(tmp_path):
+    np.save(tmp_path / "graph.npy", np.arange(12.0).reshape(3, 4))
+    graph = np.load(tmp_path / "graph.npy", mmap_mode="c")
+    with shared_arrays({"graph": graph}) as specs:
+        assert specs["graph"][0] == str(tmp_path / "graph.npy")
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            assert pool.map(_double_in_place, [specs]) == [132.0]
+    np.testing.assert_array_equal(
+        np.load(tmp_path / "graph.npy"), np.arange(12.0).reshape(3, 4)
+    )
@@ -0,0 +1,18 @@
+import numpy as np
+
+from sparse_graph import dense_graph, top_k_similarity_graph
+
+
+def test_top_k_graph_keeps_the_edges_of_the_k_nearest_neighbours():
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((300, 16))
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    similarities = embeddings @ embeddings.T
+    neighbours = np.argsort(-similarities, axis=1)[:, :10]
+    edges = np.zeros_like(similarities, dtype=bool)
+    np.put_along_axis(edges, neighbours, True, axis=1)
+    edges |= edges.T
+    graph = dense_graph(top_k_similarity_graph(embeddings, 10, block_size=64))
+    np.testing.assert_array_equal(graph != 0, edges)
+    np.testing.assert_allclose(graph[edges], similarities[edges])
+    np.testing.assert_array_equal(graph, graph.T)
@@ -0,0 +1,39 @@
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from embedding_files import save_binary_embeddings
+from word_vectors import VECTOR_BLOCK_SIZE, load_normalized_vectors
+
+
+def _write_text_vectors(path, words, vectors):
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(f"{len(words)} {vectors.shape[1]}\n")
+        for word, vector in zip(words, vectors):
+            file.write(f"{word} {' '.join(repr(float(value)) for value in vector)}\n")
+
+
+def _original_normalization(vectors):
+    # The normalization of the whole vocabulary in evs-python-3.py and gh-python-3.py
+    vectors = normalize(vectors, axis=1, norm="l2")
+    vectors = vectors - vectors.mean(0)
+    return normalize(vectors, axis=1, norm="l2")
+
+
+def test_normalization_is_identical_to_the_whole_vocabulary(tmp_path):
+    rng = np.random.default_rng(0)
+    # More rows than one block, and a zero vector
+    vectors = rng.standard_normal((VECTOR_BLOCK_SIZE + 100, 8)).astype(np.float32)
+    vectors *= rng.uniform(0.1, 10, (len(vectors), 1)).astype(np.float32)
+    vectors[2] = 0
+    words = [f"w{i}" for i in range(len(vectors))]
+    path = tmp_path / "vectors.txt"
+    _write_text_vectors(path, words, vectors)
+    expected = _original_normalization(vectors)
+    for binary in (False, True):
+        if binary:
+            save_binary_embeddings(path, words, vectors)
+        for n in (None, 10, VECTOR_BLOCK_SIZE + 1):
+            loaded_words, loaded = load_normalized_vectors(path, n)
+            assert loaded_words == words[:n]
+            assert loaded.dtype == expected.dtype
+            np.testing.assert_array_equal(loaded, expected[:n])
@@ -0,0 +1,145 @@
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+# A trace is a JSON Lines file: a "run" record when tracing is enabled and one "stage" record per finished stage.
+# Every process appends its own records with single writes, so the workers of a run share one trace file.
+# summarize_trace.py aggregates the stages of a trace.
+
+TRACE_VERSION = 1
+# ru_maxrss is given in kilobytes on Linux and in bytes on macOS
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+@dataclass(frozen=True)
+class TraceSettings:
+    path: str
+    # Stages with this name are run under cProfile and their statistics are dumped next to the trace
+    profile_stage: Optional[str] = None
+
+
+_settings: Optional[TraceSettings] = None
+_stack: List["_Stage"] = []
+_profile_active = False
+# A disabled stage is this shared no-op context manager, so instrumented code pays one function call per stage
+_disabled_stage = nullcontext()
+
+
+def peak_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+def enable_tracing(
+    path: Union[str, Path], profile_stage: Optional[str] = None, **run_attributes
+):
+    configure(TraceSettings(str(path), profile_stage))
+    _write_record(
+        {
+            "type": "run",
+            "version": TRACE_VERSION,
+            "time": time.time(),
+            "argv": sys.argv,
+            "cpu_count": os.cpu_count(),
+            "profile_stage": profile_stage,
+            **run_attributes,
+        }
+    )
+
+
+def configure(settings: Optional[TraceSettings]):
+    # Called in worker processes with the settings of the parent, see trace_settings
+    global _settings
+    _settings = settings
+
+
+def trace_settings() -> Optional[TraceSettings]:
+    return _settings
+
+
+def _write_record(record: Dict[str, Any]):
+    line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+    file = os.open(_settings.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(file, line)
+    finally:
+        os.close(file)
+
+
+class _Stage:
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def __enter__(self):
+        global _profile_active
+        # The attributes of the enclosing stages are recorded as well, e.g. the trial and iteration of an SGM call
+        self.inherited = (
+            {**_stack[-1].inherited, **_stack[-1].attributes} if _stack else {}
+        )
+        _stack.append(self)
+        self.path = "/".join(parent.name for parent in _stack)
+        self.peak_rss = peak_rss()
+        # Nested stages of the same name are part of the outer profile, only one profiler can be active
+        if self.name == _settings.profile_stage and not _profile_active:
+            _profile_active = True
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.start_time = time.time()
+        self.times = os.times()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _profile_active
+        wall = time.perf_counter() - self.wall
+        times = os.times()
+        record = {
+            "type": "stage",
+            "name": self.name,
+            "path": self.path,
+            "pid": os.getpid(),
+            "start": self.start_time,
+            "wall": wall,
+            # The CPU time of all threads of the process, so BLAS threads make it larger than the wall time
+            "cpu": times.user + times.system - self.times.user - self.times.system,
+            # The CPU time of the worker processes that finished during the stage, e.g. of the word counting pool
+            "children_cpu": times.children_user
+            + times.children_system
+            - self.times.children_user
+            - self.times.children_system,
+            # The peak RSS of the process so far and how much the stage raised it
+            "peak_rss": (end_rss := peak_rss()),
+            "peak_rss_increase": end_rss - self.peak_rss,
+            "failed": exc_type is not None,
+            **self.inherited,
+            **self.attributes,
+        }
+        if self.profiler is not None:
+            self.profiler.disable()
+            _profile_active = False
+            profile_file = Path(_settings.path).with_name(
+                f"{Path(_settings.path).stem}-{self.path.replace('/', '.')}-{os.getpid()}-{int(self.start_time * 1000)}.prof"
+            )
+            self.profiler.dump_stats(profile_file)
+            record["profile"] = str(profile_file)
+        _stack.pop()
+        _write_record(record)
+        return False
+
+
+def stage(name: str, **attributes):
+    """
+    Context manager that measures wall time, CPU time and the peak RSS of a stage of the pipeline and appends
+    them with the attributes to the trace. Stages nest, the path of a stage contains the names of its parents.
+    """
+    if _settings is None:
+        return _disabled_stage
+    return _Stage(name, attributes)
@@ -0,0 +1,64 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class WordIndex:
+    """
+    Maps the words of a word list to their position, like list.index, but in constant time. Seed extraction,
+    the removal of identical words and the name seeds all look words up in the frequency ordered word lists.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.words: List[str] = list(words)
+        self.positions: Dict[str, int] = {}
+        for position, word in enumerate(self.words):
+            # Like list.index, the first occurrence of a word wins
+            self.positions.setdefault(word, position)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.words)
+
+    def index(self, word: str) -> int:
+        try:
+            return self.positions[word]
+        except KeyError:
+            raise ValueError(f"{word!r} is not in the word list") from None
+
+    def get(self, word: str) -> Optional[int]:
+        return self.positions.get(word)
+
+
+def remove_identical_words(
+    osh_words: List[str], eng_words: List[str], min_length: int = 4
+) -> Tuple[List[str], List[str]]:
+    # Words that are spelled the same in both languages are mostly names, which are removed from both lists
+    identical_words: Set[str] = set(osh_words) & set(eng_words)
+    removed = {word for word in identical_words if len(word) >= min_length}
+    return (
+        [word for word in osh_words if word not in removed],
+        [word for word in eng_words if word not in removed],
+    )
+
+
+def identical_word_seeds(
+    osh_index: WordIndex,
+    eng_index: WordIndex,
+    seed_list: List[Tuple[int, int]],
+    min_length: int = 4,
+) -> List[Tuple[int, int]]:
+    # Pairs of identical words whose positions are not used by a seed already
+    seeded_osh = {x for x, _ in seed_list}
+    seeded_eng = {y for _, y in seed_list}
+    name_seeds = []
+    for word in eng_index:
+        if len(word) < min_length or (x := osh_index.get(word)) is None:
+            continue
+        y = eng_index.index(word)
+        if x not in seeded_osh and y not in seeded_eng:
+            name_seeds.append((x, y))
+    return name_seeds
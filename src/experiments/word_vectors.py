@@ -0,0 +1,82 @@
+import sys
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+from embedding_files import has_binary_embeddings, load_binary_embeddings
+
+# The word vectors of the isomorphism metrics, in the word2vec text format of convert_to_word2vec.py (a header
+# with the number of words and the dimension, then one word and its vector per line, most frequent words first)
+# or in its binary copy.
+
+# Number of rows that are parsed and normalized at once
+VECTOR_BLOCK_SIZE = 4096
+
+
+def read_text_vectors(
+    path: Union[str, Path], block_size: int = VECTOR_BLOCK_SIZE
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Reads the words and vectors of a word2vec text file line by line, block_size rows at a time, each block
+    parsed into a preallocated float32 matrix.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        _, dimension = (int(value) for value in file.readline().split())
+        while True:
+            vectors = np.empty((block_size, dimension), dtype=np.float32)
+            words = []
+            for line in islice(file, block_size):
+                word, *values = line.split()
+                # NumPy parses the strings while it assigns them
+                vectors[len(words)] = values
+                words.append(word)
+            if not words:
+                return
+            yield words, vectors[: len(words)]
+
+
+def read_vectors(
+    path: Union[str, Path], block_size: int = VECTOR_BLOCK_SIZE
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    # The blocks of the binary table if there is one, which is memory-mapped instead of parsed
+    if not has_binary_embeddings(path):
+        yield from read_text_vectors(path, block_size)
+        return
+    words, vectors = load_binary_embeddings(path)
+    for start in range(0, len(words), block_size):
+        yield words[start : start + block_size], vectors[start : start + block_size]
+
+
+def load_normalized_vectors(
+    path: Union[str, Path], n: Optional[int] = None
+) -> Tuple[List[str], np.ndarray]:
+    """
+    Loads the first n words of an embedding file with their vectors length normalized, mean centered
+    dimensionwise and length normalized again, as in the iso-study scripts. The file is read once. Only the first
+    n rows are kept, but the mean is taken over the whole vocabulary, so the result is bit-identical to
+    normalizing all vectors and keeping the first n.
+    """
+    print("Loading vectors from", path, file=sys.stderr)
+    words = []
+    kept = []
+    total = None
+    count = 0
+    for block_words, block in read_vectors(path):
+        block = normalize(block, axis=1, norm="l2")
+        # np.mean along axis 0 adds the rows one after the other, so the running sum goes first
+        total = np.add.reduce(
+            block if total is None else np.vstack([total, block]), axis=0
+        )
+        count += len(block)
+        if n is None or len(words) < n:
+            keep = len(block) if n is None else n - len(words)
+            words.extend(block_words[:keep])
+            kept.append(block[:keep])
+    # np.mean divides the float32 sum by the count as an intp, in place
+    mean = np.true_divide(total, np.intp(count), out=total, casting="unsafe")
+    vectors = normalize(np.concatenate(kept) - mean, axis=1, norm="l2")
+    print(len(words), "vectors loaded from", path, file=sys.stderr)
+    return words, vectors